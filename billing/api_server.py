@@ -0,0 +1,9 @@
+# Local HTTP/JSON billing API (see engine/api.py for the endpoints), e.g.
+#
+#   python api_server.py --port 8765 --terminal WEB
+import sys
+
+from engine.api import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+# Cost of applying promotions as a cart is built, with hundreds of active
+# promotions. Compares CartPromotions (rules indexed by product and
+# category, only the changed line re-evaluated) with checking every rule
+# against every line after each change.
+#
+#   python benchmarks/bench_promotions.py [--promotions 500] [--lines 100]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.billing import BillingEngine
+from engine.cart import Cart
+from engine.promotions import LINE_RULES, PromotionIndex
+
+CATEGORIES = [f"Category {i}" for i in range(50)]
+
+
+class Catalog:
+    def __init__(self, products):
+        rng = random.Random(1)
+        self.prices = {f"Product {i}": 5.0 + i % 200 for i in range(products)}
+        self.categories = {name: rng.choice(CATEGORIES) for name in self.prices}
+
+    def get_price(self, name):
+        return self.prices.get(name)
+
+    def get_category(self, name):
+        return self.categories.get(name)
+
+
+def make_promotions(count, products, rng):
+    promotions = []
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            rule = {"type": "buy_x_get_y", "product": f"Product {rng.randrange(products)}", "buy": 2, "get": 1}
+        elif kind == 1:
+            rule = {"type": "category_percent", "category": rng.choice(CATEGORIES), "percent": rng.choice([5, 10, 15])}
+        elif kind == 2:
+            rule = {"type": "quantity_tier", "products": [f"Product {rng.randrange(products)}" for _ in range(5)],
+                    "tiers": [[3, 5], [10, 12]]}
+        else:
+            rule = {"type": "coupon", "code": f"CODE{i}", "amount": 50, "min_total": 200}
+        promotions.append((i, f"Promotion {i}", rule))
+    return promotions
+
+
+def make_changes(lines, products, rng):
+    # Adds `lines` products, then bumps the quantity of random lines as often
+    names = rng.sample([f"Product {i}" for i in range(products)], lines)
+    return [(name, 1) for name in names] + [(rng.choice(names), rng.randint(1, 3)) for _ in range(lines)]
+
+
+def naive_rules(promotions):
+    # (product set, category, evaluate) for every line rule
+    rules = []
+    for promotion_id, name, rule in promotions:
+        if rule["type"] not in LINE_RULES:
+            continue
+        products = set(rule.get("products") or ([rule["product"]] if "product" in rule else []))
+        rules.append((name, products, rule.get("category"), LINE_RULES[rule["type"]](rule)))
+    return rules
+
+
+def run_naive(catalog, rules, changes):
+    # Every rule against every line after each change
+    cart = Cart()
+    evaluations = 0
+    start = time.perf_counter()
+    for name, quantity in changes:
+        cart.add(name, catalog.get_price(name), quantity)
+        for item in cart:
+            category = catalog.get_category(item.product)
+            best = 0
+            best_name = None
+            for rule_name, products, rule_category, evaluate in rules:
+                evaluations += 1
+                if item.product in products or (rule_category is not None and rule_category == category):
+                    amount = evaluate(item)
+                    if amount > best:
+                        best, best_name = amount, rule_name
+            if best or item.promotion:
+                cart.set_promotion(item.product, best, best_name)
+    return time.perf_counter() - start, evaluations, cart
+
+
+def run_indexed(catalog, index, changes):
+    engine = BillingEngine(catalog, promotions=index)
+    start = time.perf_counter()
+    for name, quantity in changes:
+        engine.add_item(name, quantity)
+    return time.perf_counter() - start, engine.promotions.evaluations, engine.cart
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Promotion evaluation cost per cart change")
+    parser.add_argument("--products", type=int, default=10000, help="catalog size")
+    parser.add_argument("--promotions", type=int, default=500, help="active promotions")
+    parser.add_argument("--lines", type=int, default=100, help="cart lines")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    catalog = Catalog(args.products)
+    promotions = make_promotions(args.promotions, args.products, rng)
+    changes = make_changes(args.lines, args.products, rng)
+
+    start = time.perf_counter()
+    index = PromotionIndex(promotions)
+    compile_ms = (time.perf_counter() - start) * 1000
+    print(f"{index.count} promotions compiled in {compile_ms:.1f} ms; "
+          f"{len(changes)} cart changes on {args.lines} lines")
+
+    naive_time, naive_evaluations, naive_cart = run_naive(catalog, naive_rules(promotions), changes)
+    indexed_time, indexed_evaluations, indexed_cart = run_indexed(catalog, index, changes)
+    if (naive_cart.promotion, naive_cart.total) != (indexed_cart.promotion, indexed_cart.total):
+        print(f"MISMATCH: naive {naive_cart.promotion}/{naive_cart.total}, "
+              f"indexed {indexed_cart.promotion}/{indexed_cart.total}", file=sys.stderr)
+        return 1
+
+    print(f"{'':<10}{'rule checks':>14}{'us/change':>12}")
+    for label, elapsed, evaluations in (("naive", naive_time, naive_evaluations),
+                                        ("indexed", indexed_time, indexed_evaluations)):
+        print(f"{label:<10}{evaluations:>14}{elapsed / len(changes) * 1e6:>12.1f}")
+    print(f"promotions off the bill: {indexed_cart.promotion:.2f}, speedup {naive_time / indexed_time:.0f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+# Orders/sec for save_order with carts of 1, 10 and 500 lines.
+# Compares the old per-row inserts on a default (rollback journal)
+# connection with OrderStore's single-transaction executemany in WAL mode.
+#
+#   python benchmarks/bench_save_order.py [--orders N]
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.order_store import OrderStore
+
+
+def make_items(lines):
+    return [(f"Product {i}", 10.0 + i, 2, (10.0 + i) * 2) for i in range(lines)]
+
+
+def legacy_save(conn, items):
+    # Mirrors the original BillingSystem.save_order
+    cursor = conn.cursor()
+    cursor.execute(
+        """INSERT INTO orders
+           (customer_name, customer_contact, date, total_amount)
+           VALUES (?, ?, ?, ?)""",
+        ("Bench", "0000000000", "2024-01-01 00:00:00", 100.0)
+    )
+    order_id = cursor.lastrowid
+    for product, price, quantity, total in items:
+        cursor.execute(
+            """INSERT INTO order_items
+               (order_id, product_name, price, quantity, total)
+               VALUES (?, ?, ?, ?, ?)""",
+            (order_id, product, price, quantity, total)
+        )
+    conn.commit()
+
+
+def run(save, orders):
+    start = time.perf_counter()
+    for _ in range(orders):
+        save()
+    elapsed = time.perf_counter() - start
+    return orders / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="save_order throughput")
+    parser.add_argument("--orders", type=int, default=200, help="orders per cart size")
+    args = parser.parse_args()
+
+    print(f"{'lines':>6} {'legacy orders/s':>16} {'OrderStore orders/s':>20}")
+    for lines in (1, 10, 500):
+        items = make_items(lines)
+        with tempfile.TemporaryDirectory() as tmp:
+            legacy_path = os.path.join(tmp, "legacy.db")
+            OrderStore(legacy_path, conn=sqlite3.connect(legacy_path)).close()
+            legacy = sqlite3.connect(legacy_path)
+            legacy_rate = run(lambda: legacy_save(legacy, items), args.orders)
+            legacy.close()
+
+            store = OrderStore(os.path.join(tmp, "store.db"))
+            store_rate = run(
+                lambda: store.save_order("Bench", "0000000000", 100.0, items),
+                args.orders
+            )
+            store.close()
+        print(f"{lines:>6} {legacy_rate:>16.0f} {store_rate:>20.0f}")
+
+
+if __name__ == "__main__":
+    main()
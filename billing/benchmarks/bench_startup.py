@@ -0,0 +1,96 @@
+# Cold-start timings for the billing front-ends, each step measured in a
+# fresh interpreter so import caches do not hide the cost.
+#
+#   python benchmarks/bench_startup.py [--runs N]
+#
+# Steps that need something missing here (pandas for the workbook parse,
+# a display for the Tk windows) are reported as skipped.
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BILLING_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STEPS = {
+    "import engine": "import engine",
+    "import pandas (old bill.py import)": "import pandas",
+    "catalog from products.xlsx": (
+        "from engine import ProductCatalog\n"
+        "ProductCatalog('products.xlsx', cache_path='{tmp}/none.cache')"
+    ),
+    "catalog from snapshot": (
+        "from engine import ProductCatalog\n"
+        "ProductCatalog('{tmp}/products.xlsx')"
+    ),
+    "open database (migrate + seed check)": (
+        "from engine import OrderStore\n"
+        "store = OrderStore('{tmp}/billing_system.db')\n"
+        "store.conn.execute('SELECT EXISTS (SELECT 1 FROM products)').fetchone()"
+    ),
+    "product cache bulk load": (
+        "from engine import OrderStore, ProductCache\n"
+        "store = OrderStore('{tmp}/billing_system.db')\n"
+        "ProductCache(store.conn).names()"
+    ),
+    "temp.py window (first idle)": (
+        "import tkinter as tk, temp\n"
+        "root = tk.Tk()\n"
+        "app = temp.BillingSystem(root)\n"
+        "root.update()\n"
+        "app.order_writer.close()"
+    ),
+}
+
+TIMER = (
+    "import time, sys\n"
+    "sys.path.insert(0, {billing!r})\n"
+    "start = time.perf_counter()\n"
+    "{code}\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+def time_step(code, tmp, runs):
+    script = TIMER.format(billing=BILLING_DIR, code=code.format(tmp=tmp))
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=tmp, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()
+            return None, error[-1] if error else "failed"
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return samples, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup timings")
+    parser.add_argument("--runs", type=int, default=5, help="runs per step")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("products.xlsx", "billing_system.db"):
+            source = os.path.join(BILLING_DIR, name)
+            if os.path.exists(source):
+                shutil.copy2(source, tmp)
+
+        # Prime the snapshot (needs pandas once) so the cached path can be timed
+        time_step(STEPS["catalog from snapshot"], tmp, 1)
+
+        print(f"{'step':<40}{'median ms':>12}{'min ms':>10}")
+        for name, code in STEPS.items():
+            samples, error = time_step(code, tmp, args.runs)
+            if samples is None:
+                print(f"{name:<40}  skipped: {error}")
+                continue
+            print(f"{name:<40}{statistics.median(samples) * 1000:>12.1f}{min(samples) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# Load generator for the HTTP billing API (api_server.py).
+# Opens --connections keep-alive connections and sends a mix of product
+# searches, price checks and order saves for --seconds, then reports
+# requests/sec and p50/p99 latency per endpoint. The connections are
+# spread over --processes client processes so the generator itself is not
+# the bottleneck. Without --url it starts
+# a server on a temporary copy of the database (or an empty one seeded
+# with --products products).
+#
+#   python benchmarks/load_api.py --connections 32 --processes 4 --seconds 10
+#   python benchmarks/load_api.py --url 127.0.0.1:8765
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, HERE)
+
+from engine.order_store import OrderStore
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def seed_products(path, count):
+    store = OrderStore(path)
+    with store.conn:
+        store.conn.executemany(
+            "INSERT OR IGNORE INTO products (name, price) VALUES (?, ?)",
+            [(f"Product {i}", 5.0 + i % 200) for i in range(count)]
+        )
+    store.close()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_server(host, port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+            continue
+        writer.close()
+        return
+
+
+async def request(reader, writer, method, path, payload=None):
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n"
+    if payload is not None:
+        head += "Content-Type: application/json\r\n"
+    writer.write(head.encode("latin-1") + b"\r\n" + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+def make_requests(names, rng):
+    # Yields (label, method, path, payload) forever, weighted towards the
+    # calls a till makes most
+    while True:
+        roll = rng.random()
+        if roll < 0.4:
+            query = rng.choice(names)[:rng.randint(1, 6)].lower()
+            yield "search", "GET", f"/products?q={quote(query)}&limit=20", None
+        elif roll < 0.5:
+            yield "product", "GET", f"/products/{quote(rng.choice(names))}", None
+        else:
+            items = [{"product": rng.choice(names), "quantity": rng.randint(1, 3)}
+                     for _ in range(rng.randint(1, 10))]
+            if roll < 0.8:
+                yield "price", "POST", "/price", {"items": items}
+            elif roll < 0.97:
+                yield "order", "POST", "/orders", {"customer_name": "Load", "items": items}
+            else:
+                orders = [{"items": items} for _ in range(20)]
+                yield "order-batch", "POST", "/orders/batch", {"orders": orders}
+
+
+async def connection(host, port, names, seed, deadline, stats):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for label, method, path, payload in make_requests(names, rng):
+            if time.perf_counter() >= deadline:
+                break
+            start = time.perf_counter()
+            status = await request(reader, writer, method, path, payload)
+            latency = time.perf_counter() - start
+            entry = stats.setdefault(label, {"latencies": [], "errors": 0})
+            entry["latencies"].append(latency)
+            if status != 200:
+                entry["errors"] += 1
+    finally:
+        writer.close()
+
+
+async def run(host, port, names, seeds, deadline):
+    stats = {}
+    await asyncio.gather(*[connection(host, port, names, seed, deadline, stats) for seed in seeds])
+    return stats
+
+
+def _client_process(job):
+    host, port, names, seeds, deadline = job
+    return asyncio.run(run(host, port, names, seeds, deadline))
+
+
+def run_clients(host, port, names, connections, processes, seconds):
+    # Returns (merged stats, elapsed seconds)
+    asyncio.run(wait_for_server(host, port))
+    processes = max(1, min(processes, connections))
+    seeds = [list(range(connections))[i::processes] for i in range(processes)]
+    # perf_counter is system-wide on Linux, so every process shares the deadline
+    started = time.perf_counter()
+    deadline = started + seconds
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.map(_client_process, [(host, port, names, part, deadline) for part in seeds])
+    elapsed = time.perf_counter() - started
+    stats = {}
+    for result in results:
+        for label, entry in result.items():
+            merged = stats.setdefault(label, {"latencies": [], "errors": 0})
+            merged["latencies"].extend(entry["latencies"])
+            merged["errors"] += entry["errors"]
+    return stats, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP billing API load generator")
+    parser.add_argument("--url", help="host:port of a running server (default: start one)")
+    parser.add_argument("--db", default=os.path.join(HERE, "billing_system.db"),
+                        help="database to copy for the started server")
+    parser.add_argument("--products", type=int, default=0, help="seed this many products instead of copying --db")
+    parser.add_argument("--connections", type=int, default=16, help="concurrent keep-alive connections")
+    parser.add_argument("--processes", type=int, default=max(1, min(4, (os.cpu_count() or 2) // 2)),
+                        help="client processes sharing the connections")
+    parser.add_argument("--seconds", type=float, default=10.0, help="test duration")
+    args = parser.parse_args()
+
+    server = None
+    tmp = tempfile.mkdtemp()
+    try:
+        if args.url:
+            host, _, port = args.url.rpartition(":")
+            port = int(port)
+            db = args.db
+        else:
+            host, port = "127.0.0.1", free_port()
+            db = os.path.join(tmp, "billing_system.db")
+            if args.products:
+                seed_products(db, args.products)
+            else:
+                shutil.copy(args.db, db)
+            server = subprocess.Popen(
+                [sys.executable, os.path.join(HERE, "api_server.py"), "--db", db, "--port", str(port),
+                 "--terminal", "LOAD"],
+                stderr=subprocess.DEVNULL
+            )
+        conn = sqlite3.connect(db)
+        names = [name for (name,) in conn.execute("SELECT name FROM products")]
+        conn.close()
+        if not names:
+            print("No products to order; use --products N", file=sys.stderr)
+            return 1
+
+        stats, elapsed = run_clients(host, port, names, args.connections, args.processes, args.seconds)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    total = sum(len(entry["latencies"]) for entry in stats.values())
+    errors = sum(entry["errors"] for entry in stats.values())
+    print(f"{args.connections} connections from {args.processes} processes, {elapsed:.1f} s: {total} requests, "
+          f"{total / elapsed:.0f} req/s, {errors} errors")
+    print(f"{'endpoint':<12}{'requests':>10}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for label in sorted(stats):
+        latencies = stats[label]["latencies"]
+        print(f"{label:<12}{len(latencies):>10}{len(latencies) / elapsed:>9.0f}"
+              f"{percentile(latencies, 0.5) * 1000:>9.2f}{percentile(latencies, 0.99) * 1000:>9.2f}"
+              f"{stats[label]['errors']:>8}")
+    all_latencies = [latency for entry in stats.values() for latency in entry["latencies"]]
+    print(f"{'all':<12}{total:>10}{total / elapsed:>9.0f}"
+          f"{percentile(all_latencies, 0.5) * 1000:>9.2f}{percentile(all_latencies, 0.99) * 1000:>9.2f}"
+          f"{errors:>8}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
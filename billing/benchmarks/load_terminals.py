@@ -0,0 +1,185 @@
+# Load test for several tills sharing one billing_system.db.
+# Each till saves orders as fast as it can (or with --think-ms between
+# them); afterwards the database is checked for lost orders and duplicate
+# or missing invoice numbers. Tills are separate processes by default, as
+# on a real counter; --threads runs them as threads sharing a
+# ConnectionPool instead. With --block-size, process tills number their
+# bills from an InvoiceSequence (block pre-allocation) and the invoice
+# audit must find no gaps.
+#
+#   python benchmarks/load_terminals.py --tills 8 --orders 500
+#   python benchmarks/load_terminals.py --tills 16 --threads --pool-size 4
+#   python benchmarks/load_terminals.py --tills 8 --block-size 100
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.invoices import InvoiceSequence, audit
+from engine.order_store import ConnectionPool, OrderStore
+
+
+def make_order(rng, till):
+    items = []
+    for i in range(rng.randint(1, 12)):
+        price = 5.0 + i
+        quantity = rng.randint(1, 3)
+        items.append((f"Product {i}", price, quantity, price * quantity))
+    total = sum(item[3] for item in items)
+    return (f"Customer {till}", "0000000000", total, items, None)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_till(path, till, orders, think, seed, block_size=0):
+    # Returns (saved, failed, latencies in seconds)
+    rng = random.Random(seed)
+    store = OrderStore(path, terminal=f"T{till}")
+    invoices = InvoiceSequence(path, f"T{till}", block_size, conn=store.conn) if block_size else None
+    latencies = []
+    failed = 0
+    try:
+        for _ in range(orders):
+            order = make_order(rng, till)
+            start = time.perf_counter()
+            try:
+                if invoices is not None:
+                    order += (invoices.next(),)
+                store.save_orders([order])
+            except sqlite3.Error:
+                failed += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            if think:
+                time.sleep(think)
+    finally:
+        if invoices is not None:
+            invoices.close()
+        store.close()
+    return len(latencies), failed, latencies
+
+
+def _till_process(args):
+    return run_till(*args)
+
+
+def run_processes(path, tills, orders, think, block_size=0):
+    jobs = [(path, till, orders, think, till, block_size) for till in range(1, tills + 1)]
+    with multiprocessing.Pool(tills) as pool:
+        return pool.map(_till_process, jobs)
+
+
+def run_threads(path, tills, orders, think, pool_size):
+    pool = ConnectionPool(path, size=pool_size)
+    stores = {}
+    stores_lock = threading.Lock()
+    results = [None] * tills
+
+    def till_thread(index):
+        rng = random.Random(index + 1)
+        terminal = f"T{index + 1}"
+        latencies = []
+        failed = 0
+        for _ in range(orders):
+            order = make_order(rng, index + 1)
+            start = time.perf_counter()
+            try:
+                with pool.connection() as conn:
+                    with stores_lock:
+                        store = stores.get(id(conn))
+                        if store is None:
+                            store = stores[id(conn)] = OrderStore(path, conn=conn)
+                    store.save_orders([order], terminal=terminal)
+            except sqlite3.Error:
+                failed += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            if think:
+                time.sleep(think)
+        results[index] = (len(latencies), failed, latencies)
+
+    threads = [threading.Thread(target=till_thread, args=(i,)) for i in range(tills)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pool.close()
+    return results
+
+
+def check(path, tills, expected):
+    # Returns a list of problems found in the saved orders
+    conn = sqlite3.connect(path)
+    problems = []
+    count, distinct = conn.execute("SELECT COUNT(*), COUNT(DISTINCT invoice_no) FROM orders").fetchone()
+    if count != expected:
+        problems.append(f"expected {expected} orders, found {count}")
+    if distinct != count:
+        problems.append(f"{count - distinct} duplicate invoice numbers")
+    for till in range(1, tills + 1):
+        terminal = f"T{till}"
+        numbers = [int(invoice_no.rsplit("-", 1)[1]) for (invoice_no,) in conn.execute(
+            "SELECT invoice_no FROM orders WHERE terminal = ?", (terminal,))]
+        if sorted(numbers) != list(range(1, len(numbers) + 1)):
+            problems.append(f"{terminal}: invoice numbers are not 1..{len(numbers)}")
+    for entry in audit(conn):
+        if entry["missing"]:
+            problems.append(f"{entry['terminal']}: audit found {entry['missing']} missing invoice numbers")
+    conn.close()
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent tills saving to one database")
+    parser.add_argument("--tills", type=int, default=8, help="number of concurrent tills")
+    parser.add_argument("--orders", type=int, default=300, help="orders saved by each till")
+    parser.add_argument("--think-ms", type=float, default=0, help="pause between a till's orders")
+    parser.add_argument("--threads", action="store_true", help="run tills as threads sharing a connection pool")
+    parser.add_argument("--pool-size", type=int, default=4, help="connections in the pool (--threads)")
+    parser.add_argument("--block-size", type=int, default=0,
+                        help="reserve invoice numbers in blocks of this size (0: one per save)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "billing_system.db")
+        OrderStore(path).close()
+        think = args.think_ms / 1000
+        start = time.perf_counter()
+        if args.threads:
+            results = run_threads(path, args.tills, args.orders, think, args.pool_size)
+        else:
+            results = run_processes(path, args.tills, args.orders, think, args.block_size)
+        elapsed = time.perf_counter() - start
+
+        saved = sum(result[0] for result in results)
+        failed = sum(result[1] for result in results)
+        latencies = [latency for result in results for latency in result[2]]
+        problems = check(path, args.tills, saved)
+
+    mode = f"threads, pool of {args.pool_size}" if args.threads else "processes"
+    if args.block_size and not args.threads:
+        mode += f", invoice blocks of {args.block_size}"
+    print(f"{args.tills} tills ({mode}), {args.orders} orders each")
+    print(f"saved {saved}, failed {failed} in {elapsed:.2f} s ({saved / elapsed:.0f} orders/s)")
+    print(f"save latency p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms, "
+          f"max {max(latencies, default=0) * 1000:.1f} ms")
+    for problem in problems:
+        print(f"PROBLEM: {problem}")
+    return 1 if problems or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,415 @@
+# Benchmark suite for the till's hot paths, on synthetic catalogs and carts.
+# Each case times the engine code behind one BillingSystem method:
+#
+#   get_product_price    ProductCache.get_price (100 lookups per sample)
+#   autocomplete         ProductSearch.search for typed prefixes/substrings
+#   catalog_load         ProductCache bulk load of the products table
+#   search_index         ProductSearch.build over every product name
+#   add_to_cart          BillingEngine.add_item into a cart of up to N lines
+#   update_cart_display  CartView refresh after one line changes, and a
+#                        full redraw (needs Tk; see below)
+#   generate_bill        text receipt for an N-line cart
+#   save_order           OrderStore.save_order of an N-line cart
+#
+# Results (ops/sec and p50/p95/p99 latency per case) are printed and can be
+# written to JSON; --compare checks them against an earlier JSON run and
+# exits 1 if any case's median latency got more than --threshold percent
+# worse (the median is far steadier from run to run than the mean).
+#
+#   python benchmarks/suite.py --json results.json
+#   python benchmarks/suite.py --catalogs 1000,100000,1000000 --carts 1,100,5000
+#   python benchmarks/suite.py --save-baseline benchmarks/baseline.json
+#   python benchmarks/suite.py --compare benchmarks/baseline.json
+#
+# The Tk cases run on $DISPLAY, or on a private Xvfb server if there is no
+# display and Xvfb is installed; otherwise they are reported as skipped.
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, HERE)
+
+from engine.billing import BillingEngine
+from engine.order_store import OrderStore, connect
+from engine.price_cache import ProductCache
+from engine.search import ProductSearch
+
+WORDS = (
+    "Apple Basmati Butter Cheese Chilli Coconut Coffee Cotton Dal Detergent Ghee Ginger Honey "
+    "Jaggery Lentil Mango Masala Milk Mustard Notebook Oil Paneer Pen Pencil Pickle Rice Salt "
+    "Shampoo Soap Sugar Tea Tomato Toothpaste Turmeric Wheat"
+).split()
+SIZES = ("100g", "250g", "500g", "1kg", "5kg", "200ml", "1L", "Pack of 6", "Single")
+SLABS = (None, 0, 5, 12, 18, 28)
+
+
+def percentile(values, fraction):
+    # values must be sorted
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Sampler:
+    # Collects per-sample latencies until `seconds` have passed (and at
+    # least min_samples were taken) or max_samples is reached
+    def __init__(self, seconds, min_samples=5, max_samples=100000):
+        self.seconds = seconds
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.samples = []
+        self.ops = 0
+        self.started = time.perf_counter()
+
+    def done(self):
+        count = len(self.samples)
+        return count >= self.max_samples or (
+            count >= self.min_samples and time.perf_counter() - self.started >= self.seconds)
+
+    def time(self, func, *args, ops=1):
+        start = time.perf_counter()
+        result = func(*args)
+        self.samples.append((time.perf_counter() - start) / ops)
+        self.ops += ops
+        return result
+
+    def result(self):
+        samples = sorted(self.samples)
+        busy = sum(self.samples)
+        return {
+            "ops": self.ops,
+            "samples": len(samples),
+            "ops_per_sec": len(samples) / busy if busy else 0.0,
+            "p50_us": percentile(samples, 0.50) * 1e6,
+            "p95_us": percentile(samples, 0.95) * 1e6,
+            "p99_us": percentile(samples, 0.99) * 1e6,
+            "max_us": samples[-1] * 1e6 if samples else 0.0,
+        }
+
+
+def product_names(count):
+    # Distinct, realistic-looking names so search sees real prefix overlap
+    rng = random.Random(count)
+    names = []
+    for i in range(count):
+        names.append(f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(SIZES)} {i}")
+    return names
+
+
+def seed_catalog(path, count):
+    rng = random.Random(7)
+    store = OrderStore(path)
+    with store.conn:
+        store.conn.executemany(
+            "INSERT INTO products (name, price, tax_slab) VALUES (?, ?, ?)",
+            ((name, round(rng.uniform(5, 2000), 2), rng.choice(SLABS)) for name in product_names(count))
+        )
+    store.close()
+
+
+# Cases. Each takes (context, sampler) and loops until sampler.done().
+
+def bench_get_product_price(ctx, sampler):
+    cache = ctx["cache"]
+    rng = random.Random(1)
+    names = ctx["names"]
+    lookups = [rng.choice(names) for _ in range(900)] + [f"Missing {i}" for i in range(100)]
+    rng.shuffle(lookups)
+
+    def lookup_batch(batch):
+        get_price = cache.get_price
+        for name in batch:
+            get_price(name)
+
+    while not sampler.done():
+        start = rng.randrange(len(lookups) - 100)
+        sampler.time(lookup_batch, lookups[start:start + 100], ops=100)
+
+
+def bench_autocomplete(ctx, sampler):
+    search = ctx["search"]
+    rng = random.Random(2)
+    names = ctx["names"]
+    queries = []
+    for _ in range(500):
+        name = rng.choice(names).lower()
+        start = 0 if rng.random() < 0.7 else rng.randrange(len(name) - 3)
+        queries.append(name[start:start + rng.randint(1, 8)])
+    while not sampler.done():
+        sampler.time(search.search, rng.choice(queries), 20)
+
+
+def bench_catalog_load(ctx, sampler):
+    conn = ctx["conn"]
+    while not sampler.done():
+        sampler.time(ProductCache, conn)
+
+
+def bench_search_index(ctx, sampler):
+    search = ProductSearch()
+    names = ctx["names"]
+    while not sampler.done():
+        sampler.time(search.build, names)
+
+
+def bench_add_to_cart(ctx, sampler):
+    lines = ctx["lines"]
+    engine = BillingEngine(ctx["cache"])
+    rng = random.Random(3)
+    names = ctx["names"]
+    while not sampler.done():
+        if len(engine.cart) >= lines:
+            engine.reset()
+        # Mostly new lines, some repeat scans of a product already in the cart
+        if engine.cart and rng.random() < 0.2:
+            name = next(iter(engine.cart)).product
+        else:
+            name = rng.choice(names)
+        sampler.time(engine.add_item, name, 1)
+
+
+def build_engine(ctx, store=None):
+    engine = BillingEngine(ctx["cache"], store)
+    fill_cart(ctx, engine)
+    return engine
+
+
+def fill_cart(ctx, engine):
+    for name in random.Random(4).sample(ctx["names"], ctx["lines"]):
+        engine.add_item(name, 2)
+    engine.customer_name = "Bench"
+    engine.set_paid(engine.cart.total)
+
+
+def bench_generate_bill(ctx, sampler):
+    engine = build_engine(ctx)
+    now = datetime(2024, 1, 1, 12, 0)
+    while not sampler.done():
+        sampler.time(engine.receipt, 1, now)
+
+
+def bench_save_order(ctx, sampler):
+    store = OrderStore(ctx["db"])
+    engine = build_engine(ctx, store)
+    try:
+        while not sampler.done():
+            sampler.time(engine.save)
+            # Ring the same cart up again as a new sale (untimed)
+            engine.reset()
+            fill_cart(ctx, engine)
+    finally:
+        store.close()
+
+
+def bench_update_cart_display(ctx, sampler):
+    from tkinter import ttk
+    from cart_view import CartView
+
+    root = ctx["tk"]
+    engine = build_engine(ctx)
+    tree = ttk.Treeview(root, columns=("Product", "Price", "Quantity", "Total"), show="headings")
+    view = CartView(root, tree, engine.cart)
+    view.reset()
+    root.update_idletasks()
+    products = [item.product for item in engine.cart]
+    rng = random.Random(5)
+
+    # The view applies changes from an idle callback, as in the window
+    def change(product):
+        engine.set_quantity(product, rng.randint(1, 9))
+        view.changed(product)
+        root.update_idletasks()
+
+    try:
+        while not sampler.done():
+            sampler.time(change, rng.choice(products))
+    finally:
+        tree.destroy()
+
+
+def bench_cart_redraw(ctx, sampler):
+    from tkinter import ttk
+    from cart_view import CartView
+
+    root = ctx["tk"]
+    engine = build_engine(ctx)
+    tree = ttk.Treeview(root, columns=("Product", "Price", "Quantity", "Total"), show="headings")
+    view = CartView(root, tree, engine.cart)
+
+    def redraw():
+        view.reset()
+        root.update_idletasks()
+
+    try:
+        while not sampler.done():
+            sampler.time(redraw)
+    finally:
+        tree.destroy()
+
+
+# (name, function, uses catalog size, uses cart size, needs Tk, min samples)
+CASES = [
+    ("get_product_price", bench_get_product_price, True, False, False, 20),
+    ("autocomplete", bench_autocomplete, True, False, False, 20),
+    ("catalog_load", bench_catalog_load, True, False, False, 3),
+    ("search_index", bench_search_index, True, False, False, 2),
+    ("add_to_cart", bench_add_to_cart, True, True, False, 20),
+    ("update_cart_display", bench_update_cart_display, False, True, True, 10),
+    ("cart_redraw", bench_cart_redraw, False, True, True, 3),
+    ("generate_bill", bench_generate_bill, False, True, False, 10),
+    ("save_order", bench_save_order, False, True, False, 10),
+]
+
+
+def start_display():
+    # Returns (Tk root or None, Xvfb process or None, reason if no Tk)
+    xvfb = None
+    if not os.environ.get("DISPLAY") and shutil.which("Xvfb"):
+        display = f":{random.randint(100, 999)}"
+        xvfb = subprocess.Popen(["Xvfb", display, "-nolisten", "tcp"],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        os.environ["DISPLAY"] = display
+        time.sleep(0.5)
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        root.withdraw()
+        return root, xvfb, None
+    except Exception as e:
+        if xvfb is not None:
+            xvfb.terminate()
+        return None, None, str(e).splitlines()[0] if str(e) else type(e).__name__
+
+
+def compare(results, baseline, threshold):
+    # Prints each case against the baseline; returns the regressed keys
+    regressions = []
+    print(f"\n{'case':<44}{'base ops/s':>12}{'ops/s':>12}{'base p50':>11}{'p50 us':>10}{'change':>9}")
+    for key, current in results.items():
+        old = baseline.get(key)
+        if old is None or not old.get("p50_us") or not current["p50_us"]:
+            continue
+        # Positive is faster
+        change = (old["p50_us"] / current["p50_us"] - 1) * 100
+        flag = ""
+        if change < -threshold:
+            regressions.append(key)
+            flag = "  SLOWER"
+        elif change > threshold:
+            flag = "  faster"
+        print(f"{key:<44}{old['ops_per_sec']:>12.1f}{current['ops_per_sec']:>12.1f}"
+              f"{old['p50_us']:>11.1f}{current['p50_us']:>10.1f}{change:>+8.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Billing hot-path benchmark suite")
+    parser.add_argument("--catalogs", default="1000,100000", help="comma-separated catalog sizes")
+    parser.add_argument("--carts", default="1,100,5000", help="comma-separated cart sizes (lines)")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time budget per case")
+    parser.add_argument("--only", help="comma-separated case names to run")
+    parser.add_argument("--no-gui", action="store_true", help="skip the Tk cases")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--save-baseline", help="write results to this file as the new baseline")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="percent slowdown of the median that counts as a regression")
+    args = parser.parse_args()
+
+    catalogs = sorted(int(size) for size in args.catalogs.split(","))
+    carts = sorted(int(size) for size in args.carts.split(","))
+    only = set(args.only.split(",")) if args.only else None
+    cases = [case for case in CASES if only is None or case[0] in only]
+
+    root = xvfb = None
+    gui_error = "--no-gui"
+    if not args.no_gui and any(case[4] for case in cases):
+        root, xvfb, gui_error = start_display()
+
+    results = {}
+    skipped = {}
+    tmp = tempfile.mkdtemp()
+    try:
+        for size in catalogs:
+            db = os.path.join(tmp, f"catalog_{size}.db")
+            start = time.perf_counter()
+            seed_catalog(db, size)
+            conn = connect(db)
+            cache = ProductCache(conn)
+            ctx = {
+                "db": db,
+                "conn": conn,
+                "cache": cache,
+                "names": cache.names(),
+                "search": ProductSearch(cache.names()),
+                "tk": root,
+            }
+            print(f"catalog of {size} products ready in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+            for name, func, by_catalog, by_cart, needs_tk, min_samples in cases:
+                # Cases that do not depend on the catalog run once, on the
+                # largest catalog
+                if not by_catalog and size != catalogs[-1]:
+                    continue
+                for lines in (carts if by_cart else [None]):
+                    if lines is not None and lines > size:
+                        continue
+                    key = name + (f"[catalog={size}]" if by_catalog else "") + (f"[lines={lines}]" if by_cart else "")
+                    if needs_tk and root is None:
+                        skipped[key] = gui_error
+                        continue
+                    sampler = Sampler(args.seconds, min_samples)
+                    func(dict(ctx, lines=lines), sampler)
+                    results[key] = result = sampler.result()
+                    print(f"{key:<44}{result['ops_per_sec']:>12.1f} ops/s  p50 {result['p50_us']:>10.1f} us"
+                          f"  p99 {result['p99_us']:>10.1f} us")
+            conn.close()
+    finally:
+        if root is not None:
+            root.destroy()
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    for key, reason in skipped.items():
+        print(f"{key:<44}skipped: {reason}")
+
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "catalogs": catalogs,
+            "carts": carts,
+            "seconds": args.seconds,
+        },
+        "results": results,
+        "skipped": skipped,
+    }
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) more than {args.threshold:g}% slower than {args.compare}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
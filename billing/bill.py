@@ -1,11 +1,22 @@
 import tkinter as tk
 from tkinter import messagebox, filedialog
-import pandas as pd
 from tkinter import ttk
-from datetime import datetime
+from engine import BillingEngine, CartJournal, DebouncedSearch, ProductCatalog, ProductSearch, render_simple_receipt
+from engine.printing import PrintSpooler, printer_from_env
+from engine.tasks import run_in_background
 
-# Load product data from Excel
-df = pd.read_excel("products.xlsx")
+# Product data from Excel, indexed in memory; it is loaded in the background
+# once the window is up (see catalog_loaded below)
+catalog = ProductCatalog("products.xlsx", autoload=False)
+product_search = ProductSearch()
+
+# Cart changes are journaled so a crash mid-sale loses nothing; Reset
+# starts a new bill and empties the journal
+journal = CartJournal("bill_cart.journal")
+recovered, unsaved = journal.recover()
+
+# Billing engine holding the cart; this counter charges no tax
+engine = BillingEngine(catalog, tax_rate=0, journal=journal)
 
 # Create main window
 root = tk.Tk()
@@ -13,8 +24,12 @@ root.title("Advanced Billing Software")
 root.geometry("1400x1000")
 root.config(padx=50, pady=50)
 
+# Receipt printer from $BILLING_PRINTER; without one, bills are saved as .txt
+printer = printer_from_env()
+print_spooler = PrintSpooler(root, *printer) if printer else None
+
 # Define variables
-cart = []  # List to store multiple products
+cart = engine.cart  # Products in the cart, keyed by name
 total_var = tk.StringVar(value="0.00")
 balance_var = tk.StringVar(value="0.00")
 bill_text = tk.StringVar()
@@ -26,23 +41,20 @@ paid_amount_var = tk.DoubleVar(value=0)
 
 # Function to auto-fill price based on product name
 def update_price(*args):
-    product = product_var.get().strip().lower()
-    match = df[df['Product'].str.lower() == product]
-    if not match.empty:
-        price_var.set(str(match.iloc[0]['Price']))
+    price = catalog.get_price(product_var.get())
+    if price is not None:
+        price_var.set(str(price))
     else:
         price_var.set("")
 
 # Function to add product to cart
 def add_to_cart():
     try:
-        product = product_var.get().strip()
-        price = float(price_var.get())
         qty = quantity_var.get()
-        if not product or qty <= 0:
+        if product_var.get() not in catalog or qty <= 0:
             messagebox.showerror("Input Error", "Please select a valid product and quantity.", parent=root)
             return
-        cart.append({"Product": product, "Price": price, "Quantity": qty})
+        engine.add_item(product_var.get(), qty)
         update_cart_display()
         clear_inputs()
     except ValueError:
@@ -57,7 +69,7 @@ def clear_inputs():
 
 # Function to update cart display
 def update_cart_display():
-    cart_text = "\n".join([f"{item['Product']} - Qty: {item['Quantity']} - ₹{item['Price']*item['Quantity']:.2f}" for item in cart])
+    cart_text = "\n".join([f"{item.product} - Qty: {item.quantity} - ₹{item.total:.2f}" for item in cart])
     cart_display.config(state="normal")
     cart_display.delete(1.0, tk.END)
     cart_display.insert(tk.END, cart_text or "No items in cart")
@@ -72,38 +84,14 @@ def calculate_total():
             messagebox.showerror("Input Error", "Discount and paid amount cannot be negative.", parent=root)
             return
 
-        subtotal = sum(item["Price"] * item["Quantity"] for item in cart)
-        discounted_total = subtotal - (subtotal * discount / 100)
-        balance = paid - discounted_total
+        engine.set_discount(discount)
+        engine.set_paid(paid)
 
-        total_var.set(f"{discounted_total:.2f}")
-        balance_var.set(f"{balance:.2f}")
+        total_var.set(f"{cart.total:.2f}")
+        balance_var.set(f"{engine.balance:.2f}")
 
         # Generate bill with date and time
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        bill = (
-            f"{'='*40}\n"
-            f"{'BILL RECEIPT':^40}\n"
-            f"{'='*40}\n"
-            f"Date & Time: {current_time}\n"
-            f"{'-'*40}\n"
-        )
-        for item in cart:
-            bill += (
-                f"Product    : {item['Product']}\n"
-                f"Quantity   : {item['Quantity']}\n"
-                f"Price/unit : ₹{item['Price']:.2f}\n"
-                f"Subtotal   : ₹{item['Price'] * item['Quantity']:.2f}\n"
-                f"{'-'*40}\n"
-            )
-        bill += (
-            f"Discount   : {discount:.2f}%\n"
-            f"Total      : ₹{discounted_total:.2f}\n"
-            f"Paid Amount: ₹{paid:.2f}\n"
-            f"Balance    : ₹{balance:.2f}\n"
-            f"{'='*40}\n"
-            f"Thank you for your purchase!\n"
-        )
+        bill = render_simple_receipt(cart, engine.paid, engine.balance)
         bill_text.set(bill)
     except Exception as e:
         messagebox.showerror("Calculation Error", str(e), parent=root)
@@ -113,6 +101,12 @@ def print_bill():
     if not cart:
         messagebox.showerror("Error", "Cart is empty. Add products to generate a bill.", parent=root)
         return
+    if print_spooler is not None:
+        print_spooler.submit(
+            bill_text.get(),
+            on_error=lambda e: messagebox.showerror("Print Error", str(e), parent=root)
+        )
+        return
     file = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text Files", "*.txt")])
     if file:
         with open(file, "w") as f:
@@ -121,7 +115,7 @@ def print_bill():
 
 # Function to reset all fields
 def reset_all():
-    cart.clear()
+    engine.reset()
     update_cart_display()
     clear_inputs()
     discount_var.set(0)
@@ -146,21 +140,59 @@ ttk.Label(input_frame, text="Product Name").pack()
 product_entry = ttk.Entry(input_frame, textvariable=product_var)
 product_entry.pack(pady=5)
 product_var.trace_add("write", update_price)
-product_list = df['Product'].tolist()
 
 product_dropdown = ttk.Combobox(input_frame, textvariable=product_var)
-product_dropdown['values'] = product_list
+product_dropdown['values'] = product_search.search("")
 product_dropdown.set("Type or Select Product")
 product_dropdown.pack(pady=5)
 
-def on_keyrelease(event):
-    value = product_dropdown.get().lower()
-    filtered = [item for item in product_list if value in item.lower()]
+def show_matches(filtered):
     product_dropdown['values'] = filtered
 
+product_matcher = DebouncedSearch(root, product_search, show_matches)
+
+def on_keyrelease(event):
+    product_matcher.schedule(product_dropdown.get())
+
 product_dropdown.bind("<KeyRelease>", on_keyrelease)
 product_dropdown.bind("6912ComboboxSelected>>", update_price)
 
+# Load the catalog (or reload it if products.xlsx changed) and index its
+# names for search; runs on a worker thread and returns the new index, or
+# None when nothing changed
+def load_catalog(refresh=False):
+    if refresh:
+        if not catalog.refresh():
+            return None
+    else:
+        catalog.load()
+    return ProductSearch(catalog.names)
+
+# Swap in the new search index on the Tk thread
+def catalog_loaded(search):
+    global product_search
+    if search is not None:
+        product_search = product_matcher.engine = search
+        product_matcher.reset()
+        product_dropdown['values'] = search.search("")
+        update_price()
+    root.after(5000, refresh_catalog)
+
+# Reload the catalog when products.xlsx changes on disk
+def refresh_catalog():
+    run_in_background(root, lambda: load_catalog(refresh=True), catalog_loaded, refresh_failed)
+
+def catalog_failed(error):
+    messagebox.showerror("Catalog Error", f"Could not load products.xlsx: {error}", parent=root)
+
+def refresh_failed(error):
+    # Usually a workbook caught half-saved; the old catalog stays in use
+    # and the next check tries again
+    root.after(5000, refresh_catalog)
+
+# Show the window first; parse products.xlsx (or its snapshot) off the Tk thread
+run_in_background(root, load_catalog, catalog_loaded, catalog_failed)
+
 ttk.Label(input_frame, text="Price (₹)").pack()
 ttk.Entry(input_frame, textvariable=price_var, state="readonly").pack(pady=5)
 
@@ -200,4 +232,19 @@ button_frame.grid(row=1, column=0, columnspan=2, pady=20)
 ttk.Button(button_frame, text="Print Bill", command=print_bill).pack(side="left", padx=10)
 ttk.Button(button_frame, text="Reset", command=reset_all).pack(side="left", padx=10)
 
+# Bring back the bill that was open when the program last stopped
+if recovered:
+    engine.restore(recovered)
+    discount_var.set(float(cart.discount_percent))
+    update_cart_display()
+
+# Finish queued print jobs before exiting
+def on_close():
+    if print_spooler is not None:
+        print_spooler.close()
+    journal.close()
+    root.destroy()
+
+root.protocol("WM_DELETE_WINDOW", on_close)
+
 root.mainloop()
\ No newline at end of file
@@ -0,0 +1,65 @@
+import itertools
+
+
+# Keeps a ttk.Treeview in sync with a Cart by row IIDs keyed on product.
+# Changed products are marked dirty and applied once per event-loop tick,
+# touching only the rows that were inserted, updated or removed.
+class CartView:
+    def __init__(self, root, treeview, cart):
+        self.root = root
+        self.treeview = treeview
+        self.cart = cart
+        self._iids = {}
+        self._products = {}
+        self._dirty = set()
+        self._pending = None
+        self._counter = itertools.count(1)
+
+    def product_for(self, iid):
+        return self._products.get(iid)
+
+    def changed(self, product):
+        self._dirty.add(product)
+        if self._pending is None:
+            self._pending = self.root.after_idle(self.refresh)
+
+    def refresh(self):
+        self._pending = None
+        dirty, self._dirty = self._dirty, set()
+        for product in dirty:
+            item = self.cart.get(product)
+            iid = self._iids.get(product)
+            if item is None:
+                if iid is not None:
+                    self.treeview.delete(iid)
+                    del self._iids[product]
+                    del self._products[iid]
+            elif iid is None:
+                iid = f"line{next(self._counter)}"
+                self.treeview.insert("", "end", iid=iid, values=self._values(item))
+                self._iids[product] = iid
+                self._products[iid] = product
+            else:
+                self.treeview.item(iid, values=self._values(item))
+
+    def reset(self):
+        # Drop every row, e.g. after the cart was cleared
+        if self._pending is not None:
+            self.root.after_cancel(self._pending)
+            self._pending = None
+        self._dirty.clear()
+        if self._iids:
+            self.treeview.delete(*self._iids.values())
+        self._iids.clear()
+        self._products.clear()
+        for item in self.cart:
+            self.changed(item.product)
+
+    @staticmethod
+    def _values(item):
+        return (
+            item.product,
+            f"{item.price:.2f}",
+            item.quantity,
+            f"{item.total:.2f}"
+        )
@@ -0,0 +1,14 @@
+# Headless billing engine shared by the Tk front-ends (bill.py, temp.py),
+# batch jobs and benchmarks. Nothing in this package imports tkinter.
+from .billing import BillingEngine
+from .cart import Cart, LineItem, TAX_RATE, to_money
+from .catalog import ProductCatalog
+from .invoices import InvoiceSequence
+from .journal import CartJournal, journal_path
+from .metrics import MainLoopMonitor, Metrics, metrics_from_env
+from .order_store import ConnectionPool, OrderStore, connect, database_from_env, terminal_from_env
+from .order_writer import OrderWriter
+from .price_cache import ProductCache
+from .promotions import PromotionIndex, load_promotions
+from .receipt import TEMPLATES, render_receipt, render_simple_receipt
+from .search import DebouncedSearch, ProductSearch, MAX_RESULTS
@@ -0,0 +1,434 @@
+import asyncio
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from .batch import price_order
+from .billing import BillingEngine
+from .cart import TAX_RATE, to_money
+from .order_store import ConnectionPool, OrderStore, connect
+from .price_cache import ProductCache
+from .receipt import TEMPLATES, render_receipt
+from .search import MAX_RESULTS, ProductSearch
+
+
+# Local HTTP/JSON service for front-ends other than the Tk window (web or
+# mobile tills, a barcode kiosk). Requests are parsed on one asyncio loop
+# with keep-alive connections; pricing runs on the loop against a warm
+# ProductCache, and saves go to a thread pool whose workers take their
+# connection from a ConnectionPool. Money is returned as strings ("12.50")
+# so no precision is lost.
+#
+#   GET  /health
+#   GET  /metrics                      request and SQLite timings (--metrics)
+#   GET  /products?q=pen&limit=20      name search
+#   GET  /products/<name>              price of one product
+#   POST /price        {"items": [{"product": "Pen", "quantity": 2}], "discount": 0}
+#   POST /price/batch  {"orders": [<order>, ...]}
+#   POST /orders       <order> + "customer_name", "customer_contact", "paid",
+#                      "terminal", "receipt": "text" | "thermal80" | ...
+#   POST /orders/batch {"orders": [<order>, ...], "terminal": ...}   saved in one transaction
+#
+#   python api_server.py --port 8765 --db billing_system.db --terminal WEB
+
+
+MAX_BODY = 4 * 1024 * 1024
+# Paths timed under their own name; anything else is counted as api.other
+METRIC_ROUTES = {"/health", "/metrics", "/products", "/price", "/price/batch", "/orders", "/orders/batch"}
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _money(value):
+    return f"{value:.2f}"
+
+
+def _read_order(data):
+    # Validates a JSON order into the dict shape batch.price_order expects
+    if not isinstance(data, dict) or not isinstance(data.get("items"), list):
+        raise HttpError(400, "order needs an 'items' list")
+    if not data["items"]:
+        raise HttpError(400, "order has no items")
+    try:
+        items = [(item["product"], int(item.get("quantity", 1))) for item in data["items"]]
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        raise HttpError(400, f"invalid item: {e}")
+    return {
+        "customer_name": str(data.get("customer_name", "")),
+        "customer_contact": str(data.get("customer_contact", "")),
+        "discount": _discount(data.get("discount", 0)),
+        "items": items,
+    }
+
+
+def _discount(value):
+    # A percent from 0 to 100, as the pricing pass accepts
+    try:
+        if isinstance(value, bool):
+            raise InvalidOperation
+        percent = Decimal(str(value))
+    except InvalidOperation:
+        raise HttpError(400, f"discount must be a number: {value!r}")
+    if not percent.is_finite() or not 0 <= percent <= 100:
+        raise HttpError(400, f"discount must be a percent from 0 to 100: {value!r}")
+    return percent
+
+
+def _paid(value):
+    try:
+        return to_money(value)
+    except (ArithmeticError, TypeError, ValueError):
+        raise HttpError(400, "paid must be a number")
+
+
+def _cart_json(cart):
+    result = {
+        "items": [
+            {"product": item.product, "price": _money(item.price), "quantity": item.quantity,
+             "total": _money(item.total)}
+            for item in cart
+        ],
+        "subtotal": _money(cart.subtotal),
+        "discount": _money(cart.discount),
+        "tax": _money(cart.tax),
+        "total": _money(cart.total),
+    }
+    if cart.promotion:
+        result["promotions"] = [{"name": name, "amount": _money(amount)} for name, amount in cart.promotions()]
+    if cart.coupon:
+        result["coupon"] = {"code": cart.coupon_code, "amount": _money(cart.coupon)}
+    return result
+
+
+class BillingService:
+    def __init__(self, path="billing_system.db", pool_size=4, terminal=None, tax_rate=TAX_RATE, metrics=None):
+        self.path = path
+        self.terminal = terminal
+        self.tax_rate = tax_rate
+        self.metrics = metrics
+        # Migrate once up front; pooled connections then open quickly
+        OrderStore(path).close()
+        self.pool = ConnectionPool(path, size=pool_size)
+        self.executor = ThreadPoolExecutor(pool_size, thread_name_prefix="billing-api")
+        self._stores = {}
+        # The catalog connection is only used on the event loop thread
+        self.prices = ProductCache(connect(path))
+        self.engine = BillingEngine(self.prices, tax_rate=tax_rate)
+        # Build the search index now rather than on the first request;
+        # after a catalog change it is rebuilt on the pool (see _refresh_search)
+        self.search = ProductSearch(self.prices.names())
+        self._search_generation = self.prices.generation
+        self._search_build = None
+
+    def close(self):
+        self.executor.shutdown()
+        self.pool.close()
+        self.prices.conn.close()
+
+    # Requests
+
+    async def handle(self, method, path, query, body):
+        if self.metrics is None:
+            return await self._route(method, path, query, body)
+        if path.startswith("/products/"):
+            label = "api./products/<name>"
+        else:
+            label = f"api.{path}" if path in METRIC_ROUTES else "api.other"
+        start = time.perf_counter()
+        try:
+            return await self._route(method, path, query, body)
+        finally:
+            self.metrics.record(label, time.perf_counter() - start)
+
+    async def _route(self, method, path, query, body):
+        if path == "/health":
+            return {"status": "ok", "products": len(self.prices.names())}
+        if path == "/metrics" and self.metrics is not None:
+            return self.metrics.snapshot()
+        if path == "/products" and method == "GET":
+            return self.find_products(query)
+        if path.startswith("/products/") and method == "GET":
+            return self.product(unquote(path[len("/products/"):]))
+        routes = {
+            "/price": self.price,
+            "/price/batch": self.price_batch,
+            "/orders": self.save_order,
+            "/orders/batch": self.save_orders,
+        }
+        handler = routes.get(path)
+        if handler is None:
+            raise HttpError(404, f"no route for {path}")
+        if method != "POST":
+            raise HttpError(405, f"{path} expects POST")
+        return await handler(body)
+
+    def find_products(self, query):
+        self._refresh_search()
+        text = query.get("q", [""])[0]
+        try:
+            limit = min(int(query.get("limit", [20])[0]), MAX_RESULTS)
+        except ValueError:
+            raise HttpError(400, "limit must be a number")
+        if limit < 1:
+            raise HttpError(400, "limit must be at least 1")
+        return {"products": [
+            {"product": name, "price": _money(self.prices.get_price(name) or 0)}
+            for name in self.search.search(text, limit)
+        ]}
+
+    def _refresh_search(self):
+        # After a catalog change the index is rebuilt on a pool thread
+        # (seconds for a large catalog); requests keep using the old one
+        # until the new one is swapped in on the loop
+        generation = self.prices.check()
+        if generation == self._search_generation or self._search_build is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._search_build = loop.run_in_executor(self.executor, ProductSearch, self.prices.names())
+        self._search_build.add_done_callback(lambda future: self._search_built(generation, future))
+
+    def _search_built(self, generation, future):
+        self._search_build = None
+        if not future.cancelled() and future.exception() is None:
+            self.search = future.result()
+            self._search_generation = generation
+
+    def product(self, name):
+        try:
+            product, price = self.engine.resolve(name)
+        except ValueError as e:
+            raise HttpError(404, str(e))
+        return {"product": product, "price": _money(price)}
+
+    def _price(self, data):
+        order = _read_order(data)
+        try:
+            return order, price_order(self.engine, order, self.tax_rate)
+        except InvalidOperation:
+            # Its message is just the signal's class name
+            raise HttpError(400, "order has a value that is not a number")
+        except (ValueError, ArithmeticError) as e:
+            raise HttpError(400, str(e))
+
+    async def price(self, data):
+        order, cart = self._price(data)
+        return _cart_json(cart)
+
+    async def price_batch(self, data):
+        results = []
+        for entry in self._orders(data):
+            try:
+                results.append(_cart_json(self._price(entry)[1]))
+            except HttpError as e:
+                results.append({"error": str(e)})
+        return {"results": results}
+
+    async def save_order(self, data):
+        if not isinstance(data, dict):
+            raise HttpError(400, "expected a JSON object")
+        result = await self._save([data], data.get("terminal"))
+        if "error" in result[0]:
+            raise HttpError(400, result[0]["error"])
+        return result[0]
+
+    async def save_orders(self, data):
+        return {"results": await self._save(self._orders(data), data.get("terminal"))}
+
+    def _orders(self, data):
+        if not isinstance(data, dict) or not isinstance(data.get("orders"), list):
+            raise HttpError(400, "expected {\"orders\": [...]}")
+        return data["orders"]
+
+    async def _save(self, entries, terminal=None):
+        # Prices every order on the loop, then saves the valid ones in one
+        # transaction on a pool thread; results keep the request's order
+        terminal = terminal or self.terminal
+        results = []
+        pending = []
+        for data in entries:
+            try:
+                order, cart = self._price(data)
+                paid = cart.total if data.get("paid") is None else _paid(data["paid"])
+            except HttpError as e:
+                results.append({"error": str(e)})
+                continue
+            pending.append((len(results), data, order, cart, paid))
+            results.append(None)
+        if not pending:
+            return results
+
+        now = datetime.now()
+        rows = [
+            (order["customer_name"], order["customer_contact"], cart.total,
+             [(item.product, item.price, item.quantity, item.total) for item in cart],
+             now.strftime("%Y-%m-%d %H:%M:%S"), None, cart.tax, cart.savings)
+            for index, data, order, cart, paid in pending
+        ]
+        loop = asyncio.get_running_loop()
+        saved = await loop.run_in_executor(self.executor, self._write, rows, terminal)
+
+        for (index, data, order, cart, paid), (order_id, invoice_no) in zip(pending, saved):
+            result = {"order_id": order_id, "invoice_no": invoice_no}
+            result.update(_cart_json(cart))
+            template = data.get("receipt")
+            if template:
+                if template not in TEMPLATES:
+                    template = "text"
+                result["receipt"] = render_receipt(
+                    cart, order["customer_name"], order["customer_contact"], paid, paid - cart.total,
+                    invoice_no=invoice_no or order_id, now=now, template=template
+                )
+            results[index] = result
+        return results
+
+    def _write(self, rows, terminal):
+        # Runs on a pool thread
+        with self.pool.connection() as conn:
+            store = self._stores.get(id(conn))
+            if store is None:
+                store = self._stores[id(conn)] = OrderStore(self.path, conn=conn)
+            order_ids = store.save_orders(rows, terminal=terminal)
+            placeholders = ",".join("?" * len(order_ids))
+            invoices = dict(conn.execute(
+                f"SELECT id, invoice_no FROM orders WHERE id IN ({placeholders})", order_ids))
+        return [(order_id, invoices.get(order_id)) for order_id in order_ids]
+
+
+# HTTP/1.1 on asyncio streams: just enough for JSON clients (Content-Length
+# bodies, keep-alive, no chunked uploads)
+
+async def _read_request(reader):
+    # Returns (method, target, headers, body), or None when the client closed
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    headers[":version"] = version
+    body = b""
+    if method == "POST":
+        if "content-length" not in headers:
+            raise HttpError(411, "Content-Length required")
+        try:
+            length = int(headers["content-length"])
+        except ValueError:
+            raise HttpError(400, "Content-Length must be a number")
+        if length < 0:
+            raise HttpError(400, "Content-Length cannot be negative")
+        if length > MAX_BODY:
+            raise HttpError(413, "request body too large")
+        body = await reader.readexactly(length)
+    return method, target, headers, body
+
+
+def _response(status, payload, keep_alive):
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+async def serve(service, host="127.0.0.1", port=8765, log=sys.stderr):
+    async def client(reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await _read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = connection != "close" and (headers[":version"] != "HTTP/1.0" or connection == "keep-alive")
+                    url = urlsplit(target)
+                    data = None
+                    if body:
+                        try:
+                            data = json.loads(body)
+                        except ValueError:
+                            raise HttpError(400, "body is not valid JSON")
+                    payload = await service.handle(method, url.path, parse_qs(url.query), data)
+                    status = 200
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    print(f"error handling request: {e!r}", file=log)
+                    status, payload = 500, {"error": "internal error"}
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(client, host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Billing API listening on http://{address[0]}:{address[1]}", file=log)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    import argparse
+    from .metrics import Metrics, enable, metrics_from_env
+    from .order_store import database_from_env, terminal_from_env
+
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON billing service")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default=database_from_env(), help="database file")
+    parser.add_argument("--terminal", default=terminal_from_env(), help="default till id for invoice numbers")
+    parser.add_argument("--pool-size", type=int, default=4, help="database connections for saving orders")
+    parser.add_argument("--metrics", action="store_true", default=bool(metrics_from_env()),
+                        help="time requests and SQLite calls and serve them on GET /metrics")
+    args = parser.parse_args(argv)
+
+    metrics = None
+    if args.metrics:
+        metrics = Metrics()
+        enable(metrics)
+    started = time.perf_counter()
+    service = BillingService(args.db, args.pool_size, args.terminal, metrics=metrics)
+    print(f"Catalog of {len(service.prices.names())} products loaded in "
+          f"{(time.perf_counter() - started) * 1000:.0f} ms", file=sys.stderr)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+    return 0
@@ -0,0 +1,230 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from .billing import BillingEngine
+from .cart import Cart, TAX_RATE, to_money
+from .receipt import TEMPLATES, render_receipt
+
+
+# Batch invoicing: streams orders from a CSV or JSONL file, prices them
+# against the product catalog, saves them to billing_system.db in bulk
+# transactions and renders one receipt per order in a process pool.
+# Each chunk of orders is priced in one vectorized pass (pricing.py),
+# with every line taxed at its product's GST slab.
+#
+# JSONL, one order per line:
+#   {"customer_name": "...", "customer_contact": "...", "discount": 0,
+#    "items": [{"product": "Pen", "quantity": 2}, ...]}
+#
+# CSV with a header row; consecutive rows sharing order_ref form one order:
+#   order_ref,customer_name,customer_contact,product,quantity
+#
+#   python invoice_batch.py orders.jsonl --receipts invoices --template thermal80
+
+
+class BatchError(ValueError):
+    pass
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                order = json.loads(line)
+                items = [(item["product"], int(item.get("quantity", 1))) for item in order["items"]]
+            except (ValueError, KeyError, TypeError) as e:
+                raise BatchError(f"{path}:{line_no}: invalid order: {e}")
+            yield line_no, {
+                "customer_name": order.get("customer_name", ""),
+                "customer_contact": order.get("customer_contact", ""),
+                "discount": order.get("discount", 0),
+                "items": items,
+            }
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        ref = None
+        start = None
+        order = None
+        for row_no, row in enumerate(reader, 2):
+            try:
+                item = (row["product"], int(row.get("quantity") or 1))
+            except (ValueError, KeyError, TypeError) as e:
+                raise BatchError(f"{path}:{row_no}: invalid row: {e}")
+            if order is None or row.get("order_ref") != ref:
+                if order is not None:
+                    yield start, order
+                ref = row.get("order_ref")
+                start = row_no
+                order = {
+                    "customer_name": row.get("customer_name", ""),
+                    "customer_contact": row.get("customer_contact", ""),
+                    "discount": row.get("discount") or 0,
+                    "items": [],
+                }
+            order["items"].append(item)
+        if order is not None:
+            yield start, order
+
+
+def read_orders(path):
+    if path.lower().endswith(".csv"):
+        return read_csv(path)
+    return read_jsonl(path)
+
+
+def resolve_lines(engine, order, tax_rate=TAX_RATE):
+    # [(product, price, quantity, tax rate)] with repeated products merged
+    # as Cart.add merges them; raises ValueError on unknown products or an
+    # order with no items
+    if not order["items"]:
+        raise ValueError("order has no items")
+    lines = {}
+    for name, quantity in order["items"]:
+        if quantity <= 0:
+            raise ValueError(f"Quantity for '{name}' must be greater than zero")
+        product, price = engine.resolve(name)
+        line = lines.get(product)
+        if line is not None:
+            lines[product] = (product, line[1], line[2] + quantity, line[3])
+            continue
+        rate = engine.tax_rate_for(product)
+        lines[product] = (product, to_money(price), quantity, tax_rate if rate is None else rate)
+    return list(lines.values())
+
+
+def build_cart(lines, discount=0, tax_rate=TAX_RATE):
+    cart = Cart(tax_rate=tax_rate, discount_percent=discount)
+    for product, price, quantity, rate in lines:
+        cart.add(product, price, quantity, rate)
+    return cart
+
+
+def price_order(engine, order, tax_rate=TAX_RATE):
+    # Builds a separate Cart for the order; raises ValueError on unknown products
+    return build_cart(resolve_lines(engine, order, tax_rate), order["discount"], tax_rate)
+
+
+def _write_receipt(job):
+    # Runs in a worker process; the Cart is rebuilt here rather than
+    # pickled across
+    out_dir, order_id, lines, discount, tax_rate, customer_name, customer_contact, now, template = job
+    cart = build_cart(lines, discount, tax_rate)
+    text = render_receipt(cart, customer_name, customer_contact, invoice_no=order_id, now=now, template=template)
+    extension = "html" if template == "html" else "txt"
+    with open(os.path.join(out_dir, f"invoice_{order_id}.{extension}"), "w", encoding="utf-8") as f:
+        f.write(text)
+    return len(cart)
+
+
+def run_batch(path, store, prices, receipts_dir=None, chunk_size=1000, workers=None, tax_rate=TAX_RATE,
+              template="text", log=sys.stderr):
+    # Returns a dict of counters and timings
+    from .pricing import LineColumns
+
+    engine = BillingEngine(prices, store, tax_rate=tax_rate)
+    stats = {"orders": 0, "lines": 0, "failed": 0, "receipts": 0}
+    started = time.perf_counter()
+    pending = []
+    columns = LineColumns()
+    pool = None
+    if receipts_dir is not None:
+        os.makedirs(receipts_dir, exist_ok=True)
+        pool = ProcessPoolExecutor(max_workers=workers)
+    futures = []
+
+    def flush():
+        now = datetime.now()
+        date = now.strftime("%Y-%m-%d %H:%M:%S")
+        priced = columns.price_lines()
+        rows = []
+        start = 0
+        for index, (order, lines) in enumerate(pending):
+            totals = priced.totals(index)
+            items = [(product, price, quantity, priced.line_total(start + i))
+                     for i, (product, price, quantity, rate) in enumerate(lines)]
+            start += len(lines)
+            rows.append((order["customer_name"], order["customer_contact"], totals["total"], items, date, None,
+                         totals["tax"], totals["discount"]))
+        order_ids = store.save_orders(rows)
+        for order_id, (order, lines) in zip(order_ids, pending):
+            stats["orders"] += 1
+            stats["lines"] += len(lines)
+            if pool is not None:
+                futures.append(pool.submit(
+                    _write_receipt,
+                    (receipts_dir, order_id, lines, order["discount"], tax_rate, order["customer_name"],
+                     order["customer_contact"], now, template)
+                ))
+        pending.clear()
+        columns.clear()
+
+    try:
+        for line_no, order in read_orders(path):
+            try:
+                lines = resolve_lines(engine, order, tax_rate)
+                columns.extend(len(pending), lines, order["discount"])
+            except (ValueError, ArithmeticError) as e:
+                stats["failed"] += 1
+                print(f"{path}:{line_no}: skipped order: {e}", file=log)
+                continue
+            pending.append((order, lines))
+            if len(pending) >= chunk_size:
+                flush()
+        if pending:
+            flush()
+        stats["saved_seconds"] = time.perf_counter() - started
+        for future in futures:
+            future.result()
+            stats["receipts"] += 1
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def main(argv=None):
+    from .catalog import ProductCatalog
+    from .order_store import OrderStore
+    from .price_cache import ProductCache
+
+    parser = argparse.ArgumentParser(description="Bulk invoicing from a CSV or JSONL file")
+    parser.add_argument("orders", help="orders file (.csv or .jsonl)")
+    parser.add_argument("--db", default="billing_system.db", help="database file")
+    parser.add_argument("--catalog", help="price from this products.xlsx instead of the products table")
+    parser.add_argument("--receipts", help="directory to write invoice_<id>.txt receipts into")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="orders per transaction")
+    parser.add_argument("--workers", type=int, help="receipt rendering processes")
+    parser.add_argument("--template", choices=sorted(TEMPLATES), default="text", help="receipt layout")
+    args = parser.parse_args(argv)
+
+    store = OrderStore(args.db)
+    prices = ProductCatalog(args.catalog) if args.catalog else ProductCache(store.conn)
+    try:
+        stats = run_batch(args.orders, store, prices, args.receipts, args.chunk_size, args.workers,
+                          template=args.template)
+    except (BatchError, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        store.close()
+
+    seconds = stats["seconds"] or 1e-9
+    print(f"Saved {stats['orders']} orders ({stats['lines']} lines), skipped {stats['failed']}")
+    print(f"Wrote {stats['receipts']} receipts")
+    print(f"{stats['saved_seconds']:.2f} s pricing and saving")
+    print(f"{seconds:.2f} s total, {stats['orders'] / seconds:.0f} orders/s, "
+          f"{stats['lines'] / seconds:.0f} lines/s")
+    return 0
@@ -0,0 +1,295 @@
+from datetime import datetime
+from decimal import Decimal
+
+from .cart import Cart, TAX_RATE, to_money
+from .promotions import CartPromotions
+from .receipt import render_receipt
+
+
+# Headless billing session: price lookup, cart, totals, receipt and saving.
+# `prices` is any object with get_price(name) returning a price or None
+# (ProductCatalog for products.xlsx, ProductCache for the products table,
+# which also knows each product's tax slab via get_tax_rate),
+# and `store` an OrderStore or OrderWriter-like object used by save().
+# With an InvoiceSequence as `invoices`, the bill gets its invoice number
+# the first time it is printed or saved, and keeps it until reset(), so a
+# receipt printed after saving shows the saved number. Changing a saved
+# bill makes it a new sale, which takes a new number.
+# With a PromotionIndex as `promotions`, each changed line is re-priced
+# against the promotions indexed under it, and coupons can be applied.
+# With a CartJournal as `journal`, every cart change is journaled so an
+# unsaved bill can be restored after a crash (restore()).
+# Both Tk front-ends drive one of these; it never touches Tk itself.
+class BillingEngine:
+    def __init__(self, prices, store=None, tax_rate=TAX_RATE, invoices=None, promotions=None, journal=None):
+        self.prices = prices
+        self.store = store
+        self.invoices = invoices
+        self.journal = journal
+        self.cart = Cart(tax_rate=tax_rate)
+        self.promotions = None
+        if promotions is not None:
+            self.set_promotions(promotions)
+        self.customer_name = ""
+        self.customer_contact = ""
+        self.paid = to_money(0)
+        self.invoice_no = None
+        # True from save (or begin_save) until the bill is changed or reset
+        self.saved = False
+
+    def resolve(self, name):
+        # Returns (canonical name, price); raises ValueError if unknown
+        lookup = getattr(self.prices, "lookup", None)
+        if lookup is not None:
+            entry = lookup(name)
+            if entry is None:
+                raise ValueError(f"Product '{name}' not found or has no price")
+            return entry
+        price = self.prices.get_price(name)
+        if not price:
+            raise ValueError(f"Product '{name}' not found or has no price")
+        return name, price
+
+    def tax_rate_for(self, product):
+        # The product's own GST slab if the price source has one, else None
+        # (the cart's default rate)
+        get_tax_rate = getattr(self.prices, "get_tax_rate", None)
+        return get_tax_rate(product) if get_tax_rate is not None else None
+
+    def category_of(self, product):
+        get_category = getattr(self.prices, "get_category", None)
+        return get_category(product) if get_category is not None else None
+
+    def set_promotions(self, index):
+        # Swaps in a (re)loaded PromotionIndex and re-prices the cart with it
+        if self.promotions is None:
+            self.promotions = CartPromotions(index, self.cart, self.category_of)
+        else:
+            self.promotions.index = index
+        self.promotions.reevaluate()
+
+    def _modified(self):
+        if self.saved:
+            self.saved = False
+            self.invoice_no = None
+
+    def _changed(self, product):
+        self._modified()
+        if self.promotions is not None:
+            self.promotions.line_changed(product)
+
+    def add_item(self, name, quantity=1):
+        if quantity <= 0:
+            raise ValueError("Quantity must be greater than zero")
+        product, price = self.resolve(name)
+        item = self.cart.add(product, price, quantity, self.tax_rate_for(product))
+        self._changed(product)
+        self._log_line(product)
+        return item
+
+    def remove_item(self, product):
+        item = self.cart.remove(product)
+        self._changed(product)
+        self._log_line(product)
+        return item
+
+    def set_quantity(self, product, quantity):
+        item = self.cart.set_quantity(product, quantity)
+        self._changed(product)
+        self._log_line(product)
+        return item
+
+    def set_discount(self, percent):
+        if percent < 0:
+            raise ValueError("Discount cannot be negative")
+        if percent > 100:
+            raise ValueError("Discount cannot be more than 100%")
+        self._modified()
+        self.cart.set_discount(percent)
+        if self.promotions is not None:
+            self.promotions.refresh_coupon()
+        self._log("discount", str(self.cart.discount_percent))
+
+    def apply_coupon(self, code):
+        # Raises ValueError for unknown codes or a bill below the minimum
+        if self.promotions is None:
+            raise ValueError("No promotions are loaded")
+        coupon = self.promotions.apply_coupon(code)
+        self._modified()
+        self._log("coupon", coupon.code)
+        return coupon
+
+    def remove_coupon(self):
+        if self.promotions is not None:
+            self._modified()
+            self.promotions.remove_coupon()
+            self._log("coupon", None)
+
+    # Journal
+
+    def _log(self, *record):
+        journal = self.journal
+        if journal is None:
+            return
+        if journal.closed:
+            # This bill was saved and its records dropped; changes to it
+            # start a new session from a snapshot of the whole cart
+            journal.begin()
+            self._snapshot()
+        journal.append(list(record))
+
+    def _log_line(self, product):
+        if self.journal is not None:
+            item = self.cart.get(product)
+            if item is None:
+                self._log("line", product, None, 0, None)
+            else:
+                self._log("line", product, str(item.price), item.quantity, str(item.tax_rate))
+
+    def _snapshot(self):
+        append = self.journal.append
+        for item in self.cart:
+            append(["line", item.product, str(item.price), item.quantity, str(item.tax_rate)])
+        if self.cart.discount_percent:
+            append(["discount", str(self.cart.discount_percent)])
+        if self.cart.coupon_code:
+            append(["coupon", self.cart.coupon_code])
+
+    def restore(self, records):
+        # Rebuilds the cart from journal records (CartJournal.recover) at
+        # the prices they were scanned at; nothing is journaled again.
+        # Returns the number of lines restored.
+        cart = self.cart
+        # Fold to the final state first so each line is added to the cart
+        # once; a removed and re-added product moves to the end, as in Cart
+        lines = {}
+        discount = coupon = None
+        for record in records:
+            kind = record[0]
+            if kind == "line":
+                product = record[1]
+                if record[3] <= 0:
+                    lines.pop(product, None)
+                else:
+                    lines[product] = record
+            elif kind == "discount":
+                discount = record[1]
+            elif kind == "coupon":
+                coupon = record[1]
+        new = []
+        for kind, product, price, quantity, tax_rate in lines.values():
+            if product in cart:
+                cart.set_quantity(product, quantity)
+            else:
+                new.append((product, Decimal(price), quantity, Decimal(tax_rate)))
+        cart.add_lines(new)
+        if discount is not None:
+            cart.set_discount(Decimal(discount))
+        if self.promotions is not None:
+            self.promotions.reevaluate()
+            if coupon:
+                try:
+                    self.promotions.apply_coupon(coupon)
+                except ValueError:
+                    # Expired or withdrawn since; the bill goes on without it
+                    pass
+        return len(cart)
+
+    def journal_saving(self, invoice_no):
+        # Call as the order is handed to the store; pass the result to
+        # journal_saved() once it has committed
+        if self.journal is None:
+            return None
+        self._log("saving", invoice_no)
+        return self.journal.saving()
+
+    def journal_saved(self, session):
+        if self.journal is not None and session is not None:
+            self.journal.saved(session)
+
+    def set_paid(self, amount):
+        if amount < 0:
+            raise ValueError("Paid amount cannot be negative")
+        self.paid = to_money(amount)
+
+    @property
+    def balance(self):
+        return self.paid - self.cart.total
+
+    def order_items(self):
+        # Rows of (product, price, quantity, total) as the order store expects
+        return [(item.product, item.price, item.quantity, item.total) for item in self.cart]
+
+    def invoice_number(self):
+        # None without an invoice sequence (receipts then fall back to a timestamp)
+        if self.invoice_no is None and self.invoices is not None:
+            self.invoice_no = self.invoices.next()
+        return self.invoice_no
+
+    def receipt(self, invoice_no=None, now=None, template="text"):
+        if invoice_no is None:
+            invoice_no = self.invoice_number()
+        return render_receipt(
+            self.cart,
+            self.customer_name,
+            self.customer_contact,
+            self.paid,
+            self.balance,
+            invoice_no=invoice_no,
+            now=now,
+            template=template
+        )
+
+    def begin_save(self):
+        # Marks the bill as saved and returns (invoice_no, journal session)
+        # for a caller that hands the order to the store itself (e.g. an
+        # OrderWriter); call save_failed() if that save does not commit.
+        if not self.cart:
+            raise ValueError("Cart is empty")
+        if self.saved:
+            raise ValueError("This bill is already saved")
+        invoice_no = self.invoice_number()
+        session = self.journal_saving(invoice_no)
+        self.saved = True
+        return invoice_no, session
+
+    def save_failed(self, session=None):
+        # Lets the unchanged bill be saved again under the same number;
+        # pass begin_save()'s session so the journal stops waiting on it
+        self.saved = False
+        if self.journal is not None and session is not None:
+            self.journal.failed(session)
+
+    def save(self, now=None):
+        # Saves the cart as an order through the store and returns its id
+        invoice_no, session = self.begin_save()
+        date = (now or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            order_id = self.store.save_order(
+                self.customer_name,
+                self.customer_contact,
+                self.cart.total,
+                self.order_items(),
+                date=date,
+                invoice_no=invoice_no,
+                tax=self.cart.tax,
+                discount=self.cart.savings
+            )
+        except Exception:
+            self.save_failed(session)
+            raise
+        self.journal_saved(session)
+        return order_id
+
+    def reset(self):
+        self.cart.clear()
+        self.cart.set_discount(0)
+        self.customer_name = ""
+        self.customer_contact = ""
+        self.paid = to_money(0)
+        self.invoice_no = None
+        self.saved = False
+        if self.promotions is not None:
+            self.promotions.coupon = None
+        if self.journal is not None:
+            self.journal.begin()
@@ -0,0 +1,211 @@
+from collections import OrderedDict
+from decimal import Decimal, ROUND_HALF_UP
+
+
+PAISE = Decimal("0.01")
+TAX_RATE = Decimal("0.05")  # 5% tax
+
+
+def to_money(value):
+    # Convert a float/str/int price to a paise-exact Decimal
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return value.quantize(PAISE, rounding=ROUND_HALF_UP)
+
+
+def to_rate(percent):
+    # Tax slab percent (e.g. 18 or "12.5") to a rate fraction
+    return Decimal(str(percent)) / 100
+
+
+class LineItem:
+    __slots__ = ("product", "price", "quantity", "total", "tax_rate", "promotion", "promotion_name")
+
+    def __init__(self, product, price, quantity, tax_rate):
+        self.product = product
+        self.price = price
+        self.quantity = quantity
+        self.total = price * quantity
+        self.tax_rate = tax_rate
+        self.promotion = Decimal("0.00")
+        self.promotion_name = None
+
+
+# Shopping cart keyed by product name, in the order products were added.
+# Lines can carry their own tax rate (GST slab); tax_rate is the default.
+# Subtotals are kept as running sums per slab that are adjusted by each
+# change instead of re-summing every line. Money off comes in three layers,
+# all before tax: per-line promotion amounts (set by promotions.py), then
+# an optional percentage discount on each slab, then a fixed coupon amount
+# shared across slabs in proportion to what is left. With a single slab and
+# no promotions this is the same as discounting the whole subtotal.
+class Cart:
+    def __init__(self, tax_rate=TAX_RATE, discount_percent=0):
+        self.tax_rate = Decimal(str(tax_rate))
+        self.discount_percent = Decimal(str(discount_percent))
+        self._items = OrderedDict()
+        self._slabs = {}
+        self.coupon_code = None
+        self.coupon_amount = Decimal("0.00")
+        self.subtotal = Decimal("0.00")
+        self.promotion = Decimal("0.00")
+        self.discount = Decimal("0.00")
+        self.coupon = Decimal("0.00")
+        self.tax = Decimal("0.00")
+        self.total = Decimal("0.00")
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items.values())
+
+    def __contains__(self, product):
+        return product in self._items
+
+    def get(self, product):
+        return self._items.get(product)
+
+    @property
+    def savings(self):
+        # Everything taken off before tax: promotions, discount and coupon
+        return self.promotion + self.discount + self.coupon
+
+    def add(self, product, price, quantity, tax_rate=None):
+        # Adds a new line or increases the quantity of an existing one
+        item = self._items.get(product)
+        if item is None:
+            rate = self.tax_rate if tax_rate is None else Decimal(str(tax_rate))
+            item = LineItem(product, to_money(price), quantity, rate)
+            self._items[product] = item
+            self._adjust(item.total, rate, 1)
+        else:
+            self.set_quantity(product, item.quantity + quantity)
+        return item
+
+    def add_lines(self, lines):
+        # Adds many new lines [(product, price, quantity, tax_rate)] at once,
+        # e.g. when restoring a cart; running sums move once per slab
+        items = []
+        for product, price, quantity, tax_rate in lines:
+            if product in self._items or quantity <= 0:
+                raise ValueError(f"Cannot add '{product}' x {quantity} as a new line")
+            rate = self.tax_rate if tax_rate is None else Decimal(str(tax_rate))
+            items.append(LineItem(product, to_money(price), quantity, rate))
+        changes = {}
+        for item in items:
+            self._items[item.product] = item
+            total, count = changes.get(item.tax_rate, (0, 0))
+            changes[item.tax_rate] = (total + item.total, count + 1)
+        for rate, (total, count) in changes.items():
+            self._adjust(total, rate, count)
+        return items
+
+    def set_quantity(self, product, quantity):
+        if quantity <= 0:
+            return self.remove(product)
+        item = self._items[product]
+        old_total = item.total
+        item.quantity = quantity
+        item.total = item.price * quantity
+        self._adjust(item.total - old_total, item.tax_rate)
+        return item
+
+    def remove(self, product):
+        item = self._items.pop(product, None)
+        if item is not None:
+            self._adjust(-item.total, item.tax_rate, -1, -item.promotion)
+        return item
+
+    def set_promotion(self, product, amount, name=None):
+        # Money off one line, capped at the line total
+        item = self._items[product]
+        amount = min(to_money(amount), item.total)
+        delta = amount - item.promotion
+        item.promotion = amount
+        item.promotion_name = name if amount else None
+        if delta:
+            self._adjust(0, item.tax_rate, 0, delta)
+
+    def set_coupon(self, amount, code=None):
+        self.coupon_amount = to_money(amount)
+        self.coupon_code = code if amount else None
+        self._adjust(0, self.tax_rate)
+
+    def set_discount(self, percent):
+        self.discount_percent = Decimal(str(percent))
+        self._adjust(0, self.tax_rate)
+
+    def promotions(self):
+        # [(promotion name, amount)] summed over lines, in cart order
+        totals = OrderedDict()
+        for item in self._items.values():
+            if item.promotion:
+                totals[item.promotion_name] = totals.get(item.promotion_name, 0) + item.promotion
+        return list(totals.items())
+
+    def tax_breakdown(self):
+        # [(rate, taxable amount, tax)] per slab in the cart, lowest rate first
+        return [(rate, slab[3], slab[4]) for rate, slab in sorted(self._slabs.items())]
+
+    def clear(self):
+        self._items.clear()
+        self._slabs.clear()
+        self.coupon_code = None
+        self.coupon_amount = Decimal("0.00")
+        self.subtotal = Decimal("0.00")
+        self.promotion = Decimal("0.00")
+        self.discount = Decimal("0.00")
+        self.coupon = Decimal("0.00")
+        self.tax = Decimal("0.00")
+        self.total = Decimal("0.00")
+
+    def _adjust(self, delta, rate, lines=0, promotion_delta=0):
+        # Only the changed slab's running sums move; totals are then
+        # re-derived from the (few) slabs
+        slabs = self._slabs
+        if delta or lines or promotion_delta:
+            count, subtotal, promotion = slabs[rate][:3] if rate in slabs else (0, 0, 0)
+            if count + lines:
+                slabs[rate] = (count + lines, subtotal + delta, promotion + promotion_delta, None, None)
+            else:
+                del slabs[rate]
+
+        percent = self.discount_percent
+        subtotal_sum = promotion_sum = discount_sum = Decimal("0.00")
+        bases = []
+        for slab_rate in sorted(slabs):
+            count, subtotal, promotion = slabs[slab_rate][:3]
+            net = subtotal - promotion
+            discount = (net * percent / 100).quantize(PAISE, rounding=ROUND_HALF_UP)
+            bases.append((slab_rate, net - discount))
+            subtotal_sum += subtotal
+            promotion_sum += promotion
+            discount_sum += discount
+
+        # The coupon is split across slabs by their share of the base; the
+        # last slab takes the rounding remainder. With no coupon (or nothing
+        # left to take it from, e.g. a 100% discount) there is nothing to split.
+        base_sum = sum(base for slab_rate, base in bases)
+        coupon = min(self.coupon_amount, base_sum) if base_sum > 0 else Decimal("0.00")
+        left = coupon
+        tax_sum = Decimal("0.00")
+        for i, (slab_rate, base) in enumerate(bases):
+            if not coupon:
+                share = Decimal("0.00")
+            elif i == len(bases) - 1:
+                share = left
+            else:
+                share = (coupon * base / base_sum).quantize(PAISE, rounding=ROUND_HALF_UP)
+                left -= share
+            taxable = base - share
+            tax = (taxable * slab_rate).quantize(PAISE, rounding=ROUND_HALF_UP)
+            slabs[slab_rate] = slabs[slab_rate][:3] + (taxable, tax)
+            tax_sum += tax
+
+        self.subtotal = subtotal_sum
+        self.promotion = promotion_sum
+        self.discount = discount_sum
+        self.coupon = coupon
+        self.tax = tax_sum
+        self.total = subtotal_sum - promotion_sum - discount_sum - coupon + tax_sum
@@ -0,0 +1,156 @@
+import os
+from array import array
+from bisect import bisect_left
+
+
+CACHE_VERSION = 1
+
+
+def file_digest(path):
+    import hashlib
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+# In-memory product catalog built once from products.xlsx.
+# Keeps a case-insensitive name -> (name, price) hash index for O(1) lookups
+# and a sorted list of lowercased names for prefix queries.
+#
+# Parsing the workbook needs pandas/openpyxl and is slow, so the parsed rows
+# are snapshotted next to it (products.xlsx.cache: a pickled name list and
+# price array). The snapshot is used while the workbook's size and mtime
+# match, or its SHA-256 does after a touch/copy; otherwise the workbook is
+# parsed again and the snapshot rewritten.
+class ProductCatalog:
+    def __init__(self, path="products.xlsx", cache_path=None, autoload=True):
+        self.path = path
+        self.cache_path = cache_path or path + ".cache"
+        self.mtime = None
+        self.names = []
+        self._by_key = {}
+        self._sorted_keys = []
+        # autoload=False leaves the catalog empty until load() is called,
+        # e.g. from a background thread after the window is up
+        if autoload:
+            self.load()
+
+    @staticmethod
+    def normalize(name):
+        return str(name).strip().lower()
+
+    def load(self):
+        st = os.stat(self.path)
+        rows = self._load_snapshot(st)
+        if rows is None:
+            rows = self._read_workbook()
+            self._write_snapshot(st, file_digest(self.path), rows)
+        self.mtime = st.st_mtime
+        self.build(rows)
+
+    def _read_workbook(self):
+        import pandas as pd
+
+        df = pd.read_excel(self.path)
+        return list(zip(df['Product'].tolist(), df['Price'].tolist()))
+
+    def _load_snapshot(self, st):
+        import pickle
+
+        try:
+            with open(self.cache_path, "rb") as f:
+                snapshot = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            return None
+        if not isinstance(snapshot, dict) or snapshot.get("version") != CACHE_VERSION:
+            return None
+        if snapshot["size"] != st.st_size:
+            return None
+        if snapshot["mtime_ns"] != st.st_mtime_ns:
+            # Same size but touched or copied; trust it only if the bytes match
+            digest = file_digest(self.path)
+            if snapshot["sha256"] != digest:
+                return None
+            self._write_snapshot(st, digest, zip(snapshot["names"], snapshot["prices"]))
+        return zip(snapshot["names"], snapshot["prices"])
+
+    def _write_snapshot(self, st, digest, rows):
+        import pickle
+
+        rows = list(rows)
+        names = [str(name) for name, price in rows]
+        prices = array("d", (float(price) for name, price in rows))
+        snapshot = {
+            "version": CACHE_VERSION,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha256": digest,
+            "names": names,
+            "prices": prices,
+        }
+        # Write to a temporary file and swap it in so readers never see half
+        temp_path = self.cache_path + ".tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.cache_path)
+        except OSError:
+            # A read-only directory just means no snapshot next time
+            pass
+
+    def build(self, rows):
+        names = []
+        by_key = {}
+        for name, price in rows:
+            name = str(name).strip()
+            key = self.normalize(name)
+            if not key or key in by_key:
+                # Keep the first row for duplicate names, like the old df lookup
+                continue
+            by_key[key] = (name, float(price))
+            names.append(name)
+        self.names = names
+        self._by_key = by_key
+        self._sorted_keys = sorted(by_key)
+
+    def refresh(self):
+        # Reload only if products.xlsx changed on disk since the last load
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if mtime == self.mtime:
+            return False
+        self.load()
+        return True
+
+    def lookup(self, name):
+        # Returns (canonical name, price) or None
+        return self._by_key.get(self.normalize(name))
+
+    def get_price(self, name):
+        entry = self._by_key.get(self.normalize(name))
+        if entry is None:
+            return None
+        return entry[1]
+
+    def with_prefix(self, prefix, limit=None):
+        prefix = self.normalize(prefix)
+        keys = self._sorted_keys
+        results = []
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and keys[i].startswith(prefix):
+            results.append(self._by_key[keys[i]][0])
+            if limit is not None and len(results) >= limit:
+                break
+            i += 1
+        return results
+
+    def __contains__(self, name):
+        return self.normalize(name) in self._by_key
+
+    def __len__(self):
+        return len(self.names)
@@ -0,0 +1,147 @@
+import csv
+import os
+import sys
+import time
+
+from .catalog import file_digest
+
+
+# Incremental sync of a price list into the products table, so bill.py and
+# temp.py price from the same data. The list is products.xlsx or a CSV with
+# Product and Price columns, and optionally a Tax/GST column with the slab
+# percent and a Category column for promotions. The table is read once into
+# a name -> price dict, only new or re-priced rows are written (one
+# executemany UPSERT in one transaction), and a file whose SHA-256 matches
+# the last sync is skipped entirely.
+
+# Optional products columns, in row order after name and price
+OPTIONAL_COLUMNS = ("tax_slab", "category")
+
+
+def _cell(value):
+    # Cell text; empty for a blank CSV field or an empty (NaN) Excel cell
+    if value is None or value != value:
+        return ""
+    return str(value).strip()
+
+
+def read_price_list(path):
+    # Returns [(name, price, tax slab or None, category or None)] and the
+    # optional columns the file has, from a .csv or an Excel workbook
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            return _read_rows(path, reader.fieldnames or (), reader)
+
+    import pandas as pd
+
+    df = pd.read_excel(path, dtype=object)
+    return _read_rows(path, df.columns, df.to_dict("records"))
+
+
+def _read_rows(path, fieldnames, records):
+    columns = {str(name).strip().lower(): name for name in fieldnames}
+    name_col = columns.get("product") or columns.get("name")
+    price_col = columns.get("price")
+    tax_col = columns.get("tax") or columns.get("gst") or columns.get("tax_slab")
+    category_col = columns.get("category")
+    if name_col is None or price_col is None:
+        raise ValueError(f"{path}: expected Product and Price columns")
+    rows = []
+    seen = set()
+    for row in records:
+        name = _cell(row[name_col])
+        if not name or name in seen:
+            continue
+        seen.add(name)
+        slab = _cell(row[tax_col]).rstrip("%") if tax_col is not None else ""
+        category = _cell(row[category_col]) if category_col is not None else ""
+        rows.append((name, float(_cell(row[price_col])), float(slab) if slab else None, category or None))
+    present = [column for column, col in zip(OPTIONAL_COLUMNS, (tax_col, category_col)) if col is not None]
+    return rows, present
+
+
+def diff_products(conn, rows, columns=()):
+    # Rows that are new or whose price (or one of the optional columns the
+    # file has) changed, and names missing from rows
+    compare = [OPTIONAL_COLUMNS.index(column) for column in columns]
+    current = {row[0]: row[1:] for row in conn.execute(
+        f"SELECT name, price, {', '.join(OPTIONAL_COLUMNS)} FROM products")}
+    changed = []
+    for row in rows:
+        old = current.pop(row[0], None)
+        # A product with no price yet (NULL) is always re-priced
+        if (old is None or old[0] is None or round(old[0], 2) != round(row[1], 2)
+                or any(old[1 + i] != row[2 + i] for i in compare)):
+            changed.append(row)
+    return changed, list(current)
+
+
+def sync_products(conn, path, prune=False, force=False, dry_run=False):
+    # Returns a dict describing what was (or would be) changed
+    source = os.path.abspath(path)
+    digest = file_digest(path)
+    if not force:
+        row = conn.execute("SELECT sha256 FROM catalog_sync WHERE source = ?", (source,)).fetchone()
+        if row is not None and row[0] == digest:
+            return {"skipped": True, "rows": 0, "changed": 0, "removed": 0}
+
+    rows, columns = read_price_list(path)
+    changed, missing = diff_products(conn, rows, columns)
+    removed = missing if prune else []
+    result = {"skipped": False, "rows": len(rows), "changed": len(changed), "removed": len(removed)}
+    if dry_run:
+        return result
+
+    # Columns the file does not have keep their current values
+    picked = [2 + OPTIONAL_COLUMNS.index(column) for column in columns]
+    names = ["name", "price"] + list(columns)
+    updates = ", ".join(f"{column} = excluded.{column}" for column in names[1:])
+    with conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            f"""INSERT INTO products ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})
+                ON CONFLICT (name) DO UPDATE SET {updates}""",
+            [row[:2] + tuple(row[i] for i in picked) for row in changed]
+        )
+        if removed:
+            conn.executemany("DELETE FROM products WHERE name = ?", [(name,) for name in removed])
+        conn.execute(
+            """INSERT INTO catalog_sync (source, sha256, synced_at) VALUES (?, ?, ?)
+               ON CONFLICT (source) DO UPDATE SET sha256 = excluded.sha256, synced_at = excluded.synced_at""",
+            (source, digest, int(time.time()))
+        )
+    return result
+
+
+def main(argv=None):
+    import argparse
+    from .order_store import OrderStore
+
+    parser = argparse.ArgumentParser(description="Sync a price list into the products table")
+    parser.add_argument("source", nargs="?", default="products.xlsx", help="products.xlsx or a .csv price list")
+    parser.add_argument("--db", default="billing_system.db", help="database file")
+    parser.add_argument("--prune", action="store_true", help="delete products missing from the price list")
+    parser.add_argument("--force", action="store_true", help="diff even if the file is unchanged since the last sync")
+    parser.add_argument("--dry-run", action="store_true", help="report changes without writing them")
+    args = parser.parse_args(argv)
+
+    store = OrderStore(args.db)
+    started = time.perf_counter()
+    try:
+        result = sync_products(store.conn, args.source, args.prune, args.force, args.dry_run)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        store.close()
+    elapsed = time.perf_counter() - started
+
+    if result["skipped"]:
+        print(f"{args.source} unchanged since the last sync ({elapsed * 1000:.1f} ms)")
+        return 0
+    verb = "Would apply" if args.dry_run else "Applied"
+    print(f"{verb} {result['changed']} new/changed and {result['removed']} removed products "
+          f"out of {result['rows']} in {args.source} ({elapsed:.2f} s)")
+    return 0
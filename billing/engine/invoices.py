@@ -0,0 +1,142 @@
+import threading
+import time
+
+from .order_store import connect, format_invoice, with_retry
+
+
+# Invoice numbers for receipts, issued before the order is saved so the
+# printed number and the saved order agree. Numbers come from the same
+# per-terminal counter (terminal_invoices) that OrderStore uses, but are
+# reserved block_size at a time in one short transaction; handing one out
+# is then just a counter bump in memory. Every block is recorded in
+# invoice_blocks, and close() writes how far it was used, so audit() can
+# separate numbers that were issued but never saved (real gaps) from the
+# unused tail of a block.
+
+
+class InvoiceSequence:
+    def __init__(self, path="billing_system.db", terminal=None, block_size=100, conn=None):
+        self.terminal = terminal or ""
+        self.block_size = block_size
+        self.conn = conn if conn is not None else connect(path, check_same_thread=False)
+        self._owns_conn = conn is None
+        self._lock = threading.Lock()
+        self._block_id = None
+        self._next = 1
+        self._last = 0
+
+    def next(self):
+        # Returns the next invoice number as a string, e.g. "T2-000123"
+        with self._lock:
+            if self._next > self._last:
+                self._reserve()
+            number = self._next
+            self._next += 1
+        return format_invoice(self.terminal, number)
+
+    def _reserve(self):
+        if self._block_id is not None:
+            self._release(self._last)
+        conn = self.conn
+        block_size = self.block_size
+
+        def reserve():
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                last = conn.execute(
+                    """INSERT INTO terminal_invoices (terminal, last_no) VALUES (?, ?)
+                       ON CONFLICT (terminal) DO UPDATE SET last_no = last_no + excluded.last_no
+                       RETURNING last_no""",
+                    (self.terminal, block_size)
+                ).fetchone()[0]
+                block_id = conn.execute(
+                    """INSERT INTO invoice_blocks (terminal, first_no, last_no, reserved_at)
+                       VALUES (?, ?, ?, ?)""",
+                    (self.terminal, last - block_size + 1, last, int(time.time()))
+                ).lastrowid
+            return block_id, last
+
+        self._block_id, self._last = with_retry(reserve)
+        self._next = self._last - block_size + 1
+
+    def _release(self, used_upto):
+        block_id = self._block_id
+        self._block_id = None
+
+        def release():
+            with self.conn:
+                self.conn.execute("UPDATE invoice_blocks SET used_upto = ? WHERE id = ?", (used_upto, block_id))
+
+        with_retry(release)
+
+    def close(self):
+        # Records how much of the current block was used; the rest is
+        # reported as unused by audit() rather than as missing invoices
+        with self._lock:
+            if self._block_id is not None:
+                self._release(self._next - 1)
+                self._next = 1
+                self._last = 0
+            if self._owns_conn:
+                self.conn.close()
+
+
+def _ranges(numbers):
+    # [1, 2, 3, 7, 9, 10] -> [(1, 3), (7, 7), (9, 10)]
+    ranges = []
+    for number in numbers:
+        if ranges and ranges[-1][1] == number - 1:
+            ranges[-1][1] = number
+        else:
+            ranges.append([number, number])
+    return [tuple(r) for r in ranges]
+
+
+def audit(conn, terminal=None):
+    # Per terminal: how many invoice numbers were saved, which reserved
+    # numbers are missing from orders (gaps), how many were released
+    # unused, and how many sit in a block that was never closed (a till
+    # that is still running, or crashed)
+    if terminal is None:
+        terminals = [row[0] for row in conn.execute(
+            """SELECT terminal FROM invoice_blocks
+               UNION SELECT COALESCE(terminal, '') FROM orders WHERE invoice_no IS NOT NULL
+               ORDER BY 1""")]
+    else:
+        terminals = [terminal]
+
+    report = []
+    for name in terminals:
+        issued = set()
+        for (invoice_no,) in conn.execute(
+                "SELECT invoice_no FROM orders WHERE COALESCE(terminal, '') = ? AND invoice_no IS NOT NULL",
+                (name,)):
+            issued.add(int(invoice_no.rsplit("-", 1)[-1]))
+
+        gaps = []
+        unused = 0
+        open_numbers = 0
+        for first, last, used_upto in conn.execute(
+                "SELECT first_no, last_no, used_upto FROM invoice_blocks WHERE terminal = ? ORDER BY first_no",
+                (name,)):
+            if used_upto is None:
+                # Still in use: only numbers below the highest saved one
+                # are known to have been handed out
+                saved = [number for number in issued if first <= number <= last]
+                used_upto = max(saved, default=first - 1)
+                open_numbers += last - used_upto
+            else:
+                unused += last - used_upto
+            gaps.extend(number for number in range(first, used_upto + 1) if number not in issued)
+
+        report.append({
+            "terminal": name,
+            "saved": len(issued),
+            "first": min(issued, default=None),
+            "last": max(issued, default=None),
+            "gaps": _ranges(sorted(gaps)),
+            "missing": len(gaps),
+            "unused": unused,
+            "open": open_numbers,
+        })
+    return report
@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+import zlib
+
+
+# Append-only journal of the open cart, so a till that crashes or is
+# closed mid-sale comes back with the same bill. Every cart change appends
+# one line and hands it to the OS (a write(), no fsync), which is enough to
+# survive the program dying; a background thread fsyncs at most every
+# sync_interval seconds, so scans never wait on the disk and a power cut
+# loses at most that window. Records hold absolute line state (product,
+# price, quantity, tax rate), so replaying is last-write-wins per product
+# and needs no catalog lookups.
+#
+# Each line is "<crc32 hex> <json list>"; recover() stops at the first line
+# that is torn or fails its checksum and cuts the file there.
+#
+# Records:
+#   ["begin", session]                    a new bill
+#   ["line", product, price, quantity, tax_rate]   quantity 0 removes it
+#   ["discount", percent]
+#   ["coupon", code or null]
+#   ["saving", invoice_no]                handed to the order store
+#
+# Starting a new bill truncates the file unless a save of the previous one
+# is still in flight; then the old session is kept until saved() confirms
+# the commit (or failed() reports it will not come) and the file is
+# compacted to the open bill.
+
+
+def journal_path(db_path, terminal=None):
+    # One journal per till, next to the database they share
+    name = f"cart-{terminal}.journal" if terminal else "cart.journal"
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), name)
+
+
+_decode_json = json.JSONDecoder().decode
+
+
+def _encode(record):
+    data = json.dumps(record, separators=(",", ":"))
+    return f"{zlib.crc32(data.encode('utf-8')):08x} {data}\n".encode("utf-8")
+
+
+def _decode(line):
+    # Returns the record, or None for a torn or corrupt line
+    if not line.endswith(b"\n"):
+        return None
+    crc, _, data = line[:-1].partition(b" ")
+    try:
+        if int(crc, 16) != zlib.crc32(data):
+            return None
+        record = _decode_json(data.decode("utf-8"))
+    except ValueError:
+        return None
+    return record if isinstance(record, list) and record else None
+
+
+class CartJournal:
+    def __init__(self, path, sync_interval=0.2):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.session = 0
+        # True once the open bill has been saved and its records dropped
+        self.closed = False
+        self._pending = set()
+        self._session_offset = 0
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._stop = threading.Event()
+        self._file = open(path, "ab")
+        self._thread = threading.Thread(target=self._sync, name="cart-journal", daemon=True)
+        self._thread.start()
+
+    def recover(self, is_saved=None):
+        # Reads the journal left by the last run. Returns the records of
+        # the open bill and a list of earlier bills whose save never
+        # confirmed, as [(invoice_no, records)]. is_saved(invoice_no), if
+        # given, drops bills whose last act was a save that did commit.
+        sessions = []
+        good = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                record = _decode(line)
+                if record is None:
+                    break
+                if record[0] == "begin" or not sessions:
+                    sessions.append((good, []))
+                    if record[0] == "begin":
+                        self.session = max(self.session, int(record[1]))
+                sessions[-1][1].append(record)
+                good += len(line)
+
+        with self._lock:
+            self._file.truncate(good)
+            self._file.seek(good)
+            unsaved = []
+            for offset, records in sessions[:-1]:
+                invoices = [record[1] for record in records if record[0] == "saving"]
+                if not invoices or not (is_saved and is_saved(invoices[-1])):
+                    unsaved.append((invoices[-1] if invoices else None,
+                                    [record for record in records if record[0] != "begin"]))
+            records = sessions[-1][1] if sessions else []
+            if records and records[-1][0] == "saving" and is_saved and is_saved(records[-1][1]):
+                records = []
+            if len(sessions) > 1 or (sessions and not records):
+                # Keep only the open bill; the caller has the rest
+                self._rewrite(records)
+        return [record for record in records if record[0] != "begin"], unsaved
+
+    def append(self, record):
+        line = _encode(record)
+        with self._lock:
+            self.closed = False
+            self._file.write(line)
+            self._file.flush()
+        self._dirty.set()
+
+    def begin(self):
+        # Starts a new bill
+        with self._lock:
+            self.session += 1
+            self.closed = False
+            if not self._pending:
+                self._truncate()
+            else:
+                self._file.flush()
+                self._session_offset = self._file.seek(0, os.SEEK_END)
+            self._file.write(_encode(["begin", self.session]))
+            self._file.flush()
+        self._dirty.set()
+
+    def saving(self):
+        # The open bill is being saved; returns the token for saved()
+        with self._lock:
+            self._pending.add(self.session)
+            return self.session
+
+    def saved(self, session):
+        # The save of `session` committed: its records are no longer needed
+        with self._lock:
+            self._pending.discard(session)
+            if session == self.session:
+                # With another save still in flight the records stay; the
+                # "saving" record marks this bill as done on recovery
+                if not self._pending:
+                    self._truncate()
+                self.closed = True
+            elif not self._pending and self._session_offset:
+                self._compact()
+        self._dirty.set()
+
+    def failed(self, session):
+        # The save of `session` did not commit and will not be retried
+        # under this token. An open bill keeps its records; an earlier one
+        # is dropped like a saved one, so later bills truncate again.
+        with self._lock:
+            self._pending.discard(session)
+            if not self._pending and self._session_offset:
+                self._compact()
+        self._dirty.set()
+
+    def _compact(self):
+        # Only the open bill is left; drop the sessions before it. Called
+        # with the lock held
+        self._file.flush()
+        with open(self.path, "rb") as f:
+            f.seek(self._session_offset)
+            tail = f.read()
+        self._replace(tail)
+
+    def _truncate(self):
+        self._file.flush()
+        self._file.truncate(0)
+        self._file.seek(0)
+        self._session_offset = 0
+
+    def _rewrite(self, records):
+        self._replace(b"".join(_encode(record) for record in records))
+
+    def _replace(self, data):
+        # Atomically swaps in a compacted journal; called with the lock held
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(tmp, self.path)
+        self._file = open(self.path, "ab")
+        self._session_offset = 0
+
+    def _sync(self):
+        # Group fsync: one fsync covers every record written since the last
+        while True:
+            self._dirty.wait()
+            # Let a burst of scans pile up behind one fsync
+            self._stop.wait(self.sync_interval)
+            self._dirty.clear()
+            with self._lock:
+                f = self._file
+            try:
+                os.fsync(f.fileno())
+            except (OSError, ValueError):
+                # The file was swapped out by a compaction, which fsyncs
+                pass
+            if self._stop.is_set():
+                return
+
+    def close(self):
+        self._stop.set()
+        self._dirty.set()
+        self._thread.join()
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
@@ -0,0 +1,270 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# Opt-in latency instrumentation. Nothing here runs unless a front-end
+# creates a Metrics (temp.py does when $BILLING_METRICS names a file), so
+# an uninstrumented till pays nothing.
+#
+# Timings go into fixed log2 histograms: recording is one bit_length() and
+# a list increment, and memory does not grow with the number of calls.
+# enable() also makes order_store.connect() hand out TimedConnections, so
+# every SQLite statement is timed by its verb (sql.select, sql.insert, ...).
+# MainLoopMonitor schedules itself with root.after and measures how late
+# each tick runs; a late tick means the main loop was blocked (the window
+# froze), and is recorded as a stall along with the handler that ran last.
+
+# Bucket i holds durations under 2**i microseconds; the last one is open
+BUCKETS = 28
+
+
+def metrics_from_env():
+    # Path of the metrics file, e.g. BILLING_METRICS=metrics.json
+    return os.environ.get("BILLING_METRICS") or None
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[min(int(seconds * 1e6).bit_length(), BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the fraction-th call, in seconds
+        # (within a factor of two), capped at the slowest call seen
+        wanted = self.count * fraction
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= wanted:
+                return min((1 << i) / 1e6, self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            # Calls per power-of-two bucket: "<1024us" -> count
+            "buckets": {f"<{1 << i}us": count for i, count in enumerate(self.counts) if count},
+        }
+
+
+class Metrics:
+    def __init__(self, max_stalls=100):
+        self.histograms = {}
+        self.stalls = []
+        self.stall_count = 0
+        self.max_stalls = max_stalls
+        self.last_call = None
+        self.started = time.time()
+        # The order writer and print spooler threads record SQL timings too
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.record(seconds)
+
+    def stall(self, seconds):
+        # Keeps the most recent max_stalls; stall_count has them all
+        with self._lock:
+            self.stall_count += 1
+            self.stalls.append({
+                "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "ms": round(seconds * 1000, 1),
+                "after": self.last_call,
+            })
+            del self.stalls[:-self.max_stalls]
+
+    def timed(self, name, func):
+        # Wraps func so each call is recorded under name
+        record = self.record
+
+        def wrapper(*args, **kwargs):
+            self.last_call = name
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        wrapper.__name__ = getattr(func, "__name__", name)
+        return wrapper
+
+    def instrument(self, obj, names, prefix=""):
+        # Replaces obj's methods with timed wrappers on the instance. Tk
+        # captures bound methods when widgets are created, so call this
+        # before building the window.
+        for name in names:
+            setattr(obj, name, self.timed(prefix + name, getattr(obj, name)))
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+                "uptime_s": round(time.time() - self.started, 1),
+                "timings": {name: histogram.snapshot() for name, histogram in sorted(self.histograms.items())},
+                "stall_count": self.stall_count,
+                "stalls": list(self.stalls),
+            }
+
+    def dump(self, path):
+        # Written to a temporary file and renamed, so readers never see a
+        # half-written file
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp, path)
+
+
+# SQLite timing. enable() installs a Metrics that order_store.connect()
+# attaches to each new connection; connections opened before that are not
+# timed.
+
+_active = None
+
+
+def enable(metrics):
+    global _active
+    _active = metrics
+
+
+def active():
+    return _active
+
+
+# Statement text -> histogram name; statements are mostly constant strings
+_verbs = {}
+
+
+def _verb(sql):
+    name = _verbs.get(sql)
+    if name is None:
+        words = sql.split(None, 1)
+        name = "sql." + (words[0].lower() if words else "empty")
+        if len(_verbs) < 1000:
+            _verbs[sql] = name
+    return name
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.connection.metrics.record(_verb(sql), time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.connection.metrics.record(_verb(sql) + "_many", time.perf_counter() - start)
+
+
+class TimedConnection(sqlite3.Connection):
+    # Times statements, commits and rollbacks, including the ones at the
+    # end of a `with conn:` block. A statement's time covers preparing and
+    # stepping to the first row; fetching more rows is not included.
+    metrics = None
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            self.metrics.record("sql.commit", time.perf_counter() - start)
+
+    def rollback(self):
+        start = time.perf_counter()
+        try:
+            return super().rollback()
+        finally:
+            self.metrics.record("sql.rollback", time.perf_counter() - start)
+
+    def __exit__(self, exc_type, exc, tb):
+        start = time.perf_counter()
+        try:
+            return super().__exit__(exc_type, exc, tb)
+        finally:
+            self.metrics.record("sql.commit" if exc_type is None else "sql.rollback", time.perf_counter() - start)
+
+
+class MainLoopMonitor:
+    # Ticks every `interval` seconds on the Tk main loop. A tick that runs
+    # more than `threshold` seconds late is recorded as a stall; every
+    # tick's lateness goes into the mainloop.lag histogram. With a path,
+    # the metrics are written there every `dump_interval` seconds and on
+    # stop().
+    def __init__(self, root, metrics, path=None, interval=0.1, threshold=0.25, dump_interval=10.0):
+        self.root = root
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.threshold = threshold
+        self.dump_interval = dump_interval
+        self._after_id = None
+        self._due = None
+        self._next_dump = None
+
+    def start(self):
+        now = time.perf_counter()
+        self._next_dump = now + self.dump_interval
+        self._schedule(now)
+
+    def _schedule(self, now):
+        self._due = now + self.interval
+        self._after_id = self.root.after(int(self.interval * 1000), self._tick)
+
+    def _tick(self):
+        now = time.perf_counter()
+        lag = max(now - self._due, 0.0)
+        self.metrics.record("mainloop.lag", lag)
+        if lag >= self.threshold:
+            self.metrics.stall(lag)
+        if self.path and now >= self._next_dump:
+            self._next_dump = now + self.dump_interval
+            try:
+                self.metrics.dump(self.path)
+            except OSError:
+                # A full disk or a bad path must not take the till down
+                pass
+        self._schedule(time.perf_counter())
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        if self.path:
+            try:
+                self.metrics.dump(self.path)
+            except OSError:
+                pass
@@ -0,0 +1,223 @@
+# Schema migrations for billing_system.db.
+# The schema version is kept in PRAGMA user_version; each migration moves
+# the database up by one version inside its own transaction, so existing
+# files are upgraded in place the next time they are opened.
+
+
+def _v1_base_tables(conn):
+    # The original tables; databases created before versioning already
+    # have them, hence IF NOT EXISTS
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY,
+            name TEXT UNIQUE,
+            price REAL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS orders (
+            id INTEGER PRIMARY KEY,
+            customer_name TEXT,
+            customer_contact TEXT,
+            date TEXT,
+            total_amount REAL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS order_items (
+            id INTEGER PRIMARY KEY,
+            order_id INTEGER,
+            product_name TEXT,
+            price REAL,
+            quantity INTEGER,
+            total REAL,
+            FOREIGN KEY (order_id) REFERENCES orders (id)
+        )
+    ''')
+
+
+def _v2_product_ids_and_epoch_dates(conn):
+    # order_items keeps product_name as the name printed on the receipt,
+    # and orders keeps the text date for display; the new columns are what
+    # lookups and reports filter on.
+    conn.execute("ALTER TABLE orders ADD COLUMN created_at INTEGER")
+    conn.execute("ALTER TABLE order_items ADD COLUMN product_id INTEGER REFERENCES products (id)")
+    conn.execute("ALTER TABLE order_items ADD COLUMN created_at INTEGER")
+
+    # Text dates are local time; 'utc' converts them to an epoch
+    conn.execute("UPDATE orders SET created_at = CAST(strftime('%s', date, 'utc') AS INTEGER)")
+    conn.execute('''
+        UPDATE order_items SET
+            product_id = (SELECT id FROM products WHERE products.name = order_items.product_name),
+            created_at = (SELECT created_at FROM orders WHERE orders.id = order_items.order_id)
+    ''')
+
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders (created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items (order_id)")
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_order_items_product_date
+        ON order_items (product_id, created_at)
+    ''')
+
+
+def _v3_report_rollups(conn):
+    # Pre-aggregated tables for reporting.py; filled from report_state's
+    # watermark by reporting.catch_up
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_sales (
+            day TEXT PRIMARY KEY,
+            orders INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            tax REAL NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_product_sales (
+            day TEXT NOT NULL,
+            product_name TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            PRIMARY KEY (day, product_name)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS report_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_order_id INTEGER NOT NULL
+        )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO report_state (id, last_order_id) VALUES (1, 0)")
+
+
+def _v4_catalog_sync_state(conn):
+    # Last synced content hash per price-list file, see catalog_sync.py
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_sync (
+            source TEXT PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            synced_at INTEGER NOT NULL
+        )
+    ''')
+
+
+def _v5_terminal_invoices(conn):
+    # Several tills can share one database; each numbers its own invoices
+    # (terminal "T2" issues T2-000001, T2-000002, ...) from a counter row
+    # that is bumped inside the transaction that saves the order
+    conn.execute("ALTER TABLE orders ADD COLUMN terminal TEXT")
+    conn.execute("ALTER TABLE orders ADD COLUMN invoice_no TEXT")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_orders_invoice_no ON orders (invoice_no)")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS terminal_invoices (
+            terminal TEXT PRIMARY KEY,
+            last_no INTEGER NOT NULL
+        )
+    ''')
+
+
+def _v6_invoice_blocks(conn):
+    # Invoice numbers reserved in blocks by invoices.InvoiceSequence.
+    # used_upto is the last number handed out, written when the block is
+    # released, so the audit can tell abandoned numbers from unused ones
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS invoice_blocks (
+            id INTEGER PRIMARY KEY,
+            terminal TEXT NOT NULL,
+            first_no INTEGER NOT NULL,
+            last_no INTEGER NOT NULL,
+            used_upto INTEGER,
+            reserved_at INTEGER NOT NULL
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_invoice_blocks_terminal ON invoice_blocks (terminal, first_no)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_terminal ON orders (terminal)")
+
+
+def _v7_catalog_version(conn):
+    # Bumped by triggers on every change to products, so caches can tell a
+    # catalog edit from the order commits that also move data_version
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS products_{event.lower()}_version AFTER {event} ON products
+            BEGIN
+                UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+            END
+        ''')
+
+
+def _v8_product_tax_slabs(conn):
+    # GST slab per product as a percent (0, 5, 12, 18, 28, ...); NULL
+    # means the till's default rate
+    conn.execute("ALTER TABLE products ADD COLUMN tax_slab REAL")
+
+
+def _v9_categories_and_promotions(conn):
+    # Product categories for category promotions, and the promotion rules
+    # themselves as JSON (see promotions.py); times are epoch seconds
+    conn.execute("ALTER TABLE products ADD COLUMN category TEXT")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS promotions (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            rule TEXT NOT NULL,
+            active INTEGER NOT NULL DEFAULT 1,
+            starts_at INTEGER,
+            ends_at INTEGER
+        )
+    ''')
+
+
+def _v10_order_tax_and_discount(conn):
+    # Tax and money off (promotions, discount and coupon) as charged on
+    # each order, so reports read them instead of deriving them from the
+    # items; NULL on orders saved before this version
+    conn.execute("ALTER TABLE orders ADD COLUMN tax REAL")
+    conn.execute("ALTER TABLE orders ADD COLUMN discount REAL")
+    conn.execute("ALTER TABLE daily_sales ADD COLUMN discount REAL NOT NULL DEFAULT 0")
+
+
+MIGRATIONS = [
+    _v1_base_tables,
+    _v2_product_ids_and_epoch_dates,
+    _v3_report_rollups,
+    _v4_catalog_sync_state,
+    _v5_terminal_invoices,
+    _v6_invoice_blocks,
+    _v7_catalog_version,
+    _v8_product_tax_slabs,
+    _v9_categories_and_promotions,
+    _v10_order_tax_and_discount,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    # Applies every pending migration and returns the resulting version
+    version = get_version(conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema version {version} is newer than this program supports ({SCHEMA_VERSION})"
+        )
+    if conn.in_transaction:
+        conn.commit()
+    for number in range(version + 1, SCHEMA_VERSION + 1):
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Another connection may have migrated while we waited
+            if get_version(conn) >= number:
+                continue
+            MIGRATIONS[number - 1](conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+    return SCHEMA_VERSION
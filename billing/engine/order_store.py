@@ -0,0 +1,237 @@
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from .metrics import TimedConnection, active as active_metrics
+from .migrations import migrate
+from .reporting import catch_up
+
+
+# Pragmas applied to every connection: WAL lets readers run alongside the
+# writer and with synchronous=NORMAL a commit no longer fsyncs the database
+# file; cache_size is in KiB when negative.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+# Seconds SQLite itself waits on another till's write lock before raising
+# "database is locked"; with_retry then backs off and tries again.
+BUSY_TIMEOUT = 10.0
+RETRIES = 5
+
+
+def database_from_env():
+    # Tills sharing one store point $BILLING_DB at the same file
+    return os.environ.get("BILLING_DB", "billing_system.db")
+
+
+def terminal_from_env():
+    # Till id used for invoice numbers, e.g. BILLING_TERMINAL=T2
+    return os.environ.get("BILLING_TERMINAL") or None
+
+
+def is_busy(error):
+    message = str(error)
+    return "locked" in message or "busy" in message
+
+
+def with_retry(func, retries=RETRIES, backoff=0.05):
+    # Calls func(), retrying with jittered exponential backoff while the
+    # database is locked by another connection. func must roll back its
+    # own partial work (a `with conn:` block does).
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except sqlite3.OperationalError as e:
+            if attempt == retries or not is_busy(e):
+                raise
+            time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+
+
+def format_invoice(terminal, number):
+    # "T2-000123" for till T2, "000123" without a terminal id
+    return f"{terminal}-{number:06d}" if terminal else f"{number:06d}"
+
+
+def connect(path="billing_system.db", timeout=BUSY_TIMEOUT, **kwargs):
+    # With instrumentation enabled (metrics.enable) statements are timed
+    metrics = active_metrics()
+    if metrics is not None:
+        kwargs.setdefault("factory", TimedConnection)
+    conn = sqlite3.connect(path, timeout=timeout, **kwargs)
+    if metrics is not None:
+        conn.metrics = metrics
+    for pragma in PRAGMAS:
+        with_retry(lambda: conn.execute(pragma))
+    return conn
+
+
+# A fixed set of connections shared by worker threads (one connection is
+# never used by two threads at once). Connections are opened on demand up
+# to `size`; acquire blocks when all of them are checked out.
+class ConnectionPool:
+    def __init__(self, path="billing_system.db", size=4, timeout=BUSY_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+
+    def acquire(self, wait=None):
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            grow = self._opened < self.size
+            if grow:
+                self._opened += 1
+        if grow:
+            try:
+                return connect(self.path, self.timeout, check_same_thread=False)
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+        return self._idle.get(timeout=wait)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self, wait=None):
+        conn = self.acquire(wait)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+# Persistence for orders. Each order (header plus all of its line items) is
+# written in one explicit transaction, with the items sent via executemany.
+# With a terminal id, every order also gets that till's next invoice number.
+class OrderStore:
+    def __init__(self, path="billing_system.db", conn=None, terminal=None):
+        self.path = path
+        self.terminal = terminal
+        self.conn = conn if conn is not None else connect(path)
+        self.setup_schema()
+
+    def setup_schema(self):
+        # Creates the tables or upgrades an older billing_system.db in place,
+        # then folds any orders missing from the report rollups into them.
+        # Saves leave the rollups alone (keeping the write lock short); they
+        # are caught up here, i.e. when a till starts or a report is opened
+        with_retry(lambda: migrate(self.conn))
+        with_retry(self._catch_up)
+
+    def _catch_up(self):
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            catch_up(self.conn)
+
+    def order_for_invoice(self, invoice_no):
+        row = self.conn.execute("SELECT id FROM orders WHERE invoice_no = ?", (invoice_no,)).fetchone()
+        return row[0] if row else None
+
+    def save_order(self, customer_name, customer_contact, total_amount, items, date=None, invoice_no=None,
+                   tax=None, discount=None):
+        # items: iterable of (product_name, price, quantity, total)
+        return self.save_orders([(customer_name, customer_contact, total_amount, items, date, invoice_no,
+                                  tax, discount)])[0]
+
+    def save_orders(self, orders, terminal=None):
+        # Writes several orders in a single transaction (group commit),
+        # retried as a whole if another till holds the write lock.
+        # terminal overrides the store's own, e.g. for a pooled connection
+        # saving on behalf of several tills.
+        # orders: iterable of (customer_name, customer_contact, total_amount, items, date),
+        # optionally followed by an invoice number already printed on the
+        # receipt (see invoices.InvoiceSequence; otherwise, with a terminal,
+        # the next number is taken from the counter here), then the bill's
+        # tax and money off (Cart.tax and Cart.savings) for the reports
+        orders = list(orders)
+        terminal = terminal or self.terminal
+        return with_retry(lambda: self._save_orders(orders, terminal))
+
+    def _save_orders(self, orders, terminal):
+        conn = self.conn
+        order_ids = []
+        last_date = None
+        created_at = None
+        with conn:
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            for customer_name, customer_contact, total_amount, items, date, *extra in orders:
+                invoice_no, tax, discount = (*extra, None, None, None)[:3]
+                if date is None:
+                    now = datetime.now()
+                    date = now.strftime("%Y-%m-%d %H:%M:%S")
+                    created_at = int(now.timestamp())
+                elif date != last_date:
+                    # Batches usually share one timestamp; parse it once
+                    created_at = int(datetime.strptime(date, "%Y-%m-%d %H:%M:%S").timestamp())
+                last_date = date
+                if invoice_no is None and terminal is not None:
+                    invoice_no = format_invoice(terminal, self._next_invoice(conn, terminal))
+                cursor = conn.execute(
+                    """INSERT INTO orders
+                       (customer_name, customer_contact, date, created_at, total_amount, terminal, invoice_no,
+                        tax, discount)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (customer_name, customer_contact, date, created_at, float(total_amount), terminal, invoice_no,
+                     None if tax is None else float(tax), None if discount is None else float(discount))
+                )
+                order_id = cursor.lastrowid
+                conn.executemany(
+                    """INSERT INTO order_items
+                       (order_id, product_id, product_name, price, quantity, total, created_at)
+                       VALUES (?, (SELECT id FROM products WHERE name = ?), ?, ?, ?, ?, ?)""",
+                    [(order_id, product, product, float(price), quantity, float(total), created_at)
+                     for product, price, quantity, total in items]
+                )
+                order_ids.append(order_id)
+        return order_ids
+
+    def _next_invoice(self, conn, terminal):
+        # Runs inside the save transaction, which holds the write lock, so
+        # two tills can never be handed the same number
+        return conn.execute(
+            """INSERT INTO terminal_invoices (terminal, last_no) VALUES (?, 1)
+               ON CONFLICT (terminal) DO UPDATE SET last_no = last_no + 1
+               RETURNING last_no""",
+            (terminal,)
+        ).fetchone()[0]
+
+    def invoice_no(self, order_id):
+        row = self.conn.execute("SELECT invoice_no FROM orders WHERE id = ?", (order_id,)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,103 @@
+import queue
+import threading
+from datetime import datetime
+
+from .order_store import OrderStore
+
+
+_STOP = object()
+
+
+# Writes orders on a dedicated thread so save_order never blocks Tk.
+# The thread owns its own OrderStore connection. Orders wait in a bounded
+# queue and everything pending is group-committed in one transaction.
+# Results go back through a second queue that the Tk thread drains with
+# root.after, so callbacks always run on the main loop.
+class OrderWriter:
+    def __init__(self, root, path="billing_system.db", max_pending=100, batch_size=50, poll_interval=50,
+                 terminal=None):
+        self.root = root
+        self.path = path
+        self.terminal = terminal
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._orders = queue.Queue(maxsize=max_pending)
+        self._results = queue.Queue()
+        self._poll_id = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="order-writer", daemon=True)
+        self._thread.start()
+        self._schedule_poll()
+
+    def submit(self, customer_name, customer_contact, total_amount, items, on_done=None, on_error=None, timeout=5.0,
+               invoice_no=None, tax=None, discount=None):
+        # Raises queue.Full if the writer is too far behind
+        if self._closed:
+            raise RuntimeError("Order writer is closed")
+        date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        order = (customer_name, customer_contact, total_amount, list(items), date, invoice_no, tax, discount)
+        self._orders.put((order, on_done, on_error), timeout=timeout)
+
+    def close(self):
+        # Flush pending orders, stop the thread and run remaining callbacks
+        if self._closed:
+            return
+        self._closed = True
+        self._orders.put(_STOP)
+        self._thread.join()
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._deliver()
+
+    def _run(self):
+        store = OrderStore(self.path, terminal=self.terminal)
+        try:
+            while True:
+                batch = [self._orders.get()]
+                while batch[-1] is not _STOP and len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._orders.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = batch[-1] is _STOP
+                if stop:
+                    batch.pop()
+                if batch:
+                    self._write(store, batch)
+                if stop:
+                    break
+        finally:
+            store.close()
+
+    def _write(self, store, batch):
+        try:
+            order_ids = store.save_orders([order for order, on_done, on_error in batch])
+        except Exception:
+            # Retry one by one so a single bad order does not fail the rest
+            for order, on_done, on_error in batch:
+                try:
+                    order_id = store.save_orders([order])[0]
+                except Exception as e:
+                    self._results.put((on_error, e))
+                else:
+                    self._results.put((on_done, order_id))
+            return
+        for (order, on_done, on_error), order_id in zip(batch, order_ids):
+            self._results.put((on_done, order_id))
+
+    def _schedule_poll(self):
+        self._poll_id = self.root.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        self._deliver()
+        self._schedule_poll()
+
+    def _deliver(self):
+        while True:
+            try:
+                callback, value = self._results.get_nowait()
+            except queue.Empty:
+                return
+            if callback is not None:
+                callback(value)
@@ -0,0 +1,138 @@
+import sqlite3
+import time
+from collections import OrderedDict
+
+from .cart import to_rate
+
+
+def _read_catalog_version(conn):
+    # None on a database that predates the catalog_version table
+    try:
+        return conn.execute("SELECT version FROM catalog_version WHERE id = 1").fetchone()[0]
+    except (sqlite3.OperationalError, TypeError):
+        return None
+
+
+# Cache of the products table for BillingSystem.
+# Names and prices are loaded with one bulk query; prices live in an LRU
+# dict so huge catalogs can be capped with max_size. The cache is dropped
+# when another connection changes the products table: PRAGMA data_version
+# flags any commit, and the trigger-maintained catalog_version row tells
+# catalog edits apart from saved orders. The check is throttled to
+# check_interval seconds so a scan at the counter is normally a plain dict
+# lookup. generation counts reloads, for callers that index names().
+# Products with their own GST slab (products.tax_slab) or a category are
+# kept in separate dicts; the rest use the till's default rate.
+# max_size caps only the prices: the names (for search), tax slabs and
+# categories are always held for the whole catalog, so memory still grows
+# with the number of products.
+# load() is fetch() then install(); a front-end can run fetch() on a worker
+# thread with a connection of its own and install() the result on the
+# thread that owns the cache.
+class ProductCache:
+    def __init__(self, conn, max_size=None, check_interval=1.0, autoload=True):
+        self.conn = conn
+        self.max_size = max_size
+        self.check_interval = check_interval
+        self._prices = OrderedDict()
+        self._tax_rates = {}
+        self._categories = {}
+        self._names = []
+        self._complete = False
+        self._data_version = None
+        self._catalog_version = None
+        self._checked_at = 0.0
+        self.generation = 0
+        # With autoload=False the bulk query is deferred; the first lookup
+        # (or an explicit load()) performs it
+        if autoload:
+            self.load()
+
+    def load(self):
+        self.install(self.fetch())
+
+    def fetch(self, conn=None):
+        # Reads the catalog for install(). The version goes first, so an
+        # edit committed in between shows up as a newer version than the
+        # snapshot and is picked up by the next check
+        conn = conn if conn is not None else self.conn
+        catalog_version = _read_catalog_version(conn)
+        rows = conn.execute("SELECT name, price, tax_slab, category FROM products").fetchall()
+        return rows, catalog_version
+
+    def install(self, snapshot):
+        rows, catalog_version = snapshot
+        self._names = [row[0] for row in rows]
+        self._tax_rates = {row[0]: to_rate(row[2]) for row in rows if row[2] is not None}
+        self._categories = {row[0]: row[3] for row in rows if row[3] is not None}
+        rows = [row[:2] for row in rows]
+        # Only prices are capped; evicted ones are read back one at a time
+        if self.max_size is not None:
+            rows = rows[:self.max_size]
+        self._prices = OrderedDict(rows)
+        self._complete = len(self._prices) == len(self._names)
+        self._data_version = self._read_data_version()
+        self._catalog_version = catalog_version
+        if catalog_version != _read_catalog_version(self.conn):
+            # Edited since the snapshot was read (on another connection);
+            # forget data_version so the next check compares and reloads
+            self._data_version = None
+        self._checked_at = time.monotonic()
+        self.generation += 1
+
+    def invalidate(self):
+        # Local writes do not bump data_version, so callers that change the
+        # products table through this connection reload explicitly
+        self.load()
+
+    def check(self):
+        # Reloads if another connection changed the catalog; returns generation
+        self._check_version()
+        return self.generation
+
+    def names(self):
+        self._check_version()
+        return list(self._names)
+
+    def get_price(self, name):
+        self._check_version()
+        prices = self._prices
+        price = prices.get(name)
+        if price is not None:
+            prices.move_to_end(name)
+            return price
+        if self._complete:
+            return None
+
+        row = self.conn.execute("SELECT price FROM products WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        prices[name] = row[0]
+        if self.max_size is not None and len(prices) > self.max_size:
+            prices.popitem(last=False)
+        return row[0]
+
+    def get_tax_rate(self, name):
+        # Rate fraction for the product's slab, or None for the default rate
+        self._check_version()
+        return self._tax_rates.get(name)
+
+    def get_category(self, name):
+        self._check_version()
+        return self._categories.get(name)
+
+    def _read_data_version(self):
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _check_version(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        data_version = self._read_data_version()
+        if data_version == self._data_version:
+            return
+        self._data_version = data_version
+        catalog_version = _read_catalog_version(self.conn)
+        if catalog_version is None or catalog_version != self._catalog_version:
+            self.load()
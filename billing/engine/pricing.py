@@ -0,0 +1,176 @@
+from decimal import Decimal
+
+import numpy as np
+
+from .cart import PAISE, to_money
+
+
+# Vectorized pricing for large carts and batches. Line items are held in
+# columns (price in paise, quantity, tax rate and discount in basis points,
+# and the order each line belongs to) and every total is computed in a few
+# whole-array passes. All arithmetic is on int64 paise, so results match
+# Cart to the paisa: discounts and tax are rounded half-up once per
+# (order, slab), exactly as Cart does per slab.
+
+
+def _basis_points(value, what):
+    # Percent (12.5) -> 1250; finer fractions cannot be represented
+    points = Decimal(str(value)) * 100
+    if points != points.to_integral_value() or not 0 <= points <= 10000:
+        raise ValueError(f"{what} must be a percent from 0 to 100 with at most two decimals: {value}")
+    return int(points)
+
+
+def _round_half_up(numerator, denominator):
+    # numerator / denominator rounded half-up, for non-negative int64 arrays
+    return (numerator * 2 + denominator) // (denominator * 2)
+
+
+def _paise_to_money(paise):
+    return (Decimal(int(paise)) * PAISE).quantize(PAISE)
+
+
+class LineColumns:
+    # Column builder: append lines, then price_lines() prices them all at once
+    def __init__(self):
+        self.order = []
+        self.products = []
+        self.price = []
+        self.quantity = []
+        self.tax = []
+        self.discount = []
+        # There are only a handful of slabs; convert each rate once
+        self._tax_points = {}
+
+    def __len__(self):
+        return len(self.price)
+
+    def append(self, order, product, price, quantity, tax_percent, discount_percent=0):
+        if quantity <= 0:
+            raise ValueError(f"Quantity for '{product}' must be greater than zero")
+        self.order.append(order)
+        self.products.append(product)
+        self.price.append(int(to_money(price) / PAISE))
+        self.quantity.append(quantity)
+        self.tax.append(_basis_points(tax_percent, "Tax slab"))
+        self.discount.append(_basis_points(discount_percent, "Discount"))
+
+    def extend(self, order, lines, discount_percent=0):
+        # lines: [(product, price, quantity, tax_rate)] with rate fractions.
+        # Validates every line first, so a bad one leaves the columns unchanged
+        discount = _basis_points(discount_percent, "Discount")
+        tax_points = self._tax_points
+        rows = []
+        for product, price, quantity, tax_rate in lines:
+            if quantity <= 0:
+                raise ValueError(f"Quantity for '{product}' must be greater than zero")
+            tax = tax_points.get(tax_rate)
+            if tax is None:
+                tax = tax_points[tax_rate] = _basis_points(tax_rate * 100, "Tax slab")
+            rows.append((product, int(to_money(price) / PAISE), quantity, tax))
+        for product, price, quantity, tax in rows:
+            self.order.append(order)
+            self.products.append(product)
+            self.price.append(price)
+            self.quantity.append(quantity)
+            self.tax.append(tax)
+            self.discount.append(discount)
+
+    def clear(self):
+        for column in (self.order, self.products, self.price, self.quantity, self.tax, self.discount):
+            column.clear()
+
+    @classmethod
+    def from_cart(cls, cart, order=0):
+        # Promotions and coupons are per-line money amounts, not columns
+        if cart.promotion or cart.coupon:
+            raise ValueError("Carts with promotions or a coupon are priced by Cart")
+        columns = cls()
+        for item in cart:
+            columns.append(order, item.product, item.price, item.quantity, item.tax_rate * 100,
+                           cart.discount_percent)
+        return columns
+
+    def price_lines(self):
+        return price_columns(
+            np.asarray(self.order, dtype=np.int64),
+            np.asarray(self.price, dtype=np.int64),
+            np.asarray(self.quantity, dtype=np.int64),
+            np.asarray(self.tax, dtype=np.int64),
+            np.asarray(self.discount, dtype=np.int64),
+        )
+
+
+class PricedLines:
+    # Result of price_columns; amounts are int64 paise arrays
+    def __init__(self, line_totals, orders, subtotal, discount, tax, total, slab_order, slab_rate,
+                 slab_taxable, slab_tax):
+        self.line_totals = line_totals
+        self.orders = orders
+        self.subtotal = subtotal
+        self.discount = discount
+        self.tax = tax
+        self.total = total
+        self.slab_order = slab_order
+        self.slab_rate = slab_rate
+        self.slab_taxable = slab_taxable
+        self.slab_tax = slab_tax
+
+    def totals(self, order):
+        # {"subtotal", "discount", "tax", "total"} as Decimals for one order
+        i = int(np.searchsorted(self.orders, order))
+        if i >= len(self.orders) or self.orders[i] != order:
+            raise KeyError(order)
+        return {
+            "subtotal": _paise_to_money(self.subtotal[i]),
+            "discount": _paise_to_money(self.discount[i]),
+            "tax": _paise_to_money(self.tax[i]),
+            "total": _paise_to_money(self.total[i]),
+        }
+
+    def tax_breakdown(self, order):
+        # [(rate, taxable, tax)] for one order, as Cart.tax_breakdown returns
+        start, end = np.searchsorted(self.slab_order, [order, order + 1])
+        return [
+            (Decimal(int(self.slab_rate[i])) / 10000, _paise_to_money(self.slab_taxable[i]),
+             _paise_to_money(self.slab_tax[i]))
+            for i in range(start, end)
+        ]
+
+    def line_total(self, index):
+        return _paise_to_money(self.line_totals[index])
+
+
+def price_columns(order, price, quantity, tax, discount):
+    # order: order key per line (int64); price: paise; quantity: units;
+    # tax and discount: basis points. Returns PricedLines with per-order
+    # totals (orders sorted) and per-(order, slab) tax.
+    line_totals = price * quantity
+    if not len(line_totals):
+        empty = np.zeros(0, dtype=np.int64)
+        return PricedLines(line_totals, empty, empty, empty, empty, empty, empty, empty, empty, empty)
+    discount_numerators = line_totals * discount
+
+    # Group lines by (order, slab) with one sort; tax is at most 10000 bp
+    keys = order * 10001 + tax
+    by_key = np.argsort(keys, kind="stable")
+    keys = keys[by_key]
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    slab_subtotal = np.add.reduceat(line_totals[by_key], starts)
+    slab_discount_numerator = np.add.reduceat(discount_numerators[by_key], starts)
+
+    slab_order = keys[starts] // 10001
+    slab_rate = keys[starts] % 10001
+    slab_discount = _round_half_up(slab_discount_numerator, 10000)
+    slab_taxable = slab_subtotal - slab_discount
+    slab_tax = _round_half_up(slab_taxable * slab_rate, 10000)
+
+    # Groups are sorted by order, so each order's slabs are contiguous
+    orders, starts = np.unique(slab_order, return_index=True)
+    subtotal = np.add.reduceat(slab_subtotal, starts)
+    discount_total = np.add.reduceat(slab_discount, starts)
+    tax_total = np.add.reduceat(slab_tax, starts)
+    total = subtotal - discount_total + tax_total
+
+    return PricedLines(line_totals, orders, subtotal, discount_total, tax_total, total,
+                       slab_order, slab_rate, slab_taxable, slab_tax)
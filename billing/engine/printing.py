@@ -0,0 +1,237 @@
+import os
+import queue
+import socket
+import threading
+from datetime import datetime
+
+
+# Receipt printing without temp files or shelling out.
+# An encoder turns rendered receipt text into a stream of byte chunks
+# (ESC/POS for roll printers, or a PDF written page by page) and a sink
+# writes the chunks as they are produced: a device file, a raw TCP socket
+# (port 9100), a directory of PDFs, or CaptureSink, a fake printer that
+# just keeps the bytes. PrintSpooler does the writing on its own thread.
+#
+# The printer is chosen with a spec string, usually from $BILLING_PRINTER:
+#   file:/dev/usb/lp0    ESC/POS to a device file
+#   tcp:192.168.1.50:9100  ESC/POS to a network printer
+#   pdf:receipts          one PDF per receipt in the directory
+
+
+# Characters outside the printers' code pages
+_REPLACEMENTS = {"₹": "Rs."}
+
+
+def _plain(text, encoding):
+    for char, replacement in _REPLACEMENTS.items():
+        text = text.replace(char, replacement)
+    return text.encode(encoding, errors="replace")
+
+
+class EscPosEncoder:
+    INIT = b"\x1b@"
+    CUT = b"\x1dV\x42\x00"  # feed and partial cut
+
+    def __init__(self, encoding="cp437", cut=True):
+        self.encoding = encoding
+        self.cut = cut
+
+    def encode(self, text):
+        yield self.INIT
+        for line in text.split("\n"):
+            yield _plain(line, self.encoding) + b"\n"
+        if self.cut:
+            yield self.CUT
+
+
+class PdfEncoder:
+    # Minimal PDF with the built-in Courier font. Each page's content is
+    # built and written on its own, and the xref table is assembled from
+    # the byte offsets seen while streaming.
+    def __init__(self, font_size=9, lines_per_page=80, page_width=226, margin=14):
+        self.font_size = font_size
+        self.lines_per_page = lines_per_page
+        self.page_width = page_width
+        self.margin = margin
+
+    @staticmethod
+    def _escape(line):
+        return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    def encode(self, text):
+        lines = text.split("\n")
+        pages = [lines[i:i + self.lines_per_page] for i in range(0, len(lines), self.lines_per_page)] or [[]]
+        leading = self.font_size + 2
+        page_height = 2 * self.margin + leading * self.lines_per_page
+        offsets = {}
+        position = 0
+
+        def emit(number, body):
+            nonlocal position
+            chunk = b"%d 0 obj\n" % number + body + b"\nendobj\n"
+            offsets[number] = position
+            position += len(chunk)
+            return chunk
+
+        header = b"%PDF-1.4\n"
+        position = len(header)
+        yield header
+        yield emit(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        yield emit(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>")
+
+        page_ids = []
+        number = 4
+        for page in pages:
+            content = [b"BT /F1 %d Tf %d TL %d %d Td" % (
+                self.font_size, leading, self.margin, page_height - self.margin - self.font_size)]
+            for line in page:
+                content.append(b"(" + _plain(self._escape(line), "latin-1") + b") '")
+            content.append(b"ET")
+            stream = b"\n".join(content)
+            yield emit(number, b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+            yield emit(number + 1, (
+                b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+                b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            ) % (self.page_width, page_height, number))
+            page_ids.append(number + 1)
+            number += 2
+
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+        yield emit(2, b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids))
+
+        xref = [b"xref\n0 %d\n" % number, b"0000000000 65535 f \n"]
+        for object_id in range(1, number):
+            xref.append(b"%010d 00000 n \n" % offsets[object_id])
+        xref.append(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (number, position))
+        yield b"".join(xref)
+
+
+class CaptureSink:
+    # Fake printer for tests and previews: records every job's bytes
+    def __init__(self):
+        self.jobs = []
+
+    def write_job(self, chunks):
+        data = bytearray()
+        for chunk in chunks:
+            data += chunk
+        self.jobs.append(bytes(data))
+
+
+class FileSink:
+    # Raw device file such as /dev/usb/lp0 (or any file opened for append)
+    def __init__(self, path):
+        self.path = path
+
+    def write_job(self, chunks):
+        with open(self.path, "ab", buffering=0) as f:
+            for chunk in chunks:
+                f.write(chunk)
+
+
+class SocketSink:
+    # Network receipt printer speaking raw TCP (JetDirect, port 9100)
+    def __init__(self, host, port=9100, timeout=10.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def write_job(self, chunks):
+        with socket.create_connection((self.host, self.port), timeout=self.timeout) as sock:
+            for chunk in chunks:
+                sock.sendall(chunk)
+
+
+class DirectorySink:
+    # Writes each job to a new file in a directory, e.g. PDF receipts
+    def __init__(self, directory, extension="pdf"):
+        self.directory = directory
+        self.extension = extension
+        self._counter = 0
+
+    def write_job(self, chunks):
+        os.makedirs(self.directory, exist_ok=True)
+        self._counter += 1
+        name = f"receipt_{datetime.now():%Y%m%d_%H%M%S}_{self._counter}.{self.extension}"
+        with open(os.path.join(self.directory, name), "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+
+
+def open_printer(spec):
+    # Returns (sink, encoder) for a printer spec, or None if spec is empty
+    if not spec:
+        return None
+    kind, _, target = spec.partition(":")
+    if kind == "file":
+        return FileSink(target), EscPosEncoder()
+    if kind == "tcp":
+        host, _, port = target.partition(":")
+        return SocketSink(host, int(port or 9100)), EscPosEncoder()
+    if kind == "pdf":
+        return DirectorySink(target or "receipts"), PdfEncoder()
+    raise ValueError(f"Unknown printer '{spec}' (expected file:, tcp: or pdf:)")
+
+
+def printer_from_env():
+    return open_printer(os.environ.get("BILLING_PRINTER", ""))
+
+
+# Sends print jobs on a background thread. Results are handed back to Tk
+# through a queue drained by root.after, as with OrderWriter.
+class PrintSpooler:
+    def __init__(self, root, sink, encoder, poll_interval=100):
+        self.root = root
+        self.sink = sink
+        self.encoder = encoder
+        self.poll_interval = poll_interval
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._poll_id = None
+        self._thread = threading.Thread(target=self._run, name="print-spooler", daemon=True)
+        self._thread.start()
+        self._schedule_poll()
+
+    def submit(self, text, on_done=None, on_error=None):
+        self._jobs.put((text, on_done, on_error))
+
+    def close(self):
+        # Finish queued jobs, then stop
+        self._jobs.put(None)
+        self._thread.join()
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._deliver()
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            text, on_done, on_error = job
+            try:
+                self.sink.write_job(self.encoder.encode(text))
+            except Exception as e:
+                self._results.put((on_error, e))
+            else:
+                self._results.put((on_done, None))
+
+    def _schedule_poll(self):
+        self._poll_id = self.root.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        self._deliver()
+        self._schedule_poll()
+
+    def _deliver(self):
+        while True:
+            try:
+                callback, value = self._results.get_nowait()
+            except queue.Empty:
+                return
+            if callback is not None:
+                if value is None:
+                    callback()
+                else:
+                    callback(value)
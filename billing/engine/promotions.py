@@ -0,0 +1,298 @@
+import json
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+from .cart import PAISE, to_money
+
+
+# Promotions, compiled once into an index keyed by product and category.
+# When a cart line changes only the rules indexed under that product or its
+# category are evaluated, so the cost of a change does not grow with the
+# number of active promotions or the size of the cart. A line gets the best
+# of its applicable line promotions (they do not stack); a coupon then
+# applies to the whole cart on top of them.
+#
+# Rules are JSON objects stored in the promotions table:
+#   {"type": "buy_x_get_y", "product": "Pen", "buy": 2, "get": 1}
+#   {"type": "category_percent", "category": "Stationery", "percent": 10}
+#   {"type": "quantity_tier", "products": ["Pen", "Pencil"], "tiers": [[10, 5], [50, 12]]}
+#   {"type": "coupon", "code": "SAVE50", "amount": 50, "min_total": 500}
+#   {"type": "coupon", "code": "FEST5", "percent": 5}
+# buy_x_get_y and quantity_tier take "product", "products" or "category".
+
+
+def _percent_of(amount, percent):
+    return (amount * percent / 100).quantize(PAISE, rounding=ROUND_HALF_UP)
+
+
+def _percent(value, what="percent"):
+    # A percent from 0 to 100, as the API accepts for discounts
+    percent = Decimal(str(value))
+    if not percent.is_finite() or not 0 <= percent <= 100:
+        raise ValueError(f"{what} must be a percent from 0 to 100: {value!r}")
+    return percent
+
+
+def _amount(value, what):
+    amount = to_money(value)
+    if amount < 0:
+        raise ValueError(f"{what} must not be negative: {value!r}")
+    return amount
+
+
+class Promotion:
+    # A compiled line rule: evaluate(item) returns the money off that line
+    __slots__ = ("id", "name", "evaluate")
+
+    def __init__(self, promotion_id, name, evaluate):
+        self.id = promotion_id
+        self.name = name
+        self.evaluate = evaluate
+
+
+class Coupon:
+    __slots__ = ("id", "name", "code", "amount", "percent", "min_total")
+
+    def __init__(self, promotion_id, name, code, amount, percent, min_total):
+        self.id = promotion_id
+        self.name = name
+        self.code = code
+        self.amount = amount
+        self.percent = percent
+        self.min_total = min_total
+
+    def value(self, cart):
+        # Money off for the cart as it stands, 0 below min_total
+        base = cart.subtotal - cart.promotion - cart.discount
+        if base < self.min_total:
+            return Decimal("0.00")
+        if self.percent is not None:
+            return _percent_of(base, self.percent)
+        return min(self.amount, base)
+
+
+def _buy_x_get_y(rule):
+    buy = int(rule["buy"])
+    get = int(rule["get"])
+    if buy <= 0 or get <= 0:
+        raise ValueError("buy and get must be positive")
+    group = buy + get
+
+    def evaluate(item):
+        return item.price * (item.quantity // group * get)
+    return evaluate
+
+
+def _category_percent(rule):
+    percent = _percent(rule["percent"])
+
+    def evaluate(item):
+        return _percent_of(item.total, percent)
+    return evaluate
+
+
+def _quantity_tier(rule):
+    # Highest threshold first, so the first match is the best tier
+    tiers = sorted(((int(minimum), _percent(percent, "tier percent")) for minimum, percent in rule["tiers"]), reverse=True)
+    if any(minimum <= 0 for minimum, percent in tiers):
+        raise ValueError("tier quantities must be positive")
+
+    def evaluate(item):
+        for minimum, percent in tiers:
+            if item.quantity >= minimum:
+                return _percent_of(item.total, percent)
+        return Decimal("0.00")
+    return evaluate
+
+
+LINE_RULES = {
+    "buy_x_get_y": _buy_x_get_y,
+    "category_percent": _category_percent,
+    "quantity_tier": _quantity_tier,
+}
+
+
+class PromotionIndex:
+    def __init__(self, promotions=()):
+        # promotions: iterable of (id, name, rule dict)
+        self.by_product = {}
+        self.by_category = {}
+        self.coupons = {}
+        self.count = 0
+        self.errors = []
+        for promotion_id, name, rule in promotions:
+            self.add(promotion_id, name, rule)
+
+    def add(self, promotion_id, name, rule):
+        kind = rule.get("type")
+        if kind == "coupon":
+            code = str(rule["code"]).strip().upper()
+            percent = rule.get("percent")
+            self.coupons[code] = Coupon(
+                promotion_id, name, code,
+                _amount(rule.get("amount", 0), "amount"),
+                _percent(percent) if percent is not None else None,
+                _amount(rule.get("min_total", 0), "min_total"),
+            )
+        elif kind in LINE_RULES:
+            promotion = Promotion(promotion_id, name, LINE_RULES[kind](rule))
+            products = rule.get("products") or ([rule["product"]] if "product" in rule else [])
+            for product in products:
+                self.by_product.setdefault(product, []).append(promotion)
+            if "category" in rule:
+                self.by_category.setdefault(rule["category"], []).append(promotion)
+            if not products and "category" not in rule:
+                raise ValueError(f"Promotion '{name}' applies to no product or category")
+        else:
+            raise ValueError(f"Promotion '{name}' has unknown type '{kind}'")
+        self.count += 1
+
+    def rules_for(self, product, category=None):
+        rules = self.by_product.get(product, [])
+        if category is not None and category in self.by_category:
+            rules = rules + self.by_category[category]
+        return rules
+
+    def coupon(self, code):
+        return self.coupons.get(str(code).strip().upper())
+
+
+def load_promotions(conn, now=None):
+    # Compiles the active promotions in the table; a rule that does not
+    # parse is reported and skipped rather than blocking the till
+    now = int(now if now is not None else time.time())
+    index = PromotionIndex()
+    rows = conn.execute(
+        """SELECT id, name, rule FROM promotions
+           WHERE active AND (starts_at IS NULL OR starts_at <= ?) AND (ends_at IS NULL OR ends_at > ?)
+           ORDER BY id""",
+        (now, now)
+    )
+    for promotion_id, name, rule in rows:
+        try:
+            index.add(promotion_id, name, json.loads(rule))
+        except (ValueError, KeyError, TypeError, ArithmeticError) as e:
+            index.errors.append((promotion_id, name, str(e)))
+    return index
+
+
+# Applies a PromotionIndex to one cart. BillingEngine calls line_changed
+# after every add, quantity change or removal.
+class CartPromotions:
+    def __init__(self, index, cart, category_of=None):
+        self.index = index
+        self.cart = cart
+        self.category_of = category_of or (lambda product: None)
+        self.coupon = None
+        self.evaluations = 0
+
+    def line_changed(self, product):
+        item = self.cart.get(product)
+        if item is not None:
+            best = Decimal("0.00")
+            best_name = None
+            rules = self.index.rules_for(product, self.category_of(product))
+            for promotion in rules:
+                amount = promotion.evaluate(item)
+                if amount > best:
+                    best = amount
+                    best_name = promotion.name
+            self.evaluations += len(rules)
+            if best or item.promotion:
+                self.cart.set_promotion(product, best, best_name)
+        self.refresh_coupon()
+
+    def apply_coupon(self, code):
+        coupon = self.index.coupon(code)
+        if coupon is None:
+            raise ValueError(f"Coupon '{code}' is not valid")
+        if not coupon.value(self.cart):
+            raise ValueError(f"Coupon {coupon.code} needs a bill of at least {coupon.min_total:.2f}")
+        self.coupon = coupon
+        self.refresh_coupon()
+        return coupon
+
+    def remove_coupon(self):
+        self.coupon = None
+        self.cart.set_coupon(0)
+
+    def refresh_coupon(self):
+        # The coupon's value follows the cart (percent coupons, min_total)
+        if self.coupon is None:
+            return
+        value = self.coupon.value(self.cart)
+        if value != self.cart.coupon_amount:
+            self.cart.set_coupon(value, self.coupon.code)
+
+    def reevaluate(self):
+        # After swapping the index: price every line against the new rules
+        for item in list(self.cart):
+            self.line_changed(item.product)
+        if self.coupon is not None:
+            self.coupon = self.index.coupon(self.coupon.code)
+            if self.coupon is None:
+                self.cart.set_coupon(0)
+            else:
+                # Its amount or percent may have been edited
+                self.refresh_coupon()
+
+
+def _timestamp(text):
+    from datetime import datetime
+    return int(datetime.strptime(text, "%Y-%m-%d").timestamp()) if text else None
+
+
+def main(argv=None):
+    import argparse
+    import sys
+    from .order_store import OrderStore
+
+    parser = argparse.ArgumentParser(description="List, add and disable promotions")
+    parser.add_argument("--db", default="billing_system.db", help="database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show promotions and whether they compile")
+    add = commands.add_parser("add", help="add a promotion")
+    add.add_argument("name")
+    add.add_argument("rule", help='JSON rule, e.g. \'{"type": "buy_x_get_y", "product": "Pen", "buy": 2, "get": 1}\'')
+    add.add_argument("--starts", help="first day, YYYY-MM-DD")
+    add.add_argument("--ends", help="day it stops, YYYY-MM-DD")
+    disable = commands.add_parser("disable", help="deactivate a promotion")
+    disable.add_argument("id", type=int)
+    args = parser.parse_args(argv)
+
+    store = OrderStore(args.db)
+    conn = store.conn
+    try:
+        if args.command == "add":
+            try:
+                rule = json.loads(args.rule)
+                PromotionIndex().add(None, args.name, rule)
+                starts, ends = _timestamp(args.starts), _timestamp(args.ends)
+            except (ValueError, KeyError, TypeError, AttributeError, ArithmeticError) as e:
+                print(f"error: {e}", file=sys.stderr)
+                return 1
+            with conn:
+                promotion_id = conn.execute(
+                    "INSERT INTO promotions (name, rule, starts_at, ends_at) VALUES (?, ?, ?, ?)",
+                    (args.name, json.dumps(rule), starts, ends)
+                ).lastrowid
+            print(f"Added promotion {promotion_id}")
+        elif args.command == "disable":
+            with conn:
+                updated = conn.execute("UPDATE promotions SET active = 0 WHERE id = ?", (args.id,)).rowcount
+            if not updated:
+                print(f"error: no promotion {args.id}", file=sys.stderr)
+                return 1
+        else:
+            started = time.perf_counter()
+            index = load_promotions(conn)
+            elapsed = time.perf_counter() - started
+            for promotion_id, name, rule, active in conn.execute(
+                    "SELECT id, name, rule, active FROM promotions ORDER BY id"):
+                print(f"{promotion_id:>5}  {'active' if active else 'off   '}  {name}: {rule}")
+            for promotion_id, name, error in index.errors:
+                print(f"error: promotion {promotion_id} '{name}' skipped: {error}", file=sys.stderr)
+            print(f"{index.count} promotions in effect, compiled in {elapsed * 1000:.1f} ms")
+    finally:
+        store.close()
+    return 0
@@ -0,0 +1,209 @@
+from datetime import datetime
+
+
+# Receipt rendering for a Cart.
+# Each template precompiles its rules, headings and per-line format strings
+# once; rendering is then a single pass that appends finished lines to a
+# list and joins them at the end, so cost grows linearly with the cart.
+#
+# Templates: "text" (the 50-column retail layout), "thermal80" (48 columns)
+# and "thermal58" (32 columns) for roll printers, and "html".
+
+
+def _percent(value):
+    return f"{value.normalize():f}%"
+
+
+def _tax_lines(cart):
+    # (label, amount) per GST slab; one line for a single-rate cart
+    slabs = cart.tax_breakdown() or [(cart.tax_rate, 0, cart.tax)]
+    return [(f"Tax ({_percent(rate * 100)})", tax) for rate, taxable, tax in slabs]
+
+
+def _savings_lines(cart):
+    # (label, amount) for line promotions, the bill discount and a coupon,
+    # in the order Cart applies them
+    lines = [(name, -amount) for name, amount in cart.promotions()]
+    if cart.discount:
+        lines.append((f"Discount ({_percent(cart.discount_percent)})", -cart.discount))
+    if cart.coupon:
+        lines.append((f"Coupon {cart.coupon_code}", -cart.coupon))
+    return lines
+
+
+def _fit(text, width):
+    return text if len(text) <= width else text[:width]
+
+
+class TextTemplate:
+    def __init__(self, width, title="RETAIL BILLING SYSTEM", two_line_items=False, truncate=False):
+        self.width = width
+        self.two_line_items = two_line_items
+        label = width - 12
+
+        self.rule = "=" * width
+        self.line = "-" * width
+        self.title = f"{_fit(title, width):^{width}}"
+        self.thanks = f"{_fit('Thank you for your business!', width):^{width}}"
+        self.amount = ("{0:<%d}{1:>12.2f}" % label).format
+
+        if two_line_items:
+            # Narrow rolls: product name on its own line, then qty x price
+            self.columns = f"{'Item':<{label}}{'Total':>12}"
+            self.item_name = ("{0:.%d}" % width).format
+            self.item_detail = ("  {0} x {1:.2f}").format
+            self.item_amount = ("{0:<%d}{1:>12.2f}" % label).format
+        else:
+            name = width - 30
+            name_spec = f"<{name}.{name}" if truncate else f"<{name}"
+            self.columns = f"{'Product':<{name}}{'Price':>10}{'Qty':>8}{'Total':>12}"
+            self.item = ("{0:%s}{1:>10.2f}{2:>8}{3:>12.2f}" % name_spec).format
+
+    def render(self, cart, customer_name="", customer_contact="", paid=0, balance=0, invoice_no=None, now=None):
+        now = now or datetime.now()
+        if invoice_no is None:
+            invoice_no = int(now.timestamp())
+        width = self.width
+        rule = self.rule
+        line = self.line
+        amount = self.amount
+        out = []
+        append = out.append
+
+        append(rule)
+        append(self.title)
+        append(rule)
+        append(_fit(f"Date: {now.strftime('%Y-%m-%d %H:%M:%S')}", width))
+        append(_fit(f"Invoice #: {invoice_no}", width))
+        append(line)
+        if customer_name:
+            append(_fit(f"Customer: {customer_name}", width))
+        if customer_contact:
+            append(_fit(f"Contact: {customer_contact}", width))
+        append(line)
+        append(self.columns)
+        append(line)
+
+        if self.two_line_items:
+            item_name = self.item_name
+            item_detail = self.item_detail
+            item_amount = self.item_amount
+            for item in cart:
+                append(item_name(item.product))
+                append(item_amount(item_detail(item.quantity, item.price), item.total))
+        else:
+            item_line = self.item
+            for item in cart:
+                append(item_line(item.product, item.price, item.quantity, item.total))
+
+        append(line)
+        append(amount("Subtotal", cart.subtotal))
+        for label, saving in _savings_lines(cart):
+            append(amount(_fit(label, width - 12), saving))
+        for label, tax in _tax_lines(cart):
+            append(amount(label, tax))
+        append(rule)
+        append(amount("TOTAL", cart.total))
+        append(line)
+        if paid > 0:
+            append(amount("Paid Amount", paid))
+            append(amount("Balance", balance))
+        append(line)
+        append(self.thanks)
+        append(rule)
+        return "\n".join(out)
+
+
+class HtmlTemplate:
+    HEAD = (
+        '<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Invoice {0}</title>'
+        '<style>body{{font-family:sans-serif}}table{{border-collapse:collapse}}'
+        'td,th{{padding:2px 8px}}.num{{text-align:right}}</style></head><body>\n'
+        '<h2>RETAIL BILLING SYSTEM</h2>\n<p>Date: {1}<br>Invoice #: {0}</p>\n'
+    ).format
+    CUSTOMER = '<p>{0}: {1}</p>\n'.format
+    TABLE = (
+        '<table>\n<tr><th>Product</th><th class="num">Price</th>'
+        '<th class="num">Qty</th><th class="num">Total</th></tr>\n'
+    )
+    ITEM = '<tr><td>{0}</td><td class="num">{1:.2f}</td><td class="num">{2}</td><td class="num">{3:.2f}</td></tr>\n'.format
+    AMOUNT = '<tr><td colspan="3">{0}</td><td class="num">{1:.2f}</td></tr>\n'.format
+    FOOT = '</table>\n<p>Thank you for your business!</p>\n</body></html>\n'
+
+    def render(self, cart, customer_name="", customer_contact="", paid=0, balance=0, invoice_no=None, now=None):
+        now = now or datetime.now()
+        if invoice_no is None:
+            invoice_no = int(now.timestamp())
+        # Only HTML receipts need this (and the re module it pulls in)
+        from html import escape
+
+        item_row = self.ITEM
+        amount = self.AMOUNT
+        out = [self.HEAD(escape(str(invoice_no)), now.strftime('%Y-%m-%d %H:%M:%S'))]
+        append = out.append
+        if customer_name:
+            append(self.CUSTOMER("Customer", escape(customer_name)))
+        if customer_contact:
+            append(self.CUSTOMER("Contact", escape(customer_contact)))
+        append(self.TABLE)
+        for item in cart:
+            append(item_row(escape(item.product), item.price, item.quantity, item.total))
+        append(amount("Subtotal", cart.subtotal))
+        for label, saving in _savings_lines(cart):
+            append(amount(escape(label), saving))
+        for label, tax in _tax_lines(cart):
+            append(amount(label, tax))
+        append(amount("<b>TOTAL</b>", cart.total))
+        if paid > 0:
+            append(amount("Paid Amount", paid))
+            append(amount("Balance", balance))
+        append(self.FOOT)
+        return "".join(out)
+
+
+TEMPLATES = {
+    "text": TextTemplate(50),
+    "thermal80": TextTemplate(48, truncate=True),
+    "thermal58": TextTemplate(32, two_line_items=True),
+    "html": HtmlTemplate(),
+}
+
+
+def render_receipt(cart, customer_name="", customer_contact="", paid=0, balance=0, invoice_no=None, now=None, template="text"):
+    return TEMPLATES[template].render(cart, customer_name, customer_contact, paid, balance, invoice_no, now)
+
+
+# bill.py's layout: one block per product
+_SIMPLE_HEAD = (
+    f"{'='*40}\n"
+    f"{'BILL RECEIPT':^40}\n"
+    f"{'='*40}\n"
+    "Date & Time: {0}\n"
+    f"{'-'*40}\n"
+).format
+_SIMPLE_ITEM = (
+    "Product    : {0}\n"
+    "Quantity   : {1}\n"
+    "Price/unit : ₹{2:.2f}\n"
+    "Subtotal   : ₹{3:.2f}\n"
+    f"{'-'*40}\n"
+).format
+_SIMPLE_FOOT = (
+    "Discount   : {0:.2f}%\n"
+    "Total      : ₹{1:.2f}\n"
+    "Paid Amount: ₹{2:.2f}\n"
+    "Balance    : ₹{3:.2f}\n"
+    f"{'='*40}\n"
+    "Thank you for your purchase!\n"
+).format
+
+
+def render_simple_receipt(cart, paid=0, balance=0, now=None):
+    now = now or datetime.now()
+    item_block = _SIMPLE_ITEM
+    bill = [_SIMPLE_HEAD(now.strftime('%Y-%m-%d %H:%M:%S'))]
+    append = bill.append
+    for item in cart:
+        append(item_block(item.product, item.quantity, item.price, item.total))
+    append(_SIMPLE_FOOT(cart.discount_percent, cart.total, paid, balance))
+    return "".join(bill)
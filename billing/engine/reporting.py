@@ -0,0 +1,147 @@
+import sys
+import time
+
+
+# End-of-day sales reports for billing_system.db.
+# Reports are answered from the daily_sales and daily_product_sales rollup
+# tables. catch_up folds every order newer than report_state.last_order_id
+# into them. Saving an order does not touch the rollups; OrderStore calls
+# catch_up when it is opened, so every report first folds in the orders
+# saved since the last one, and the "catch-up" command does just that.
+#
+#   python report.py [--db FILE] daily|top|tax|catch-up
+
+
+def catch_up(conn):
+    # Must run inside the caller's transaction (or open one itself) so the
+    # rollups and the watermark move together. Returns the orders folded in.
+    last = conn.execute("SELECT last_order_id FROM report_state WHERE id = 1").fetchone()[0]
+    newest = conn.execute("SELECT MAX(id) FROM orders").fetchone()[0]
+    if newest is None or newest <= last:
+        return 0
+
+    # Orders carry the tax and money off they were charged. Orders saved
+    # before those were stored have only the tax-inclusive total, so their
+    # tax is taken as what remains after the items (right unless the bill
+    # was discounted)
+    conn.execute('''
+        INSERT INTO daily_sales (day, orders, revenue, tax, discount)
+        SELECT substr(o.date, 1, 10) AS day,
+               COUNT(*),
+               SUM(o.total_amount),
+               SUM(COALESCE(o.tax, o.total_amount - COALESCE(
+                   (SELECT SUM(i.total) FROM order_items i WHERE i.order_id = o.id), 0))),
+               SUM(COALESCE(o.discount, 0))
+        FROM orders o
+        WHERE o.id > ? AND o.id <= ?
+        GROUP BY day
+        ON CONFLICT (day) DO UPDATE SET
+            orders = orders + excluded.orders,
+            revenue = revenue + excluded.revenue,
+            tax = tax + excluded.tax,
+            discount = discount + excluded.discount
+    ''', (last, newest))
+    conn.execute('''
+        INSERT INTO daily_product_sales (day, product_name, quantity, revenue)
+        SELECT substr(o.date, 1, 10) AS day, i.product_name, SUM(i.quantity), SUM(i.total)
+        FROM order_items i JOIN orders o ON o.id = i.order_id
+        WHERE i.order_id > ? AND i.order_id <= ?
+        GROUP BY day, i.product_name
+        ON CONFLICT (day, product_name) DO UPDATE SET
+            quantity = quantity + excluded.quantity,
+            revenue = revenue + excluded.revenue
+    ''', (last, newest))
+    count = conn.execute(
+        "SELECT COUNT(*) FROM orders WHERE id > ? AND id <= ?", (last, newest)
+    ).fetchone()[0]
+    conn.execute("UPDATE report_state SET last_order_id = ? WHERE id = 1", (newest,))
+    return count
+
+
+def daily_revenue(conn, start, end):
+    # Rows of (day, orders, revenue, tax, discount) for start <= day <= end (YYYY-MM-DD)
+    return conn.execute(
+        "SELECT day, orders, revenue, tax, discount FROM daily_sales WHERE day BETWEEN ? AND ? ORDER BY day",
+        (start, end)
+    ).fetchall()
+
+
+def top_products(conn, start, end, limit=10):
+    # Rows of (product_name, quantity, revenue), best sellers by revenue first
+    return conn.execute(
+        '''SELECT product_name, SUM(quantity) AS quantity, SUM(revenue) AS revenue
+           FROM daily_product_sales
+           WHERE day BETWEEN ? AND ?
+           GROUP BY product_name
+           ORDER BY revenue DESC
+           LIMIT ?''',
+        (start, end, limit)
+    ).fetchall()
+
+
+def tax_collected(conn, start, end):
+    row = conn.execute(
+        "SELECT COALESCE(SUM(tax), 0) FROM daily_sales WHERE day BETWEEN ? AND ?",
+        (start, end)
+    ).fetchone()
+    return row[0]
+
+
+def main(argv=None):
+    import argparse
+    from datetime import date
+    from .order_store import OrderStore
+
+    today = date.today().isoformat()
+    parser = argparse.ArgumentParser(description="Sales reports for billing_system.db")
+    parser.add_argument("--db", default="billing_system.db", help="database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (
+        ("daily", "revenue, order count, tax and discounts per day"),
+        ("top", "top products by revenue"),
+        ("tax", "total tax collected"),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--from", dest="start", default=today, help="first day (YYYY-MM-DD)")
+        command.add_argument("--to", dest="end", default=today, help="last day (YYYY-MM-DD)")
+        if name == "top":
+            command.add_argument("--limit", type=int, default=10)
+    commands.add_parser("catch-up", help="fold unreported orders into the rollups")
+    command = commands.add_parser("invoices", help="audit invoice numbers for gaps")
+    command.add_argument("--terminal", help="only this till (default: all)")
+
+    args = parser.parse_args(argv)
+    # Opening the store migrates the schema and catches the rollups up
+    store = OrderStore(args.db)
+    conn = store.conn
+    started = time.perf_counter()
+
+    if args.command == "daily":
+        rows = daily_revenue(conn, args.start, args.end)
+        print(f"{'Day':<12}{'Orders':>8}{'Revenue':>14}{'Tax':>12}{'Discount':>12}")
+        for day, orders, revenue, tax, discount in rows:
+            print(f"{day:<12}{orders:>8}{revenue:>14.2f}{tax:>12.2f}{discount:>12.2f}")
+    elif args.command == "top":
+        rows = top_products(conn, args.start, args.end, args.limit)
+        print(f"{'Product':<30}{'Qty':>8}{'Revenue':>14}")
+        for product, quantity, revenue in rows:
+            print(f"{product:<30}{quantity:>8}{revenue:>14.2f}")
+    elif args.command == "tax":
+        print(f"Tax collected {args.start} to {args.end}: {tax_collected(conn, args.start, args.end):.2f}")
+    elif args.command == "invoices":
+        from .invoices import audit
+        for entry in audit(conn, args.terminal):
+            print(f"Terminal {entry['terminal'] or '-'}: {entry['saved']} saved "
+                  f"({entry['first']}..{entry['last']}), {entry['missing']} missing, "
+                  f"{entry['unused']} released unused, {entry['open']} in open blocks")
+            for first, last in entry["gaps"]:
+                print(f"  missing {first}" if first == last else f"  missing {first}-{last}")
+    else:
+        with conn:
+            count = catch_up(conn)
+        print(f"Folded {count} order(s) into the rollups")
+
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"({elapsed:.1f} ms)", file=sys.stderr)
+    store.close()
@@ -0,0 +1,157 @@
+from bisect import bisect_left
+
+
+# Default number of suggestions handed to the autocomplete widgets
+MAX_RESULTS = 100
+
+
+# Substring/prefix search over product names for the autocomplete boxes.
+# Names are kept in lowercase sorted order so an id doubles as the rank of a
+# name; a sorted key list answers prefix queries by bisection and an n-gram
+# index (n <= 3) narrows substring queries to the shortest posting list.
+class ProductSearch:
+    def __init__(self, names=()):
+        self.build(names)
+
+    @staticmethod
+    def normalize(text):
+        return str(text).strip().lower()
+
+    def build(self, names):
+        pairs = {}
+        for name in names:
+            key = self.normalize(name)
+            if key and key not in pairs:
+                pairs[key] = str(name).strip()
+        self._keys = sorted(pairs)
+        self._names = [pairs[key] for key in self._keys]
+
+        # Posting lists are filled in id order, so they stay sorted
+        grams = {}
+        for i, key in enumerate(self._keys):
+            for gram in self._grams(key):
+                postings = grams.get(gram)
+                if postings is None:
+                    grams[gram] = [i]
+                else:
+                    postings.append(i)
+        self._grams_index = grams
+
+    @staticmethod
+    def _grams(key):
+        grams = set()
+        for n in (1, 2, 3):
+            grams.update(key[j:j + n] for j in range(len(key) - n + 1))
+        return grams
+
+    def __len__(self):
+        return len(self._keys)
+
+    def prefix(self, query, limit=MAX_RESULTS):
+        query = self.normalize(query)
+        return [self._names[i] for i in self._prefix_ids(query, limit)]
+
+    def search(self, query, limit=MAX_RESULTS):
+        # Ranked results: names starting with the query first, then names
+        # containing it anywhere else, each group in alphabetical order
+        query = self.normalize(query)
+        if not query:
+            return self._names[:limit]
+
+        ids = self._prefix_ids(query, limit)
+        if len(ids) < limit:
+            ids.extend(self._substring_ids(query, limit - len(ids)))
+        return [self._names[i] for i in ids]
+
+    def _prefix_ids(self, query, limit):
+        keys = self._keys
+        ids = []
+        i = bisect_left(keys, query)
+        while i < len(keys) and len(ids) < limit and keys[i].startswith(query):
+            ids.append(i)
+            i += 1
+        return ids
+
+    def _substring_ids(self, query, limit):
+        keys = self._keys
+        n = min(len(query), 3)
+        candidates = None
+        for j in range(len(query) - n + 1):
+            postings = self._grams_index.get(query[j:j + n])
+            if postings is None:
+                return []
+            if candidates is None or len(postings) < len(candidates):
+                candidates = postings
+
+        # Prefix matches were already returned by _prefix_ids
+        ids = []
+        for i in candidates:
+            key = keys[i]
+            if query in key and not key.startswith(query):
+                ids.append(i)
+                if len(ids) >= limit:
+                    break
+        return ids
+
+
+# Debounced autocomplete pipeline for the Tk front-ends.
+# Bursts of keystrokes are coalesced with root.after so only the last query
+# is searched, and a query that extends the previous one is answered by
+# narrowing the previous matches when those were complete.
+class DebouncedSearch:
+    def __init__(self, root, engine, on_results, delay=150, limit=MAX_RESULTS):
+        self.root = root
+        self.engine = engine
+        self.on_results = on_results
+        self.delay = delay
+        self.limit = limit
+        self._pending = None
+        self._query = None
+        self._last_query = None
+        self._last_results = None
+        self._last_complete = False
+
+    def schedule(self, query):
+        self._query = query
+        if self._pending is not None:
+            self.root.after_cancel(self._pending)
+        self._pending = self.root.after(self.delay, self.flush)
+
+    def flush(self):
+        self._pending = None
+        query = self.engine.normalize(self._query or "")
+        if query == self._last_query:
+            return
+
+        last = self._last_query
+        if last and self._last_complete and query.startswith(last):
+            results = self._narrow(query, self._last_results)
+        else:
+            results = self.engine.search(query, self.limit)
+        self._last_query = query
+        self._last_results = results
+        self._last_complete = len(results) < self.limit
+        self.on_results(results)
+
+    def reset(self):
+        # Forget cached results, e.g. after the catalog was rebuilt
+        if self._pending is not None:
+            self.root.after_cancel(self._pending)
+            self._pending = None
+        self._last_query = None
+        self._last_results = None
+        self._last_complete = False
+
+    def _narrow(self, query, previous):
+        normalize = self.engine.normalize
+        starts = []
+        contains = []
+        for name in previous:
+            key = normalize(name)
+            if key.startswith(query):
+                starts.append(name)
+            elif query in key:
+                contains.append((key, name))
+        # Names that lost their prefix match move into the second group
+        contains.sort()
+        return starts + [name for key, name in contains]
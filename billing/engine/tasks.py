@@ -0,0 +1,27 @@
+import threading
+
+
+# Runs func() on a worker thread and calls on_done(result) or
+# on_error(exception) back on the Tk thread. The worker never touches Tk;
+# the main loop polls for the result with root.after.
+def run_in_background(root, func, on_done=None, on_error=None, poll_interval=20):
+    outcome = []
+
+    def work():
+        try:
+            outcome.append((on_done, func()))
+        except Exception as e:
+            outcome.append((on_error, e))
+
+    def poll():
+        if not outcome:
+            root.after(poll_interval, poll)
+            return
+        callback, value = outcome[0]
+        if callback is not None:
+            callback(value)
+
+    thread = threading.Thread(target=work, daemon=True)
+    thread.start()
+    root.after(poll_interval, poll)
+    return thread
@@ -0,0 +1,9 @@
+# Bulk invoicing from a CSV or JSONL orders file, e.g.
+#
+#   python invoice_batch.py wholesale.jsonl --receipts invoices
+import sys
+
+from engine.batch import main
+
+if __name__ == "__main__":
+    sys.exit(main())
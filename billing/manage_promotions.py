@@ -0,0 +1,12 @@
+# Maintain the promotions the tills apply, e.g.
+#
+#   python manage_promotions.py list
+#   python manage_promotions.py add "Pens 2+1" '{"type": "buy_x_get_y", "product": "Pen", "buy": 2, "get": 1}'
+#   python manage_promotions.py add "Festive" '{"type": "coupon", "code": "FEST5", "percent": 5}' --ends 2026-11-15
+#   python manage_promotions.py disable 3
+import sys
+
+from engine.promotions import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+# Sales reports from billing_system.db, e.g.
+#
+#   python report.py daily --from 2025-04-01 --to 2025-04-30
+#   python report.py top --limit 5
+from engine.reporting import main
+
+if __name__ == "__main__":
+    main()
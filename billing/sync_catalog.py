@@ -0,0 +1,10 @@
+# Sync products.xlsx (or a CSV price list) into the products table, e.g.
+#
+#   python sync_catalog.py products.xlsx
+#   python sync_catalog.py price_list.csv --prune
+import sys
+
+from engine.catalog_sync import main
+
+if __name__ == "__main__":
+    sys.exit(main())
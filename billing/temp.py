@@ -1,19 +1,40 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-from datetime import datetime
-import sqlite3
-import os
-from ttkwidgets.autocomplete import AutocompleteCombobox
-import tempfile
+from tkinter import ttk, messagebox
+from engine import BillingEngine, DebouncedSearch, OrderStore, OrderWriter, ProductCache, ProductSearch
+from engine import CartJournal, InvoiceSequence, database_from_env, journal_path, load_promotions, terminal_from_env
+from engine import connect
+from engine.metrics import MainLoopMonitor, Metrics, enable as enable_metrics, metrics_from_env
+from engine.printing import PrintSpooler, printer_from_env
+from engine.tasks import run_in_background
+from cart_view import CartView
 from tkinter import font as tkfont
 
 class BillingSystem:
+    # Event handlers timed when instrumentation is on
+    TIMED_HANDLERS = (
+        "add_to_cart", "remove_item", "save_order", "order_saved", "print_bill", "update_product_list",
+        "show_product_matches", "apply_coupon", "calculate_balance", "clear_all", "load_catalog",
+        "catalog_loaded", "check_catalog", "search_rebuilt",
+    )
+    # How often to look for catalog syncs and edits made by other processes
+    CATALOG_CHECK_MS = 2000
+    
     def __init__(self, root):
         self.root = root
         self.root.geometry('1200x700')
         self.root.title('Retail Billing System')
         self.root.configure(bg='#f0f0f0')
         
+        # Opt-in latency metrics: BILLING_METRICS=metrics.json times the
+        # handlers and every SQLite call, watches for main-loop stalls and
+        # rewrites the file every few seconds. Enabled before the database
+        # is opened so its connections are timed too
+        self.metrics_path = metrics_from_env()
+        self.metrics = Metrics() if self.metrics_path else None
+        if self.metrics is not None:
+            enable_metrics(self.metrics)
+            self.metrics.instrument(self, self.TIMED_HANDLERS, "ui.")
+        
         # Setup database
         self.setup_database()
         
@@ -26,66 +47,167 @@ class BillingSystem:
         self.product_quantity = tk.IntVar()
         self.product_quantity.set(1)
         self.subtotal = tk.DoubleVar()
+        self.savings = tk.DoubleVar()
         self.tax = tk.DoubleVar()
         self.total = tk.DoubleVar()
         self.paid_amount = tk.DoubleVar()
         self.balance = tk.DoubleVar()
-        
-        # Cart data
-        self.cart = []
+        self.coupon_code = tk.StringVar()
         
         # Sample products (in real application, these would come from a database)
         self.add_sample_products()
         
-        # Load product names for autocomplete
-        self.product_list = self.get_all_products()
+        # Cache product names and prices in memory (one bulk query, run in
+        # the background by load_catalog once the window is showing)
+        self.product_cache = ProductCache(self.conn, autoload=False)
+        
+        # Cart data; pricing, totals and receipts live in the billing engine
+        self.engine = BillingEngine(self.product_cache, self.order_store, invoices=self.invoices,
+                                    journal=self.journal)
+        self.cart = self.engine.cart
+        
+        # Product names for autocomplete, filled in by load_catalog
+        self.product_list = []
+        self.product_search = ProductSearch()
+        # ProductCache generation the search index was built from; None
+        # until load_catalog has run
+        self.search_generation = None
+        self.search_rebuilding = False
         
         # Create UI
         self.create_widgets()
+        self.product_matcher = DebouncedSearch(self.root, self.product_search, self.show_product_matches)
         
         # Bindings
         self.product_search_entry.bind('<KeyRelease>', self.update_product_list)
         self.root.bind('<Return>', lambda event: self.add_to_cart())
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Idle callbacks run in order, so this runs after the window is drawn
+        self.root.after_idle(self.load_catalog)
+        
+        self.monitor = None
+        if self.metrics is not None:
+            self.monitor = MainLoopMonitor(self.root, self.metrics, self.metrics_path)
+            self.monitor.start()
+    
+    def load_catalog(self):
+        # The products table is read, indexed for search and the promotions
+        # compiled on a worker thread; catalog_loaded swaps them in
+        run_in_background(self.root, self.read_catalog, self.catalog_loaded, self.catalog_failed)
+    
+    def read_catalog(self):
+        # Runs on the worker thread, with its own connection; touches no Tk
+        # state and nothing the main loop is using
+        conn = connect(self.order_store.path)
+        try:
+            snapshot = self.product_cache.fetch(conn)
+            search = ProductSearch(row[0] for row in snapshot[0])
+            promotions = load_promotions(conn)
+        finally:
+            conn.close()
+        return snapshot, search, promotions
+    
+    def catalog_loaded(self, result):
+        snapshot, search, promotions = result
+        self.product_cache.install(snapshot)
+        first_load = self.search_generation is None
+        self.search_generation = self.product_cache.generation
+        self.product_list = self.get_all_products()
+        self.product_search = self.product_matcher.engine = search
+        self.product_matcher.reset()
+        self.engine.set_promotions(promotions)
+        if self.recovered is not None:
+            self.restore_cart()
+        self.show_product_matches(search.search(""))
+        if first_load:
+            self.root.after(self.CATALOG_CHECK_MS, self.check_catalog)
+    
+    def check_catalog(self):
+        # A catalog sync or catalog_version bump reloads the cache (here or
+        # on the next lookup); the search index and combobox values are then
+        # rebuilt from the new names on a worker thread, as load_catalog does
+        generation = self.product_cache.check()
+        if generation != self.search_generation and not self.search_rebuilding:
+            self.search_rebuilding = True
+            names = self.product_cache.names()
+            run_in_background(self.root, lambda: (generation, names, ProductSearch(names)),
+                              self.search_rebuilt, self.search_rebuild_failed)
+        self.root.after(self.CATALOG_CHECK_MS, self.check_catalog)
+    
+    def search_rebuilt(self, result):
+        generation, names, search = result
+        self.search_rebuilding = False
+        self.search_generation = generation
+        self.product_list = names
+        self.product_search = self.product_matcher.engine = search
+        self.product_matcher.reset()
+        # Refresh the dropdown for whatever is typed now
+        self.show_product_matches(search.search(self.search_product.get()))
+    
+    def search_rebuild_failed(self, error):
+        # Keep the old index; the next check tries again
+        self.search_rebuilding = False
+    
+    def catalog_failed(self, error):
+        messagebox.showerror("Error", f"Failed to load products: {str(error)}")
+        if self.recovered is not None:
+            self.restore_cart()
+    
+    def restore_cart(self):
+        records, unsaved = self.recovered
+        self.recovered = None
+        if records:
+            count = self.engine.restore(records)
+            self.update_cart_display()
+            self.update_totals()
+            messagebox.showinfo("Bill Restored", f"The unsaved bill ({count} items) was restored.")
+        if unsaved:
+            invoices = ", ".join(invoice_no or "without a number" for invoice_no, lines in unsaved)
+            messagebox.showwarning(
+                "Unsaved Bills",
+                f"{len(unsaved)} bill(s) were still being saved when the till stopped and are not in "
+                f"the database: {invoices}. Please enter them again."
+            )
     
     def setup_database(self):
-        # Create a connection to the database (or create it if it doesn't exist)
-        self.conn = sqlite3.connect('billing_system.db')
+        # Open the database in WAL mode and create the tables if needed.
+        # Tills sharing a store set $BILLING_DB to the same file and each its
+        # own $BILLING_TERMINAL, which prefixes that till's invoice numbers
+        db_path = database_from_env()
+        terminal = terminal_from_env()
+        self.order_store = OrderStore(db_path, terminal=terminal)
+        self.conn = self.order_store.conn
         self.cursor = self.conn.cursor()
         
-        # Create products table if it doesn't exist
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS products (
-                id INTEGER PRIMARY KEY,
-                name TEXT UNIQUE,
-                price REAL
-            )
-        ''')
-        
-        # Create orders table if it doesn't exist
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS orders (
-                id INTEGER PRIMARY KEY,
-                customer_name TEXT,
-                customer_contact TEXT,
-                date TEXT,
-                total_amount REAL
-            )
-        ''')
-        
-        # Create order_items table if it doesn't exist
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS order_items (
-                id INTEGER PRIMARY KEY,
-                order_id INTEGER,
-                product_name TEXT,
-                price REAL,
-                quantity INTEGER,
-                total REAL,
-                FOREIGN KEY (order_id) REFERENCES orders (id)
-            )
-        ''')
+        # Orders are written on a background thread with its own connection
+        self.order_writer = OrderWriter(self.root, db_path, terminal=terminal)
         
-        self.conn.commit()
+        # Invoice numbers are reserved from the database in blocks, so a bill
+        # gets its number when first printed or saved without a round trip
+        self.invoices = InvoiceSequence(db_path, terminal)
+        
+        # Every cart change is journaled so a crash mid-sale loses nothing;
+        # the bill left open by the last run is restored by load_catalog
+        self.journal = CartJournal(journal_path(db_path, terminal))
+        self.recovered = self.journal.recover(
+            lambda invoice_no: self.order_store.order_for_invoice(invoice_no) is not None)
+        
+        # Receipt printer from $BILLING_PRINTER (e.g. tcp:192.168.1.50:9100);
+        # without one, Print Bill only shows the preview window
+        printer = printer_from_env()
+        self.print_spooler = PrintSpooler(self.root, *printer) if printer else None
+    
+    def on_close(self):
+        # Flush queued orders and print jobs before exiting
+        self.order_writer.close()
+        self.invoices.close()
+        self.journal.close()
+        if self.print_spooler is not None:
+            self.print_spooler.close()
+        if self.monitor is not None:
+            self.monitor.stop()
+        self.root.destroy()
     
     def add_sample_products(self):
         sample_products = [
@@ -106,32 +228,29 @@ class BillingSystem:
             ('Sticky Notes', 40.0)
         ]
         
-        # Add sample products to the database if they don't exist
-        for name, price in sample_products:
-            try:
-                self.cursor.execute(
-                    "INSERT INTO products (name, price) VALUES (?, ?)",
-                    (name, price)
-                )
-            except sqlite3.IntegrityError:
-                # Product already exists, skip
-                pass
-        
+        # Seed sample products only into an empty products table
+        self.cursor.execute("SELECT EXISTS (SELECT 1 FROM products)")
+        if self.cursor.fetchone()[0]:
+            return
+        self.cursor.executemany(
+            "INSERT OR IGNORE INTO products (name, price) VALUES (?, ?)",
+            sample_products
+        )
         self.conn.commit()
     
     def get_all_products(self):
-        self.cursor.execute("SELECT name FROM products")
-        products = [row[0] for row in self.cursor.fetchall()]
-        return products
+        return self.product_cache.names()
     
     def get_product_price(self, product_name):
-        self.cursor.execute("SELECT price FROM products WHERE name = ?", (product_name,))
-        result = self.cursor.fetchone()
-        if result:
-            return result[0]
+        price = self.product_cache.get_price(product_name)
+        if price is not None:
+            return price
         return 0.0
     
     def create_widgets(self):
+        # Imported here so it is only loaded when the window is built
+        from ttkwidgets.autocomplete import AutocompleteCombobox
+        
         # Title
         title_font = tkfont.Font(family="Helvetica", size=18, weight="bold")
         title = tk.Label(self.root, text="Retail Billing System", font=title_font, bg='#f0f0f0', fg='#333333')
@@ -164,7 +283,7 @@ class BillingSystem:
         self.product_search_entry = AutocompleteCombobox(
             product_frame, 
             textvariable=self.search_product,
-            completevalues=self.product_list,
+            completevalues=self.product_search.search(""),
             width=28
         )
         self.product_search_entry.grid(row=0, column=1, padx=5, pady=5)
@@ -201,6 +320,7 @@ class BillingSystem:
             yscrollcommand=tree_scroll.set
         )
         self.cart_treeview.pack(fill=tk.BOTH, expand=True)
+        self.cart_view = CartView(self.root, self.cart_treeview, self.cart)
         tree_scroll.config(command=self.cart_treeview.yview)
         
         # Configure treeview columns
@@ -232,16 +352,20 @@ class BillingSystem:
         self.subtotal_label = tk.Label(summary_frame, textvariable=self.format_currency(self.subtotal), font=("Helvetica", 10), bg='#f0f0f0', fg='#333333')
         self.subtotal_label.grid(row=0, column=1, sticky=tk.E, padx=10, pady=3)
         
-        tk.Label(summary_frame, text="Tax (5%):", font=("Helvetica", 10, "bold"), bg='#f0f0f0', fg='#333333').grid(row=1, column=0, sticky=tk.W, padx=10, pady=3)
+        tk.Label(summary_frame, text="Savings:", font=("Helvetica", 10, "bold"), bg='#f0f0f0', fg='#333333').grid(row=1, column=0, sticky=tk.W, padx=10, pady=3)
+        self.savings_label = tk.Label(summary_frame, textvariable=self.format_currency(self.savings), font=("Helvetica", 10), bg='#f0f0f0', fg='#333333')
+        self.savings_label.grid(row=1, column=1, sticky=tk.E, padx=10, pady=3)
+        
+        tk.Label(summary_frame, text="Tax:", font=("Helvetica", 10, "bold"), bg='#f0f0f0', fg='#333333').grid(row=2, column=0, sticky=tk.W, padx=10, pady=3)
         self.tax_label = tk.Label(summary_frame, textvariable=self.format_currency(self.tax), font=("Helvetica", 10), bg='#f0f0f0', fg='#333333')
-        self.tax_label.grid(row=1, column=1, sticky=tk.E, padx=10, pady=3)
+        self.tax_label.grid(row=2, column=1, sticky=tk.E, padx=10, pady=3)
         
         separator = ttk.Separator(summary_frame, orient='horizontal')
-        separator.grid(row=2, column=0, columnspan=2, sticky=tk.EW, padx=10, pady=5)
+        separator.grid(row=3, column=0, columnspan=2, sticky=tk.EW, padx=10, pady=5)
         
-        tk.Label(summary_frame, text="Total:", font=("Helvetica", 12, "bold"), bg='#f0f0f0', fg='#333333').grid(row=3, column=0, sticky=tk.W, padx=10, pady=3)
+        tk.Label(summary_frame, text="Total:", font=("Helvetica", 12, "bold"), bg='#f0f0f0', fg='#333333').grid(row=4, column=0, sticky=tk.W, padx=10, pady=3)
         self.total_label = tk.Label(summary_frame, textvariable=self.format_currency(self.total), font=("Helvetica", 12, "bold"), bg='#f0f0f0', fg='#333333')
-        self.total_label.grid(row=3, column=1, sticky=tk.E, padx=10, pady=3)
+        self.total_label.grid(row=4, column=1, sticky=tk.E, padx=10, pady=3)
         
         # Payment frame
         payment_frame = tk.Frame(bill_frame, bg='#f0f0f0')
@@ -257,6 +381,12 @@ class BillingSystem:
         self.balance_label = tk.Label(payment_frame, textvariable=self.format_currency(self.balance), font=("Helvetica", 10), bg='#f0f0f0', fg='#333333')
         self.balance_label.grid(row=1, column=1, sticky=tk.E, padx=10, pady=3)
         
+        tk.Label(payment_frame, text="Coupon:", font=("Helvetica", 10, "bold"), bg='#f0f0f0', fg='#333333').grid(row=2, column=0, sticky=tk.W, padx=10, pady=3)
+        tk.Entry(payment_frame, textvariable=self.coupon_code, width=15).grid(row=2, column=1, sticky=tk.E, padx=10, pady=3)
+        
+        coupon_btn = tk.Button(payment_frame, text="Apply", command=self.apply_coupon, bg='#2196F3', fg='white', padx=5)
+        coupon_btn.grid(row=2, column=2, padx=5, pady=3)
+        
         # Action Buttons
         button_frame = tk.Frame(bill_frame, bg='#f0f0f0')
         button_frame.pack(fill=tk.X, pady=10)
@@ -282,12 +412,11 @@ class BillingSystem:
         return formatted
     
     def update_product_list(self, event=None):
-        search_term = self.search_product.get().lower()
-        if search_term:
-            filtered_products = [p for p in self.product_list if search_term in p.lower()]
-            self.product_search_entry.configure(completevalues=filtered_products)
-        else:
-            self.product_search_entry.configure(completevalues=self.product_list)
+        # Coalesce keystrokes; the widget is refreshed once typing pauses
+        self.product_matcher.schedule(self.search_product.get())
+    
+    def show_product_matches(self, filtered_products):
+        self.product_search_entry.configure(completevalues=filtered_products)
     
     def add_to_cart(self):
         product_name = self.search_product.get()
@@ -300,55 +429,24 @@ class BillingSystem:
             messagebox.showwarning("Warning", "Quantity must be greater than zero")
             return
         
-        # Get price from database
-        price = self.get_product_price(product_name)
-        if price == 0:
-            messagebox.showerror("Error", f"Product '{product_name}' not found or has no price")
+        # Adds a new line, or increases the quantity if already in cart
+        try:
+            self.engine.add_item(product_name, quantity)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
             return
-            
-        total_price = price * quantity
-        
-        # Check if product already in cart, update quantity if it is
-        for i, item in enumerate(self.cart):
-            if item['product'] == product_name:
-                # Update existing product
-                self.cart[i]['quantity'] += quantity
-                self.cart[i]['total'] = self.cart[i]['price'] * self.cart[i]['quantity']
-                self.update_cart_display()
-                self.update_totals()
-                self.clear_product_selection()
-                return
         
-        # Add as new item if not already in cart
-        item = {
-            'product': product_name,
-            'price': price,
-            'quantity': quantity,
-            'total': total_price
-        }
-        self.cart.append(item)
-        
-        self.update_cart_display()
+        self.update_cart_display(product_name)
         self.update_totals()
         self.clear_product_selection()
     
-    def update_cart_display(self):
-        # Clear the treeview
-        for item in self.cart_treeview.get_children():
-            self.cart_treeview.delete(item)
-        
-        # Add items from cart to treeview
-        for item in self.cart:
-            self.cart_treeview.insert(
-                "", 
-                "end", 
-                values=(
-                    item['product'], 
-                    f"{item['price']:.2f}", 
-                    item['quantity'], 
-                    f"{item['total']:.2f}"
-                )
-            )
+    def update_cart_display(self, product_name=None):
+        # Only the row for the changed product is touched; changes are
+        # applied together once per event-loop tick
+        if product_name is None:
+            self.cart_view.reset()
+        else:
+            self.cart_view.changed(product_name)
     
     def remove_item(self):
         selected_item = self.cart_treeview.selection()
@@ -356,27 +454,37 @@ class BillingSystem:
             messagebox.showwarning("Warning", "Please select an item to remove")
             return
         
-        selected_index = self.cart_treeview.index(selected_item[0])
-        if 0 <= selected_index < len(self.cart):
-            self.cart.pop(selected_index)
-            self.update_cart_display()
+        product_name = self.cart_view.product_for(selected_item[0])
+        if self.engine.remove_item(product_name) is not None:
+            self.update_cart_display(product_name)
             self.update_totals()
     
     def update_totals(self):
-        subtotal = sum(item['total'] for item in self.cart)
-        tax_rate = 0.05  # 5% tax
-        tax_amount = subtotal * tax_rate
-        total = subtotal + tax_amount
-        
-        self.subtotal.set(subtotal)
-        self.tax.set(tax_amount)
-        self.total.set(total)
+        # Cart keeps running totals, so this is O(1)
+        self.subtotal.set(float(self.cart.subtotal))
+        self.savings.set(float(self.cart.savings))
+        self.tax.set(float(self.cart.tax))
+        self.total.set(float(self.cart.total))
+    
+    def apply_coupon(self):
+        code = self.coupon_code.get().strip()
+        if not code:
+            self.engine.remove_coupon()
+        else:
+            try:
+                self.engine.apply_coupon(code)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+        self.update_totals()
     
     def calculate_balance(self):
-        paid = self.paid_amount.get()
-        total = self.total.get()
-        balance = paid - total
-        self.balance.set(balance)
+        try:
+            self.engine.set_paid(self.paid_amount.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.balance.set(float(self.engine.balance))
     
     def clear_product_selection(self):
         self.search_product.set("")
@@ -389,11 +497,13 @@ class BillingSystem:
         self.search_product.set("")
         self.product_quantity.set(1)
         self.subtotal.set(0)
+        self.savings.set(0)
         self.tax.set(0)
         self.total.set(0)
         self.paid_amount.set(0)
         self.balance.set(0)
-        self.cart = []
+        self.coupon_code.set("")
+        self.engine.reset()
         self.update_cart_display()
     
     def save_order(self):
@@ -402,33 +512,40 @@ class BillingSystem:
             return
         
         try:
-            # Save order details
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            self.cursor.execute(
-                """INSERT INTO orders 
-                   (customer_name, customer_contact, date, total_amount) 
-                   VALUES (?, ?, ?, ?)""",
-                (self.customer_name.get(), self.customer_contact.get(), now, self.total.get())
+            # Queue the order for the writer thread; the result is reported
+            # back on the main loop once it is committed, and only then is
+            # the bill's journal dropped. The bill keeps its invoice number,
+            # so printing it after saving shows the saved number.
+            invoice_no, session = self.engine.begin_save()
+        except ValueError as e:
+            messagebox.showwarning("Warning", str(e))
+            return
+        try:
+            self.order_writer.submit(
+                self.customer_name.get(),
+                self.customer_contact.get(),
+                self.cart.total,
+                self.engine.order_items(),
+                on_done=lambda order_id: self.order_saved(order_id, session),
+                on_error=lambda error: self.order_failed(error, session),
+                invoice_no=invoice_no,
+                tax=self.cart.tax,
+                discount=self.cart.savings
             )
-            
-            # Get the order ID
-            order_id = self.cursor.lastrowid
-            
-            # Save order items
-            for item in self.cart:
-                self.cursor.execute(
-                    """INSERT INTO order_items 
-                       (order_id, product_name, price, quantity, total) 
-                       VALUES (?, ?, ?, ?, ?)""",
-                    (order_id, item['product'], item['price'], item['quantity'], item['total'])
-                )
-            
-            self.conn.commit()
-            messagebox.showinfo("Success", f"Order #{order_id} saved successfully")
-            
         except Exception as e:
+            self.engine.save_failed(session)
             messagebox.showerror("Error", f"Failed to save order: {str(e)}")
     
+    def order_saved(self, order_id, session=None):
+        self.engine.journal_saved(session)
+        invoice_no = self.order_store.invoice_no(order_id)
+        label = f"Invoice {invoice_no}" if invoice_no else f"Order #{order_id}"
+        messagebox.showinfo("Success", f"{label} saved successfully")
+    
+    def order_failed(self, error, session=None):
+        self.engine.save_failed(session)
+        messagebox.showerror("Error", f"Failed to save order: {str(error)}")
+    
     def print_bill(self):
         if not self.cart:
             messagebox.showwarning("Warning", "Cart is empty")
@@ -437,71 +554,26 @@ class BillingSystem:
         # Generate bill content
         bill_text = self.generate_bill()
         
-        # Create a temporary file to store the bill
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.txt', mode='w') as f:
-            f.write(bill_text)
-            bill_file = f.name
-        
-        # Open the file for viewing (simulating print)
-        # On Windows
-        try:
-            os.startfile(bill_file)
-            return
-        except:
-            pass
-        
-        # On Mac/Linux
-        try:
-            os.system(f"open {bill_file}")
+        # Stream straight to the printer when one is configured
+        if self.print_spooler is not None:
+            self.send_to_printer(bill_text)
             return
-        except:
-            pass
         
-        # If all else fails, display in a new window
+        # Otherwise display in a new window
         self.display_bill(bill_text)
     
+    def send_to_printer(self, bill_text):
+        self.print_spooler.submit(
+            bill_text,
+            on_error=lambda e: messagebox.showerror("Print Error", f"Failed to print bill: {str(e)}")
+        )
+    
     def generate_bill(self):
         # Create a formatted bill
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        bill = []
-        
-        bill.append("="*50)
-        bill.append(f"{'RETAIL BILLING SYSTEM':^50}")
-        bill.append("="*50)
-        bill.append(f"Date: {now}")
-        bill.append(f"Invoice #: {int(datetime.now().timestamp())}")
-        bill.append("-"*50)
-        
-        if self.customer_name.get():
-            bill.append(f"Customer: {self.customer_name.get()}")
-        if self.customer_contact.get():
-            bill.append(f"Contact: {self.customer_contact.get()}")
-        
-        bill.append("-"*50)
-        bill.append(f"{'Product':<20}{'Price':>10}{'Qty':>8}{'Total':>12}")
-        bill.append("-"*50)
-        
-        for item in self.cart:
-            bill.append(
-                f"{item['product']:<20}{item['price']:>10.2f}{item['quantity']:>8}{item['total']:>12.2f}"
-            )
-        
-        bill.append("-"*50)
-        bill.append(f"{'Subtotal':<38}{self.subtotal.get():>12.2f}")
-        bill.append(f"{'Tax (5%)':<38}{self.tax.get():>12.2f}")
-        bill.append("="*50)
-        bill.append(f"{'TOTAL':<38}{self.total.get():>12.2f}")
-        bill.append("-"*50)
-        
-        if self.paid_amount.get() > 0:
-            bill.append(f"{'Paid Amount':<38}{self.paid_amount.get():>12.2f}")
-            bill.append(f"{'Balance':<38}{self.balance.get():>12.2f}")
-        
-        bill.append("-"*50)
-        bill.append(f"{'Thank you for your business!':^50}")
-        bill.append("="*50)
-        
-        return "\n".join(bill)
+        self.engine.customer_name = self.customer_name.get()
+        self.engine.customer_contact = self.customer_contact.get()
+        self.engine.set_paid(max(self.paid_amount.get(), 0))
+        return self.engine.receipt()
     
     def display_bill(self, bill_text):
         bill_window = tk.Toplevel(self.root)
@@ -534,8 +606,10 @@ class BillingSystem:
         print_button.pack(pady=10)
     
     def system_print(self, text_widget):
-        # This would normally connect to the system's print dialog
-        # For this example, we'll just show a message
+        if self.print_spooler is None:
+            messagebox.showinfo("Print", "No printer configured. Set BILLING_PRINTER (file:, tcp: or pdf:).")
+            return
+        self.send_to_printer(text_widget.get("1.0", tk.END))
         messagebox.showinfo("Print", "Sending to printer...")
 
 # Main function to run the application
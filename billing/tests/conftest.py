@@ -0,0 +1,42 @@
+from decimal import Decimal
+
+import pytest
+
+from engine.order_store import OrderStore
+
+
+class Catalog:
+    # Stand-in for ProductCache: three products, two with their own GST slab
+    prices = {"Rice": 100.0, "Soap": 40.0, "Pen": 10.0}
+    rates = {"Rice": Decimal("0.05"), "Soap": Decimal("0.18")}
+
+    def get_price(self, name):
+        return self.prices.get(name)
+
+    def get_tax_rate(self, name):
+        return self.rates.get(name)
+
+
+@pytest.fixture
+def catalog():
+    return Catalog()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "billing.db")
+
+
+@pytest.fixture
+def open_store(db_path):
+    # Opens an OrderStore on the test's database; each one is closed at the
+    # end of the test
+    stores = []
+
+    def open_store(**kwargs):
+        store = OrderStore(db_path, **kwargs)
+        stores.append(store)
+        return store
+    yield open_store
+    for store in stores:
+        store.close()
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from engine.api import BillingService, HttpError, _read_request
+from engine.billing import BillingEngine
+
+
+@pytest.fixture
+def service(db_path, open_store):
+    store = open_store()
+    with store.conn:
+        store.conn.execute("INSERT INTO products (name, price) VALUES ('Pen', 10.0)")
+    store.close()
+    service = BillingService(db_path, pool_size=1)
+    yield service
+    service.close()
+
+
+def order(**fields):
+    return dict({"items": [{"product": "Pen", "quantity": 2}]}, **fields)
+
+
+def saved_orders(service):
+    with service.pool.connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+
+@pytest.mark.parametrize("discount", [-50, 150, "abc", "NaN", None, True])
+def test_bad_discount_is_rejected(service, discount):
+    with pytest.raises(HttpError) as e:
+        asyncio.run(service.price(order(discount=discount)))
+    assert e.value.status == 400
+    assert "discount must be" in str(e.value)
+    with pytest.raises(HttpError):
+        asyncio.run(service.save_order(order(discount=discount)))
+    assert saved_orders(service) == 0
+
+
+def test_empty_order_is_rejected(service):
+    with pytest.raises(HttpError) as e:
+        asyncio.run(service.save_order({"items": []}))
+    assert (e.value.status, str(e.value)) == (400, "order has no items")
+    assert saved_orders(service) == 0
+
+
+def test_discount_in_range_is_priced(service):
+    result = asyncio.run(service.price(order(discount="12.5")))
+    assert (result["discount"], result["total"]) == ("2.50", "18.38")
+    result = asyncio.run(service.save_order(order(discount=100)))
+    assert result["total"] == "0.00"
+
+
+def test_engine_rejects_discount_over_100(catalog):
+    engine = BillingEngine(catalog)
+    with pytest.raises(ValueError):
+        engine.set_discount(101)
+    with pytest.raises(ValueError):
+        engine.set_discount(-1)
+    engine.set_discount(100)
+
+
+def test_search_is_rebuilt_off_the_loop(service):
+    service.prices.check_interval = 0
+    with service.pool.connection() as conn, conn:
+        conn.execute("INSERT INTO products (name, price) VALUES ('Pencil', 5.0)")
+
+    async def search():
+        first = service.find_products({"q": ["pe"]})
+        # The old index answers while the new one is built
+        assert [p["product"] for p in first["products"]] == ["Pen"]
+        await service._search_build
+        return service.find_products({"q": ["pe"]})
+
+    result = asyncio.run(search())
+    assert [p["product"] for p in result["products"]] == ["Pen", "Pencil"]
+
+
+@pytest.mark.parametrize("limit", ["0", "-1"])
+def test_limit_below_one_is_rejected(service, limit):
+    with pytest.raises(HttpError) as e:
+        service.find_products({"q": [""], "limit": [limit]})
+    assert e.value.status == 400
+
+
+@pytest.mark.parametrize("length", ["abc", "-5"])
+def test_bad_content_length_is_rejected(length):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(f"POST /price HTTP/1.1\r\nContent-Length: {length}\r\n\r\n{{}}".encode())
+        reader.feed_eof()
+        return await _read_request(reader)
+
+    with pytest.raises(HttpError) as e:
+        asyncio.run(read())
+    assert e.value.status == 400
@@ -0,0 +1,25 @@
+import io
+import json
+
+import pytest
+
+from engine.batch import run_batch
+
+# Batch pricing runs through the vectorized pass, which needs numpy
+pytest.importorskip("engine.pricing")
+
+
+def test_order_without_items_is_skipped(tmp_path, catalog, open_store):
+    orders = tmp_path / "orders.jsonl"
+    orders.write_text("\n".join(json.dumps(order) for order in [
+        {"customer_name": "A", "items": [{"product": "Rice", "quantity": 2}]},
+        {"customer_name": "B", "items": []},
+        {"customer_name": "C", "items": [{"product": "Soap"}]},
+    ]), encoding="utf-8")
+    store = open_store()
+    log = io.StringIO()
+    stats = run_batch(str(orders), store, catalog, log=log)
+    names = [row[0] for row in store.conn.execute("SELECT customer_name FROM orders ORDER BY id")]
+    assert (stats["orders"], stats["failed"]) == (2, 1)
+    assert names == ["A", "C"]
+    assert f"{orders}:2: skipped order: order has no items" in log.getvalue()
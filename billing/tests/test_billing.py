@@ -0,0 +1,51 @@
+import pytest
+
+from engine.billing import BillingEngine
+from engine.invoices import InvoiceSequence, audit
+
+
+@pytest.fixture
+def till(catalog, db_path, open_store):
+    store = open_store(terminal="T1")
+    invoices = InvoiceSequence(db_path, "T1", block_size=10)
+    engine = BillingEngine(catalog, store, invoices=invoices)
+    yield engine
+    invoices.close()
+
+
+def test_receipt_after_save_shows_saved_number(till):
+    till.add_item("Rice", 2)
+    order_id = till.save()
+    assert till.store.invoice_no(order_id) == "T1-000001"
+    assert "T1-000001" in till.receipt()
+    assert till.invoice_number() == "T1-000001"
+
+
+def test_saved_bill_is_not_saved_twice(till):
+    till.add_item("Rice")
+    till.save()
+    with pytest.raises(ValueError):
+        till.save()
+
+
+def test_change_after_save_takes_new_number(till):
+    till.add_item("Rice")
+    till.save()
+    till.add_item("Soap")
+    order_id = till.save()
+    assert till.store.invoice_no(order_id) == "T1-000002"
+
+    till.reset()
+    till.add_item("Soap")
+    assert till.invoice_number() == "T1-000003"
+
+
+def test_save_then_print_leaves_no_gap(till):
+    for _ in range(3):
+        till.add_item("Rice")
+        till.save()
+        till.receipt()
+        till.reset()
+    till.invoices.close()
+    entry, = audit(till.store.conn, "T1")
+    assert (entry["saved"], entry["missing"], entry["gaps"]) == (3, 0, [])
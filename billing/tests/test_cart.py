@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+from engine.billing import BillingEngine
+from engine.cart import Cart
+from engine.promotions import PromotionIndex
+
+
+def mixed_cart():
+    cart = Cart()
+    cart.add("Rice", 100, 2, Decimal("0.05"))
+    cart.add("Soap", 40, 3, Decimal("0.18"))
+    return cart
+
+
+def test_full_discount_on_mixed_slabs():
+    cart = mixed_cart()
+    cart.set_discount(100)
+    assert cart.subtotal == Decimal("320.00")
+    assert cart.discount == Decimal("320.00")
+    assert cart.coupon == 0
+    assert cart.tax == 0
+    assert cart.total == 0
+    assert [(taxable, tax) for rate, taxable, tax in cart.tax_breakdown()] == [(0, 0), (0, 0)]
+
+
+def test_full_discount_with_coupon_on_mixed_slabs():
+    cart = mixed_cart()
+    cart.set_coupon(50, "FLAT50")
+    cart.set_discount(100)
+    assert cart.coupon == 0
+    assert cart.total == 0
+    cart.set_discount(0)
+    assert cart.coupon == Decimal("50.00")
+    assert sum(taxable for rate, taxable, tax in cart.tax_breakdown()) == Decimal("270.00")
+
+
+def test_full_quantity_tier_on_mixed_slabs(catalog):
+    index = PromotionIndex([
+        (1, "All free", {"type": "quantity_tier", "products": ["Rice", "Soap"], "tiers": [[1, 100]]}),
+    ])
+    engine = BillingEngine(catalog, promotions=index)
+    engine.add_item("Rice", 2)
+    engine.add_item("Soap", 3)
+    assert engine.cart.promotion == Decimal("320.00")
+    assert engine.cart.total == 0
+    assert engine.cart.promotions() == [("All free", Decimal("320.00"))]
+
+
+def test_coupon_split_across_slabs():
+    cart = mixed_cart()
+    cart.set_coupon(32)
+    # 200 and 120 of base take 20 and 12 of the coupon
+    assert [taxable for rate, taxable, tax in cart.tax_breakdown()] == [Decimal("180.00"), Decimal("108.00")]
+    assert cart.tax == Decimal("9.00") + Decimal("19.44")
+    assert cart.total == Decimal("288.00") + cart.tax
+
+
+def test_reloaded_coupon_takes_its_new_value(catalog):
+    rule = {"type": "coupon", "code": "FLAT", "amount": 20}
+    engine = BillingEngine(catalog, promotions=PromotionIndex([(1, "Flat", rule)]))
+    engine.add_item("Rice", 2)
+    engine.apply_coupon("flat")
+    assert engine.cart.coupon == Decimal("20.00")
+
+    engine.set_promotions(PromotionIndex([(1, "Flat", dict(rule, amount=50))]))
+    assert engine.cart.coupon == Decimal("50.00")
+    engine.set_promotions(PromotionIndex())
+    assert engine.cart.coupon == 0
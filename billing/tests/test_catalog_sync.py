@@ -0,0 +1,43 @@
+from engine.catalog_sync import _read_rows, diff_products, read_price_list, sync_products
+from engine.order_store import OrderStore
+
+
+def products(conn):
+    return conn.execute("SELECT name, price, tax_slab, category FROM products ORDER BY name").fetchall()
+
+
+def test_csv_with_tax_and_category(tmp_path):
+    path = tmp_path / "prices.csv"
+    path.write_text("Product,Price,GST,Category\nPen,10,5%,Stationery\nSoap,40.5,18,\nPen,11,,\n", encoding="utf-8")
+    rows, columns = read_price_list(str(path))
+    assert rows == [("Pen", 10.0, 5.0, "Stationery"), ("Soap", 40.5, 18.0, None)]
+    assert columns == ["tax_slab", "category"]
+
+
+def test_workbook_rows_with_empty_cells():
+    # Rows as pandas hands them over for products.xlsx: blank cells are NaN
+    nan = float("nan")
+    records = [
+        {"Product": "Pen", "Price": 10.0, "Tax": 5, "Category": "Stationery"},
+        {"Product": "Soap", "Price": 40.5, "Tax": nan, "Category": nan},
+        {"Product": nan, "Price": nan, "Tax": nan, "Category": nan},
+    ]
+    rows, columns = _read_rows("products.xlsx", ["Product", "Price", "Tax", "Category"], records)
+    assert rows == [("Pen", 10.0, 5.0, "Stationery"), ("Soap", 40.5, None, None)]
+    assert columns == ["tax_slab", "category"]
+
+
+def test_product_without_a_price_is_repriced(tmp_path):
+    store = OrderStore(str(tmp_path / "billing.db"))
+    with store.conn:
+        store.conn.executemany("INSERT INTO products (name, price) VALUES (?, ?)", [("Pen", None), ("Ink", 30.0)])
+    changed, missing = diff_products(store.conn, [("Pen", 10.0, None, None), ("Ink", 30.0, None, None)])
+    assert (changed, missing) == ([("Pen", 10.0, None, None)], [])
+
+    path = tmp_path / "prices.csv"
+    path.write_text("Product,Price\nPen,10\nInk,30\n", encoding="utf-8")
+    result = sync_products(store.conn, str(path))
+    assert (result["changed"], result["removed"]) == (1, 0)
+    assert products(store.conn) == [("Ink", 30.0, None, None), ("Pen", 10.0, None, None)]
+    assert sync_products(store.conn, str(path))["skipped"]
+    store.close()
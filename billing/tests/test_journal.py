@@ -0,0 +1,146 @@
+import os
+
+import pytest
+
+from engine.billing import BillingEngine
+from engine.journal import CartJournal
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cart.journal")
+
+
+@pytest.fixture
+def till(catalog):
+    def till(path, store=None):
+        # A till as it starts up: open the journal and recover what it holds
+        journal = CartJournal(path, sync_interval=0)
+        def is_saved(invoice_no):
+            return store.order_for_invoice(invoice_no) is not None
+
+        records, unsaved = journal.recover(is_saved if store is not None else None)
+        engine = BillingEngine(catalog, store, journal=journal)
+        engine.restore(records)
+        return engine, unsaved
+    return till
+
+
+def lines(engine):
+    return [(item.product, item.quantity) for item in engine.cart]
+
+
+@pytest.fixture
+def open_bill(till):
+    def open_bill(path):
+        engine, unsaved = till(path)
+        engine.reset()
+        engine.add_item("Rice", 2)
+        engine.add_item("Soap")
+        engine.set_quantity("Soap", 3)
+        engine.set_discount(10)
+        return engine
+    return open_bill
+
+
+def test_restore_on_restart(path, till, open_bill):
+    engine = open_bill(path)
+    engine.add_item("Pen")
+    engine.remove_item("Pen")
+    total = engine.cart.total
+    engine.journal.close()
+
+    engine, unsaved = till(path)
+    assert lines(engine) == [("Rice", 2), ("Soap", 3)]
+    assert engine.cart.discount_percent == 10
+    assert engine.cart.total == total
+    assert unsaved == []
+    engine.journal.close()
+
+
+@pytest.mark.parametrize("damage", ["torn", "corrupt"])
+def test_replay_stops_at_a_damaged_last_record(path, damage, till, open_bill):
+    engine = open_bill(path)
+    engine.add_item("Pen", 5)
+    engine.journal.close()
+    with open(path, "rb") as f:
+        data = f.read()
+    last = data.rstrip(b"\n").rfind(b"\n") + 1
+    if damage == "torn":
+        # The program died halfway through writing the last line
+        data = data[:last + (len(data) - last) // 2]
+    else:
+        # A flipped byte fails the checksum
+        data = data[:-3] + bytes([data[-3] ^ 1]) + data[-2:]
+    with open(path, "wb") as f:
+        f.write(data)
+
+    engine, unsaved = till(path)
+    assert lines(engine) == [("Rice", 2), ("Soap", 3)]
+    assert engine.cart.discount_percent == 10
+    engine.journal.close()
+    # The damaged tail was cut off, so new records follow good ones
+    assert os.path.getsize(path) == last
+
+
+def test_journal_is_truncated_after_save(path, till, open_bill, open_store):
+    store = open_store()
+    engine = open_bill(path)
+    engine.store = store
+    engine.save()
+    assert os.path.getsize(path) == 0
+    assert engine.journal.closed
+
+    # Changing the saved bill starts a new session holding the whole cart
+    engine.add_item("Pen")
+    engine.journal.close()
+    engine, unsaved = till(path, store)
+    assert lines(engine) == [("Rice", 2), ("Soap", 3), ("Pen", 1)]
+    engine.journal.close()
+
+
+def test_save_that_never_committed_is_reported(path, till, open_bill, open_store):
+    store = open_store()
+    engine = open_bill(path)
+    # Handed to the order writer, then the till died before the commit
+    engine.journal_saving("T1-000007")
+    engine.reset()
+    engine.add_item("Pen")
+    engine.journal.close()
+
+    engine, unsaved = till(path, store)
+    assert lines(engine) == [("Pen", 1)]
+    (invoice_no, records), = unsaved
+    assert invoice_no == "T1-000007"
+    assert [record[1] for record in records if record[0] == "line"] == ["Rice", "Soap", "Soap"]
+    engine.journal.close()
+
+
+def test_failed_save_does_not_stop_truncation(path, open_bill, open_store):
+    store = open_store()
+    engine = open_bill(path)
+    engine.store = store
+    invoice_no, session = engine.begin_save()
+    # The order writer failed after the cashier had moved on
+    engine.reset()
+    engine.save_failed(session)
+    assert os.path.getsize(path) < 100
+
+    for _ in range(5):
+        engine.add_item("Pen")
+        engine.save()
+        assert os.path.getsize(path) == 0
+        engine.reset()
+    engine.journal.close()
+
+
+def test_failed_save_keeps_the_open_bill(path, till, open_bill, open_store):
+    engine = open_bill(path)
+    invoice_no, session = engine.begin_save()
+    engine.save_failed(session)
+    engine.journal.close()
+
+    engine, unsaved = till(path, open_store())
+    assert lines(engine) == [("Rice", 2), ("Soap", 3)]
+    assert unsaved == []
+    engine.journal.close()
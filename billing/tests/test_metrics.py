@@ -0,0 +1,107 @@
+import json
+import sqlite3
+import time
+
+import pytest
+
+from engine.metrics import Histogram, MainLoopMonitor, Metrics, TimedConnection
+
+
+def test_histogram_percentiles_use_power_of_two_buckets():
+    histogram = Histogram()
+    assert histogram.percentile(0.5) == 0.0
+    for _ in range(99):
+        histogram.record(0.0005)
+    histogram.record(0.01)
+    # 500us lands under 512us and 10ms under 16384us
+    assert histogram.snapshot()["buckets"] == {"<512us": 99, "<16384us": 1}
+    assert histogram.percentile(0.50) == 0.000512
+    assert histogram.percentile(0.99) == 0.000512
+    # The top bucket's bound is capped at the slowest call
+    assert histogram.percentile(1.0) == 0.01
+    assert histogram.count == 100
+
+
+def test_timed_connection_counts_statements_commits_and_rollbacks():
+    metrics = Metrics()
+    conn = sqlite3.connect(":memory:", factory=TimedConnection)
+    conn.metrics = metrics
+    conn.execute("CREATE TABLE t (x)")
+    conn.executemany("INSERT INTO t VALUES (?)", [(1,), (2,)])
+    conn.commit()
+    with conn:
+        conn.execute("INSERT INTO t VALUES (3)")
+    with pytest.raises(ZeroDivisionError):
+        with conn:
+            conn.execute("INSERT INTO t VALUES (4)")
+            1 / 0
+    conn.execute("INSERT INTO t VALUES (5)")
+    conn.rollback()
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 3
+    conn.close()
+
+    counts = {name: histogram.count for name, histogram in metrics.histograms.items()}
+    assert counts == {
+        "sql.create": 1, "sql.insert_many": 1, "sql.insert": 3, "sql.select": 1,
+        "sql.commit": 2, "sql.rollback": 2,
+    }
+
+
+class FakeRoot:
+    # Keeps root.after callbacks for the test to run
+    def __init__(self):
+        self.scheduled = {}
+        self.next_id = 0
+
+    def after(self, ms, func):
+        self.next_id += 1
+        self.scheduled[self.next_id] = func
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        del self.scheduled[after_id]
+
+    def run_pending(self):
+        for after_id in list(self.scheduled):
+            self.scheduled.pop(after_id)()
+
+
+def test_main_loop_monitor_records_a_stall_after_the_last_handler(monkeypatch, tmp_path):
+    clock = [100.0]
+    monkeypatch.setattr(time, "perf_counter", lambda: clock[0])
+    metrics = Metrics()
+    root = FakeRoot()
+    path = str(tmp_path / "metrics.json")
+    monitor = MainLoopMonitor(root, metrics, path, interval=0.1, threshold=0.25)
+    monitor.start()
+
+    # A handler blocks the loop, so the tick due at 100.1 runs at 100.6
+    metrics.timed("save_order", lambda: None)()
+    clock[0] = 100.6
+    root.run_pending()
+    clock[0] = 100.7
+    root.run_pending()
+    monitor.stop()
+
+    assert root.scheduled == {}
+    assert metrics.histograms["mainloop.lag"].count == 2
+    (stall,) = metrics.stalls
+    assert (stall["ms"], stall["after"]) == (500.0, "save_order")
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["stall_count"] == 1
+
+
+def test_dump_replaces_the_file_only_when_complete(tmp_path, monkeypatch):
+    path = tmp_path / "metrics.json"
+    metrics = Metrics()
+    metrics.record("add_to_cart", 0.002)
+    metrics.dump(str(path))
+    assert json.loads(path.read_text(encoding="utf-8"))["timings"]["add_to_cart"]["count"] == 1
+    assert [p.name for p in tmp_path.iterdir()] == ["metrics.json"]
+
+    # A dump that fails halfway leaves the previous file intact
+    metrics.record("add_to_cart", 0.002)
+    monkeypatch.setattr(metrics, "snapshot", lambda: {"timings": {"bad": object()}})
+    with pytest.raises(TypeError):
+        metrics.dump(str(path))
+    assert json.loads(path.read_text(encoding="utf-8"))["timings"]["add_to_cart"]["count"] == 1
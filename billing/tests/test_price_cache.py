@@ -0,0 +1,25 @@
+from engine.order_store import OrderStore, connect
+from engine.price_cache import ProductCache
+
+
+def test_fetch_on_another_connection_then_install(tmp_path):
+    path = str(tmp_path / "billing.db")
+    store = OrderStore(path)
+    with store.conn:
+        store.conn.executemany("INSERT INTO products (name, price) VALUES (?, ?)", [("Pen", 10.0), ("Ink", 30.0)])
+    cache = ProductCache(store.conn, check_interval=0, autoload=False)
+
+    worker = connect(path, check_same_thread=False)
+    snapshot = cache.fetch(worker)
+    # An edit lands after the snapshot was read but before it is installed
+    with worker:
+        worker.execute("UPDATE products SET price = 12.0 WHERE name = 'Pen'")
+    worker.close()
+
+    cache.install(snapshot)
+    assert cache.generation == 1
+    # The next check notices the snapshot is stale and reloads
+    assert cache.get_price("Pen") == 12.0
+    assert cache.generation == 2
+    assert sorted(cache.names()) == ["Ink", "Pen"]
+    store.close()
@@ -0,0 +1,60 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from engine.cart import Cart
+
+# The vectorized pass needs numpy
+LineColumns = pytest.importorskip("engine.pricing").LineColumns
+
+SLABS = [Decimal(rate) for rate in ("0", "0.05", "0.12", "0.18", "0.28", "0.125")]
+
+
+def random_cart(rng):
+    # A few products on mixed slabs; some carts fully or oddly discounted
+    discount = rng.choice([Decimal("0"), Decimal("100"), Decimal(rng.randint(0, 10000)) / 100])
+    cart = Cart(discount_percent=discount)
+    for i in range(rng.randint(1, 20)):
+        price = Decimal(rng.randint(1, 500000)) / 100
+        cart.add(f"Product {i}", price, rng.randint(1, 50), rng.choice(SLABS))
+    return cart
+
+
+def test_vectorized_pricing_matches_cart():
+    rng = random.Random(20250401)
+    carts = [random_cart(rng) for _ in range(3000)]
+    columns = LineColumns()
+    for order, cart in enumerate(carts):
+        columns.extend(order, [(item.product, item.price, item.quantity, item.tax_rate) for item in cart],
+                       cart.discount_percent)
+    priced = columns.price_lines()
+
+    line = 0
+    for order, cart in enumerate(carts):
+        totals = priced.totals(order)
+        assert (totals["subtotal"], totals["discount"], totals["tax"], totals["total"]) == \
+            (cart.subtotal, cart.discount, cart.tax, cart.total), order
+        assert priced.tax_breakdown(order) == cart.tax_breakdown(), order
+        for item in cart:
+            assert priced.line_total(line) == item.total
+            line += 1
+
+
+def test_full_discount_on_mixed_slabs():
+    cart = Cart(discount_percent=100)
+    cart.add("Rice", 100, 2, Decimal("0.05"))
+    cart.add("Soap", 40, 3, Decimal("0.18"))
+    priced = LineColumns.from_cart(cart).price_lines()
+    assert priced.totals(0) == {"subtotal": Decimal("320.00"), "discount": Decimal("320.00"),
+                                "tax": Decimal("0.00"), "total": Decimal("0.00")}
+    assert priced.tax_breakdown(0) == cart.tax_breakdown()
+
+
+def test_discount_out_of_range_is_rejected():
+    columns = LineColumns()
+    with pytest.raises(ValueError):
+        columns.extend(0, [("Rice", 100, 1, Decimal("0.05"))], 101)
+    with pytest.raises(ValueError):
+        columns.extend(0, [("Rice", 100, 1, Decimal("0.05"))], Decimal("12.345"))
+    assert len(columns) == 0
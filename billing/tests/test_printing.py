@@ -0,0 +1,134 @@
+import re
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from engine.cart import Cart
+from engine.printing import CaptureSink, EscPosEncoder, PdfEncoder, PrintSpooler, open_printer
+from engine.receipt import render_receipt, render_simple_receipt
+
+NOW = datetime(2025, 4, 1, 10, 30)
+LONG_NAME = "Extra Large Spiral Bound Notebook With Hard Cover"
+
+
+class Root:
+    # Just enough of Tk for PrintSpooler; polls are flushed by close()
+    def after(self, ms, callback):
+        return object()
+
+    def after_cancel(self, after_id):
+        pass
+
+
+def cart():
+    cart = Cart()
+    cart.add(LONG_NAME, 245.5, 2, Decimal("0.18"))
+    cart.add("Pen (blue)", 10, 12, Decimal("0.05"))
+    cart.set_discount(10)
+    return cart
+
+
+def spool(encoder, *texts):
+    # Prints each text through a spooler into a CaptureSink
+    sink = CaptureSink()
+    done = []
+    spooler = PrintSpooler(Root(), sink, encoder)
+    for text in texts:
+        spooler.submit(text, on_done=lambda: done.append(True), on_error=done.append)
+    spooler.close()
+    assert done == [True] * len(texts)
+    return sink.jobs
+
+
+def escpos_lines(job):
+    assert job.startswith(EscPosEncoder.INIT)
+    assert job.endswith(EscPosEncoder.CUT)
+    body = job[len(EscPosEncoder.INIT):-len(EscPosEncoder.CUT)]
+    assert body.endswith(b"\n")
+    return body[:-1].split(b"\n")
+
+
+def test_escpos_job_carries_the_receipt():
+    text = render_receipt(cart(), "Asha", "98450 00000", paid=600, balance=10, invoice_no="T1-000001", now=NOW)
+    job, = spool(EscPosEncoder(), text)
+    lines = escpos_lines(job)
+    assert [line.decode("cp437") for line in lines] == text.split("\n")
+    assert b"Invoice #: T1-000001" in lines
+
+
+def test_escpos_without_cut_and_rupee_sign():
+    text = render_simple_receipt(cart(), paid=600, balance=10, now=NOW)
+    job, = spool(EscPosEncoder(cut=False), text)
+    assert job.startswith(EscPosEncoder.INIT)
+    assert not job.endswith(EscPosEncoder.CUT)
+    assert "₹".encode("utf-8") not in job
+    assert b"Total      : Rs." in job
+
+
+@pytest.mark.parametrize("template, width", [("thermal80", 48), ("thermal58", 32)])
+def test_thermal_receipts_fit_the_roll(template, width):
+    text = render_receipt(cart(), "A customer with a rather long name", "98450 00000", paid=1000, balance=1,
+                          invoice_no="T1-000001", now=NOW, template=template)
+    job, = spool(EscPosEncoder(), text)
+    lines = escpos_lines(job)
+    assert max(len(line) for line in lines) == width
+    assert all(len(line) <= width for line in lines)
+    body = b"\n".join(lines)
+    assert b"TOTAL" in body
+    if template == "thermal58":
+        # The name wraps onto its own line, cut at the roll width
+        assert LONG_NAME[:width].encode() in lines
+        assert any(line.startswith(b"  2 x 245.50") for line in lines)
+    else:
+        # One line per item, the name cut to fit its column
+        assert any(line.startswith(LONG_NAME[:18].encode()) and line.endswith(b"491.00") for line in lines)
+
+
+def pdf_objects(data):
+    # {object number: byte offset} for every "N 0 obj" in the file
+    return {int(m.group(1)): m.start() for m in re.finditer(rb"(?m)^(\d+) 0 obj\n", data)}
+
+
+def test_pdf_receipt_is_well_formed():
+    text = render_receipt(cart(), "Asha", invoice_no="T1-000002", now=NOW)
+    job, = spool(PdfEncoder(lines_per_page=10), text)
+    assert job.startswith(b"%PDF-1.4\n")
+    assert job.endswith(b"%%EOF\n")
+
+    # Every xref entry points at its object, and startxref at the table
+    objects = pdf_objects(job)
+    xref_at = int(re.search(rb"startxref\n(\d+)\n", job).group(1))
+    assert job[xref_at:].startswith(b"xref\n0 %d\n" % (len(objects) + 1))
+    entries = re.findall(rb"(\d{10}) 00000 n \n", job[xref_at:])
+    assert [int(offset) for offset in entries] == [objects[number] for number in range(1, len(objects) + 1)]
+
+    # Pages of at most 10 lines, text escaped for PDF strings
+    lines = text.split("\n")
+    pages = -(-len(lines) // 10)
+    assert b"/Count %d" % pages in job
+    assert job.count(b"/Type /Page ") == pages
+    assert b"(Pen \\(blue\\)" in job
+    assert b"(Invoice #: T1-000002) '" in job
+
+
+def test_pdf_printer_writes_a_file(tmp_path):
+    sink, encoder = open_printer(f"pdf:{tmp_path / 'receipts'}")
+    spooler = PrintSpooler(Root(), sink, encoder)
+    spooler.submit(render_receipt(cart(), now=NOW))
+    spooler.close()
+    files = list((tmp_path / "receipts").iterdir())
+    assert len(files) == 1 and files[0].suffix == ".pdf"
+    assert files[0].read_bytes().startswith(b"%PDF-1.4\n")
+
+
+def test_print_errors_reach_the_callback():
+    class BrokenSink:
+        def write_job(self, chunks):
+            raise OSError("printer offline")
+
+    errors = []
+    spooler = PrintSpooler(Root(), BrokenSink(), EscPosEncoder())
+    spooler.submit("receipt", on_error=errors.append)
+    spooler.close()
+    assert [str(e) for e in errors] == ["printer offline"]
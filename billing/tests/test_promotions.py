@@ -0,0 +1,34 @@
+import pytest
+
+from engine.promotions import PromotionIndex, main
+
+
+@pytest.mark.parametrize("rule", [
+    {"type": "coupon", "code": "X", "amount": -50},
+    {"type": "coupon", "code": "X", "percent": -5},
+    {"type": "coupon", "code": "X", "percent": 150},
+    {"type": "coupon", "code": "X", "amount": 50, "min_total": -1},
+    {"type": "category_percent", "category": "Stationery", "percent": -10},
+    {"type": "category_percent", "category": "Stationery", "percent": 101},
+    {"type": "quantity_tier", "product": "Pen", "tiers": [[10, 5], [50, 120]]},
+    {"type": "quantity_tier", "product": "Pen", "tiers": [[0, 5]]},
+])
+def test_out_of_range_rules_are_rejected(rule):
+    with pytest.raises(ValueError):
+        PromotionIndex([(1, "Bad", rule)])
+
+
+def test_in_range_rules_compile():
+    index = PromotionIndex([
+        (1, "Free", {"type": "coupon", "code": "FREE", "percent": 100}),
+        (2, "Stationery", {"type": "category_percent", "category": "Stationery", "percent": 0}),
+        (3, "Pens", {"type": "quantity_tier", "product": "Pen", "tiers": [[10, 5], [50, 12.5]]}),
+    ])
+    assert index.count == 3
+
+
+def test_manage_promotions_refuses_a_bad_rule(tmp_path, capsys):
+    db = str(tmp_path / "billing.db")
+    assert main(["--db", db, "add", "Bad", '{"type": "coupon", "code": "X", "percent": 150}']) == 1
+    assert "0 to 100" in capsys.readouterr().err
+    assert main(["--db", db, "add", "Good", '{"type": "coupon", "code": "X", "percent": 15}']) == 0
@@ -0,0 +1,43 @@
+from decimal import Decimal
+
+from engine.billing import BillingEngine
+from engine.reporting import catch_up, daily_revenue, tax_collected
+
+
+def test_rollup_uses_stored_tax_and_discount(catalog, open_store):
+    store = open_store()
+    engine = BillingEngine(catalog, store)
+    engine.add_item("Rice", 2)
+    engine.add_item("Soap", 3)
+    engine.set_discount(50)
+    engine.save()
+    # 160.00 taxable after the discount: 100.00 at 5% and 60.00 at 18%
+    assert engine.cart.tax == Decimal("15.80")
+    assert engine.cart.total == Decimal("175.80")
+
+    with store.conn:
+        catch_up(store.conn)
+    (day, orders, revenue, tax, discount), = daily_revenue(store.conn, "0000-01-01", "9999-12-31")
+    assert (orders, revenue, tax, discount) == (1, 175.80, 15.80, 160.00)
+    assert tax_collected(store.conn, day, day) == 15.80
+
+
+def test_orders_without_stored_tax_fall_back_to_items(open_store):
+    store = open_store()
+    store.save_order("A", "1", Decimal("105.00"), [("Rice", Decimal("100.00"), 1, Decimal("100.00"))])
+    with store.conn:
+        catch_up(store.conn)
+    (day, orders, revenue, tax, discount), = daily_revenue(store.conn, "0000-01-01", "9999-12-31")
+    assert (orders, revenue, tax, discount) == (1, 105.00, 5.00, 0)
+
+
+def test_rollups_catch_up_when_the_store_is_opened(open_store):
+    store = open_store()
+    store.save_order("A", "1", Decimal("105.00"), [("Rice", Decimal("100.00"), 1, Decimal("100.00"))],
+                     tax=Decimal("5.00"), discount=Decimal("0.00"))
+    # Saving leaves the rollups to the next catch-up
+    assert daily_revenue(store.conn, "0000-01-01", "9999-12-31") == []
+    store.close()
+
+    store = open_store()
+    assert [row[1:] for row in daily_revenue(store.conn, "0000-01-01", "9999-12-31")] == [(1, 105.0, 5.0, 0.0)]